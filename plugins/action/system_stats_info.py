@@ -0,0 +1,15 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from ansible_collections.community.beszel.plugins.modules import system_stats_info
+from ansible_collections.community.beszel.plugins.plugin_utils.pocketbase_action import (
+    PocketBaseActionModule,
+)
+
+
+class ActionModule(PocketBaseActionModule):
+    MODULE = system_stats_info
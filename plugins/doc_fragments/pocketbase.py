@@ -0,0 +1,173 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+    # Options shared by all modules that talk to the Beszel hub API
+    DOCUMENTATION = r"""
+options:
+    url:
+        description: URL of the Beszel hub.
+        required: true
+        type: str
+    username:
+        description: Username used to authenticate to Beszel hub.
+        required: true
+        type: str
+    password:
+        description: Password used to authenticate to Beszel hub.
+        required: true
+        type: str
+    timeout:
+        description:
+            - Number of seconds to wait for the Beszel hub to respond.
+            - See O(connect_timeout) for the time to wait for a connection to be established.
+        required: false
+        type: float
+        default: 120
+    connect_timeout:
+        description: Number of seconds to wait for a connection to the Beszel hub to be established.
+        required: false
+        type: float
+        default: 10
+        version_added: "1.1.0"
+    retries:
+        description:
+            - Number of times to retry a request that failed because of a transient
+              Beszel hub error.
+            - Rate limited (429) and unavailable (503) responses and connection failures are
+              retried for any request.
+            - Bad gateway (502) and gateway timeout (504) responses, read timeouts and
+              connection resets are only retried for requests that are safe to repeat,
+              as the Beszel hub may have already processed them.
+            - Other errors, such as 400, 403 or 404 responses, are never retried.
+            - Set to V(0) to disable retries.
+        required: false
+        type: int
+        default: 3
+        version_added: "1.1.0"
+    retry_backoff:
+        description:
+            - Base number of seconds to wait before retrying a request.
+            - The wait doubles with each retry and a random jitter is applied, so that
+              many hosts do not retry at the same time.
+            - If the Beszel hub responds with a C(Retry-After) header, its value is used instead.
+        required: false
+        type: float
+        default: 0.5
+        version_added: "1.1.0"
+    retry_max_backoff:
+        description: Maximum number of seconds to wait before retrying a request.
+        required: false
+        type: float
+        default: 30
+        version_added: "1.1.0"
+    rate_limit:
+        description:
+            - Maximum number of requests per second to send to the Beszel hub.
+            - Must be greater than V(0).
+            - The limit is shared by all module and plugin runs of the same user on the same
+              host talking to the same O(url), for example all forks of a playbook run, so that
+              a large number of forks does not overload the Beszel hub.
+            - The limit is kept in lock files in a directory of the temporary directory of the
+              host. If they can not be created, requests are not rate limited.
+            - Retried requests count against the limit.
+            - If not provided, requests are not rate limited.
+        required: false
+        type: float
+        version_added: "1.1.0"
+    max_in_flight:
+        description:
+            - Maximum number of requests sent to the Beszel hub at the same time.
+            - Must be at least V(1).
+            - Like O(rate_limit), the limit is shared by all module and plugin runs of the
+              same user on the same host talking to the same O(url).
+            - If not provided, the number of concurrent requests is not limited.
+        required: false
+        type: int
+        version_added: "1.1.0"
+    token_cache:
+        description:
+            - Path to a file used to cache Beszel hub authentication tokens between
+              module invocations.
+            - Tokens are keyed by O(url) and O(username). A cached token that has not expired
+              is refreshed using the PocketBase auth-refresh endpoint instead of logging in
+              with O(password).
+            - When the cached token has expired or is rejected by the Beszel hub, the module
+              falls back to a password login and updates the cache.
+            - The file is created with C(0600) permissions. Updates are serialized with a
+              lock file of the same path with a C(.lock) suffix.
+            - If not provided, tokens are not cached.
+        required: false
+        type: path
+        version_added: "1.1.0"
+    pool_size:
+        description:
+            - Maximum number of connections kept open to the Beszel hub.
+            - Connections are kept alive and reused by all requests of a module invocation,
+              so a TLS handshake is only paid once per connection.
+        required: false
+        type: int
+        default: 10
+        version_added: "1.1.0"
+    http2:
+        description:
+            - Whether to use HTTP/2 to talk to the Beszel hub.
+            - Requires the C(h2) Python library. If it is not installed, HTTP/1.1 is used.
+        required: false
+        type: bool
+        default: false
+        version_added: "1.1.0"
+notes:
+    - Ansible runs each host of a task in its own worker process, so the authenticated
+      connection to the Beszel hub is not shared between hosts or tasks. Use O(token_cache)
+      to reuse authentication tokens between them.
+"""
+
+    # Options and notes only relevant to modules, which are run for a host
+    # instead of in the Ansible controller like lookup and inventory plugins
+    MODULE = r"""
+options:
+    collect_metrics:
+        description:
+            - Whether to record the HTTP requests sent to the Beszel hub and return a summary
+              of them in the C(metrics) key of the result.
+            - The summary holds the number of C(requests), C(retries) and C(errors), the
+              C(bytes_sent) and C(bytes_received), the C(request_time) spent waiting for
+              responses and the C(elapsed) time of the module run, in seconds.
+            - C(phases) holds the same statistics per phase of the module, such as the
+              V(login), V(lookup) of the existing records or V(write) of the changes, with the
+              C(elapsed) time of each phase. C(endpoints) holds them per API endpoint.
+            - When the C(opentelemetry-api) Python library is installed, the module run and its
+              requests are also recorded as OpenTelemetry spans, which are exported by the
+              tracer provider configured in the process, for example by the
+              C(community.general.opentelemetry) callback when the module runs in the
+              Ansible controller process.
+            - If not provided, the E(BESZEL_COLLECT_METRICS) environment variable is used.
+        required: false
+        type: bool
+        default: false
+        version_added: "1.1.0"
+    metrics_file:
+        description:
+            - Path to a file to append the metrics of the module run to, as a line of JSON
+              holding the summary returned with O(collect_metrics) and each request with its
+              endpoint, method, status, bytes, time and phase.
+            - The file is locked while appending, so the same file can collect the metrics of
+              all hosts of a playbook run to find the slowest requests.
+            - Implies O(collect_metrics=true).
+        required: false
+        type: path
+        version_added: "1.1.0"
+notes:
+    - When the task runs on the Ansible controller, delegated to V(localhost) or with the
+      V(local) connection, and the C(pocketbase) library is installed on the controller,
+      the module runs in the Ansible worker process of the task instead of being transferred
+      and executed with a new Python interpreter. Otherwise, or when the task is asynchronous,
+      it is executed on the target as usual, so files such as O(token_cache) and
+      O(metrics_file) are always read and written on the host the task runs on.
+"""
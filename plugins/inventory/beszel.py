@@ -0,0 +1,200 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+name: beszel
+
+short_description: Beszel systems inventory source.
+
+version_added: "1.1.0"
+
+description:
+    - Get inventory hosts from the systems registered on a Beszel hub.
+    - Uses a YAML configuration file ending with C(beszel.yml) or C(beszel.yaml).
+    - Each system is added as a host with its fields available as C(beszel_*) host variables,
+      for example C(beszel_status), C(beszel_os) and C(beszel_agent_version).
+
+author:
+    - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
+
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+    - ansible.builtin.constructed
+    - ansible.builtin.inventory_cache
+
+requirements:
+    - pocketbase
+
+options:
+    plugin:
+        description: Token that ensures this is a source file for the plugin.
+        required: true
+        type: str
+        choices:
+            - community.beszel.beszel
+    filter:
+        description:
+            - PocketBase filter expression evaluated by the Beszel hub to select the systems
+              to add to the inventory, for example V(status != 'paused').
+            - If not provided, all systems are added.
+        required: false
+        type: str
+    per_page:
+        description: Number of systems to request from the Beszel hub per page.
+        required: false
+        type: int
+        default: 500
+    hostnames:
+        description:
+            - Field of the system to use as the inventory hostname.
+            - The other field is set as C(ansible_host) when the fields differ.
+        required: false
+        type: str
+        default: name
+        choices:
+            - name
+            - host
+"""
+
+EXAMPLES = r"""
+---
+# beszel.yml
+plugin: community.beszel.beszel
+url: https://beszel.example.tld
+username: admin@example.com
+password: admin
+filter: status != 'paused'
+keyed_groups:
+  - key: beszel_status
+    prefix: status
+  - key: beszel_os
+    prefix: os
+  - key: beszel_agent_version
+    prefix: agent
+compose:
+  ansible_port: 22
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: ~/.cache/ansible/beszel
+cache_timeout: 3600
+"""
+
+from ansible.errors import AnsibleError
+from ansible.module_utils.basic import missing_required_lib
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    PocketBaseClient,
+    iter_records,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+)
+from ansible_collections.community.beszel.plugins.module_utils.system_utils import (
+    record_to_dict,
+    stringify_dates,
+)
+
+# Operating systems reported by Beszel agents in the os field of the system info
+SYSTEM_OS = {0: "linux", 1: "darwin", 2: "windows", 3: "freebsd"}
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+    NAME = "community.beszel.beszel"
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(
+            ("beszel.yml", "beszel.yaml")
+        )
+
+    def _get_systems(self) -> list:
+        """Get all systems matching the filter option from the Beszel hub.
+
+        Returns:
+            list: The systems, with dates converted to strings so that they
+                can be stored in the inventory cache.
+        """
+        if not HAS_POCKETBASE:
+            raise AnsibleError(missing_required_lib("pocketbase"))
+        params = {
+            option: self.get_option(option)
+            for option in pocketbase_argument_spec(module=False)
+        }
+        query_params = {"sort": "created"}
+        if self.get_option("filter"):
+            query_params["filter"] = self.get_option("filter")
+        try:
+            client_args = pocketbase_client_args(params)
+        except ValueError as e:
+            raise AnsibleError(str(e))
+        pocketbase_client = PocketBaseClient(**client_args)
+        try:
+            client = pocketbase_client.authenticate()
+            return [
+                stringify_dates(record_to_dict(record))
+                for record in iter_records(
+                    client.collection("systems"),
+                    query_params,
+                    self.get_option("per_page"),
+                )
+            ]
+        except Exception as e:
+            raise AnsibleError(f"Failed to get systems from Beszel hub: {e}")
+        finally:
+            pocketbase_client.close()
+
+    def _populate(self, systems: list):
+        hostname_field = self.get_option("hostnames")
+        strict = self.get_option("strict")
+        for system in systems:
+            hostname = self.inventory.add_host(system[hostname_field])
+            info = system.get("info") or {}
+            host_vars = {
+                f"beszel_{key}": value
+                for key, value in system.items()
+                if key not in ("collection_id", "collection_name", "expand")
+            }
+            host_vars["beszel_os"] = SYSTEM_OS.get(info.get("os"))
+            host_vars["beszel_agent_version"] = info.get("v")
+            if system["host"] != hostname:
+                host_vars["ansible_host"] = system["host"]
+            for key, value in host_vars.items():
+                self.inventory.set_variable(hostname, key, value)
+            self._set_composite_vars(
+                self.get_option("compose"), host_vars, hostname, strict=strict
+            )
+            self._add_host_to_composed_groups(
+                self.get_option("groups"), host_vars, hostname, strict=strict
+            )
+            self._add_host_to_keyed_groups(
+                self.get_option("keyed_groups"), host_vars, hostname, strict=strict
+            )
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache=cache)
+        self._read_config_data(path)
+        if self.get_option("per_page") < 1:
+            raise AnsibleError("per_page must be at least 1.")
+
+        cache_key = self.get_cache_key(path)
+        # Only read from the cache when it is enabled and the inventory is not
+        # being refreshed, and only write to it when it is enabled
+        use_cache = self.get_option("cache") and cache
+        update_cache = self.get_option("cache") and not cache
+
+        systems = None
+        if use_cache:
+            try:
+                systems = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+        if systems is None:
+            systems = self._get_systems()
+        if update_cache:
+            self._cache[cache_key] = systems
+
+        self._populate(systems)
@@ -0,0 +1,180 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+name: systems
+
+short_description: Look up Beszel systems from the controller.
+
+version_added: "1.1.0"
+
+description:
+    - Get Beszel systems by name without running a module on the target hosts.
+    - All systems matching O(filter) are fetched with a single listing of the Beszel hub.
+    - Ansible runs the lookups of each host and task in their own worker process, and the
+      listing is only memoized within that process, for example for the items of a loop.
+      To share the systems between the hosts and tasks of a play, set O(systems_cache).
+
+author:
+    - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
+
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+
+requirements:
+    - pocketbase
+
+options:
+    _terms:
+        description:
+            - Names of the systems to look up.
+            - If not provided, all systems are returned.
+        required: false
+        type: list
+        elements: str
+    filter:
+        description:
+            - PocketBase filter expression evaluated by the Beszel hub to select the systems
+              that can be looked up, for example V(status != 'paused').
+            - If not provided, all systems can be looked up.
+        required: false
+        type: str
+    refresh:
+        description:
+            - Whether to ignore the memoized systems and list them from the Beszel hub again.
+            - With O(systems_cache), the cached systems are refreshed even within
+              O(systems_cache_ttl).
+        required: false
+        type: bool
+        default: false
+    systems_cache:
+        description:
+            - Path of a file on the Ansible controller to keep a copy of the systems in, such as
+              V(~/.cache/community.beszel/systems.json), shared by the lookups of all hosts
+              and tasks.
+            - The systems are kept per O(url), O(username) and O(filter). Only the systems updated
+              since the previous refresh are requested, like with the C(systems_cache) option of
+              the M(community.beszel.system_info) module, which can share the file.
+            - O(filter) should then only use the fields of the systems, as systems which stop
+              matching it are only detected by counting them.
+        required: false
+        type: path
+    systems_cache_ttl:
+        description:
+            - Number of seconds after a refresh of O(systems_cache) during which the cached
+              systems are returned without contacting the Beszel hub.
+            - With the default V(0), the cache is refreshed by every lookup, which costs two
+              small requests when no system changed.
+        required: false
+        type: float
+        default: 0
+"""
+
+EXAMPLES = r"""
+---
+- name: Only run on hosts that are registered and up in Beszel
+  ansible.builtin.debug:
+    msg: "{{ inventory_hostname }} is up"
+  when: >-
+    (lookup('community.beszel.systems', inventory_hostname,
+            url='https://beszel.example.tld', username='admin@example.com',
+            password=beszel_password).status | default('')) == 'up'
+
+- name: Get the names of all Beszel systems that are down
+  ansible.builtin.debug:
+    msg: >-
+      {{ query('community.beszel.systems', filter="status = 'down'",
+               url='https://beszel.example.tld', username='admin@example.com',
+               password=beszel_password) | map(attribute='name') }}
+"""
+
+RETURN = r"""
+---
+_raw:
+    description:
+        - The systems in the same order as the names.
+        - An empty dictionary is returned for names that do not match a system.
+    type: list
+    elements: dict
+"""
+
+from ansible.errors import AnsibleError
+from ansible.module_utils.basic import missing_required_lib
+from ansible.plugins.lookup import LookupBase
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    iter_records,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+)
+from ansible_collections.community.beszel.plugins.module_utils.system_utils import (
+    SystemsCache,
+    index_systems,
+    record_to_dict,
+    stringify_dates,
+)
+from ansible_collections.community.beszel.plugins.plugin_utils.pocketbase_action import (
+    get_client,
+)
+
+# Listed systems shared by the lookups of the worker process, such as the
+# lookups of the items of a loop
+_SYSTEMS = {}
+
+
+class LookupModule(LookupBase):
+    def _get_systems(self) -> tuple:
+        """Get the systems matching the filter option, listing them at most once per process.
+
+        Returns:
+            tuple: The systems sorted by creation date and the systems keyed by name.
+        """
+        params = {
+            option: self.get_option(option)
+            for option in pocketbase_argument_spec(module=False)
+        }
+        client_args = pocketbase_client_args(params)
+        query_params = {"sort": "created"}
+        if self.get_option("filter"):
+            query_params["filter"] = self.get_option("filter")
+        key = (
+            client_args["url"].rstrip("/"),
+            client_args["username"],
+            self.get_option("filter"),
+        )
+        if key not in _SYSTEMS or self.get_option("refresh"):
+            client = get_client(client_args)
+            if self.get_option("systems_cache"):
+                cache = SystemsCache(
+                    self.get_option("systems_cache"),
+                    client_args["url"],
+                    client_args["username"],
+                    self.get_option("filter"),
+                )
+                if self.get_option("refresh"):
+                    cache.invalidate()
+                records = cache.get(client, self.get_option("systems_cache_ttl"))
+            else:
+                records = iter_records(client.collection("systems"), query_params)
+            systems = [stringify_dates(record_to_dict(record)) for record in records]
+            _SYSTEMS[key] = (systems, index_systems(systems))
+        return _SYSTEMS[key]
+
+    def run(self, terms, variables=None, **kwargs):
+        self.set_options(var_options=variables, direct=kwargs)
+        if not HAS_POCKETBASE:
+            raise AnsibleError(missing_required_lib("pocketbase"))
+
+        try:
+            systems, index = self._get_systems()
+        except Exception as e:
+            raise AnsibleError(f"Failed to get systems from Beszel hub: {e}")
+
+        if not terms:
+            return systems
+        return [index.get(name, {}) for name in terms]
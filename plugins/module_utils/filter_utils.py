@@ -0,0 +1,151 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import re
+
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Union
+
+# Maximum number of values combined in a single filter expression
+FILTER_CHUNK_SIZE = 50
+
+# Comparison of a field to a quoted literal, as built by equals or bind
+SIMPLE_COMPARISON = re.compile(r"^[\w.]+(?:=|!=|>=|<=|>|<)'(?:[^'\\]|\\.)*'$")
+
+
+def format_datetime(value: datetime) -> str:
+    """Format a datetime the way PocketBase stores dates, so that they can be compared.
+
+    Args:
+        value (datetime): The datetime. Naive datetimes are assumed to be in UTC.
+
+    Returns:
+        str: The date in UTC, for example 2025-08-30 10:00:00.000Z.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d %H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+def quote(value) -> str:
+    """Convert a value to a literal of a PocketBase filter expression.
+
+    Strings are single quoted, with single quotes escaped by a backslash,
+    which is the only escape sequence of PocketBase filter strings.
+
+    Args:
+        value (Union[str, bool, int, float, datetime, None]): The value.
+
+    Returns:
+        str: The literal.
+
+    Raises:
+        ValueError: If the value is a string ending with a backslash, which
+            PocketBase would read as an escaped closing quote.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        value = format_datetime(value)
+    value = str(value)
+    if value.endswith("\\"):
+        raise ValueError(
+            f"Value '{value}' cannot be used in a filter as it ends with a backslash."
+        )
+    return "'{0}'".format(value.replace("'", "\\'"))
+
+
+def bind(expression: str, **params) -> str:
+    """Bind parameters to a filter expression, like the filter method of the PocketBase SDKs.
+
+    Args:
+        expression (str): The filter expression, with {:name} placeholders.
+        **params: The values of the placeholders, quoted with quote.
+
+    Returns:
+        str: The filter expression.
+
+    Raises:
+        KeyError: If a placeholder has no value.
+    """
+    return re.sub(
+        r"\{:(\w+)\}", lambda match: quote(params[match.group(1)]), expression
+    )
+
+
+def equals(field: str, value) -> str:
+    """Build an exact match filter, which the hub can look up with an index of the field.
+
+    Args:
+        field (str): The field.
+        value (Union[str, bool, int, float, datetime, None]): The value.
+
+    Returns:
+        str: The filter expression.
+    """
+    return f"{field}={quote(value)}"
+
+
+def any_of(field: str, values: Iterable) -> str:
+    """Build a filter matching any of the values, the equivalent of an SQL IN.
+
+    PocketBase filters have no IN operator, so the exact matches are combined
+    with ORs, which SQLite still resolves with one index lookup per value.
+
+    Args:
+        field (str): The field.
+        values (Iterable): The values. Duplicates are only matched once.
+
+    Returns:
+        str: The filter expression, which matches nothing if there are no values.
+    """
+    expressions = list(dict.fromkeys(equals(field, value) for value in values))
+    if not expressions:
+        return "false"
+    return " || ".join(expressions)
+
+
+def chunked_any_of(
+    field: str, values: Iterable, chunk_size: int = FILTER_CHUNK_SIZE
+) -> Iterator[str]:
+    """Build filters matching any of the values, at most chunk_size values per filter.
+
+    Long filters are split so that the query strings stay within the URL length
+    limits of the hub and of the proxies in front of it.
+
+    Args:
+        field (str): The field.
+        values (Iterable): The values. Duplicates are only matched once.
+        chunk_size (int): The maximum number of values per filter.
+
+    Yields:
+        str: The filter expressions.
+    """
+    values = list(dict.fromkeys(values))
+    for start in range(0, len(values), chunk_size):
+        end = start + chunk_size
+        yield any_of(field, values[start:end])
+
+
+def all_of(*expressions: Union[str, None]) -> str:
+    """Combine filter expressions that must all match.
+
+    Args:
+        *expressions (Union[str, None]): The filter expressions. Empty ones are
+            skipped, and the others are parenthesized unless they are a simple
+            comparison, such as the ones built by equals.
+
+    Returns:
+        str: The filter expression, which is empty if all expressions are empty.
+    """
+    parts: List[str] = [expression for expression in expressions if expression]
+    if len(parts) == 1:
+        return parts[0]
+    return " && ".join(
+        expression if SIMPLE_COMPARISON.match(expression) else f"({expression})"
+        for expression in parts
+    )
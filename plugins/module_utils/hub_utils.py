@@ -0,0 +1,183 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    metrics_phase,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    ModuleExit,
+    pocketbase_client_args,
+)
+
+# Maximum number of hubs a module runs against at the same time
+MAX_HUB_WORKERS = 16
+
+
+def add_hubs_argument_spec(module_args: dict) -> dict:
+    """Add the hubs option to the argument spec of a module.
+
+    The url, username and password options become optional, as they are set
+    per hub when the hubs option is provided. The username and password then
+    serve as the defaults of the hubs.
+
+    Args:
+        module_args (dict): The argument spec, including pocketbase_argument_spec.
+
+    Returns:
+        dict: The constraints between the options to create the module with.
+    """
+    for option in ("url", "username", "password"):
+        module_args[option] = dict(module_args[option], required=False)
+    module_args["hubs"] = dict(
+        type="list",
+        required=False,
+        elements="dict",
+        options=dict(
+            name=dict(type="str", required=False),
+            url=dict(type="str", required=True),
+            username=dict(type="str", required=False),
+            password=dict(type="str", required=False, no_log=True),
+        ),
+    )
+    return dict(
+        required_one_of=[("url", "hubs")],
+        mutually_exclusive=[("url", "hubs")],
+        required_by=dict(url=("username", "password")),
+    )
+
+
+class HubModule:
+    """Stand-in for the module running against one of the hubs of its hubs option.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        name (str): The name of the hub.
+        params (dict): The module parameters, with the connection options of the hub.
+    """
+
+    def __init__(self, module, name: str, params: dict):
+        self.module = module
+        self.name = name
+        self.params = params
+        self.check_mode = module.check_mode
+        self._diff = module._diff
+
+    def warn(self, warning: str):
+        self.module.warn(f"{self.name}: {warning}")
+
+    def atomic_move(self, src: str, dest: str):
+        self.module.atomic_move(src, dest)
+
+    def exit_json(self, **kwargs):
+        raise ModuleExit(kwargs)
+
+    def fail_json(self, msg: str, **kwargs):
+        raise ModuleExit(dict(kwargs, failed=True, msg=msg))
+
+
+def hub_params(params: dict) -> List[Tuple[str, dict]]:
+    """Get the module parameters to run a module with against each of its hubs.
+
+    Args:
+        params (dict): The module parameters validated against add_hubs_argument_spec.
+
+    Returns:
+        List[Tuple[str, dict]]: The name of each hub, which defaults to its URL,
+            and the module parameters with the connection options of the hub.
+
+    Raises:
+        ValueError: If a hub has no username or password, or if two hubs
+            have the same name.
+    """
+    hubs = []
+    for hub in params["hubs"]:
+        name = hub["name"] or hub["url"]
+        username = hub["username"] or params["username"]
+        password = hub["password"] or params["password"]
+        if username is None or password is None:
+            raise ValueError(f"Username and password are required for hub '{name}'.")
+        hubs.append(
+            (
+                name,
+                dict(
+                    params,
+                    hubs=None,
+                    url=hub["url"],
+                    username=username,
+                    password=password,
+                ),
+            )
+        )
+    names = [hub[0] for hub in hubs]
+    duplicates = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicates:
+        raise ValueError(f"Hub names must be unique: {', '.join(duplicates)}.")
+    return hubs
+
+
+def run_on_hubs(module, run_hub: Callable) -> List[Tuple[str, dict]]:
+    """Run a module against each of its hubs concurrently.
+
+    Each hub is run in a thread with its own client, so the time taken is
+    the one of the slowest hub rather than the sum of all hubs. A failure of
+    a hub does not stop the others.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        run_hub (Callable): The function running the module against a single hub,
+            taking the module and an authenticated client, or None to create one,
+            and exiting the module.
+
+    Returns:
+        List[Tuple[str, dict]]: The name and the result of each hub, in the order
+            of the hubs option. Failed hubs have the failed and msg keys set.
+    """
+    try:
+        hubs = hub_params(module.params)
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+
+    # Modules running on the controller share the clients of the hubs
+    # between tasks, like the client of the url option
+    get_client = getattr(module, "get_client", None)
+
+    def run(name: str, params: dict) -> dict:
+        hub_module = HubModule(module, name, params)
+        try:
+            client = None
+            if get_client is not None:
+                client = get_client(pocketbase_client_args(params))
+            run_hub(hub_module, client)
+        except ModuleExit as e:
+            return e.result
+        except Exception as e:
+            return dict(failed=True, msg=str(e))
+        return dict(failed=True, msg="The module did not exit.")
+
+    # Each hub thread attributes its requests to its own phases, whose times
+    # add up across the hubs, so the hubs phase gives the time taken by all hubs
+    with metrics_phase("hubs"):
+        with ThreadPoolExecutor(max_workers=min(MAX_HUB_WORKERS, len(hubs))) as pool:
+            futures = [pool.submit(run, name, params) for name, params in hubs]
+            return [(hub[0], future.result()) for hub, future in zip(hubs, futures)]
+
+
+def hub_summary(name: str, result: dict, keys: Tuple[str, ...] = ()) -> dict:
+    """Summarise the result of a module run against one hub for the hubs return value.
+
+    Args:
+        name (str): The name of the hub.
+        result (dict): The result of the module run against the hub.
+        keys (Tuple[str, ...]): Other keys of the result to include.
+
+    Returns:
+        dict: The name of the hub, whether it failed, its message and the other keys.
+    """
+    summary = dict(
+        name=name, failed=bool(result.get("failed")), msg=result.get("msg", "")
+    )
+    summary.update((key, result[key]) for key in keys if key in result)
+    return summary
@@ -0,0 +1,379 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import fcntl
+import json
+import os
+import re
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from importlib.util import find_spec
+from typing import List, Union
+
+HAS_OPENTELEMETRY = find_spec("opentelemetry") is not None
+
+# Phase of the requests sent outside of any phase of a module
+DEFAULT_PHASE = "other"
+
+# The metrics of the running module, if it collects metrics. Modules run one
+# at a time per process, so the clients of a module, including the clients
+# shared with previous tasks, record their requests into it
+_ACTIVE = None
+
+
+def endpoint(method: str, path: str) -> str:
+    """Get the endpoint of a request, with the record ID replaced by :id.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The path of the request.
+
+    Returns:
+        str: The endpoint, for example GET /api/collections/systems/records/:id.
+    """
+    return "{0} {1}".format(method, re.sub(r"(/records/)[^/]+$", r"\1:id", path))
+
+
+class RequestMetrics:
+    """Record the HTTP requests sent to the Beszel hub during a module run.
+
+    Requests are attributed to the current phase of the module, such as the
+    login or the lookup of the existing systems, so that the time spent in each
+    phase can be told apart. Each thread has its own current phase, so the
+    requests of modules running against many hubs at once are attributed to
+    the phase of the hub which sent them.
+
+    Args:
+        module_name (str): The name of the module, such as system.
+    """
+
+    def __init__(self, module_name: str):
+        self.module_name = module_name
+        self.started = time.time()
+        self.start = time.monotonic()
+        self.phases = {}
+        self.calls: List[dict] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def current_phase(self) -> str:
+        """The phase of the requests sent by the current thread."""
+        return getattr(self._local, "phase", DEFAULT_PHASE)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Attribute the requests sent within the context to a phase.
+
+        Args:
+            name (str): The name of the phase.
+        """
+        previous = self.current_phase
+        self._local.phase = name
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            # The same phase may run in several threads at once, in which case
+            # its time is the sum of the time spent in each thread
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + time.monotonic() - start
+            self._local.phase = previous
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        status: Union[int, None],
+        bytes_sent: int,
+        bytes_received: int,
+        started: float,
+        elapsed: float,
+        retry: bool = False,
+        error: Union[str, None] = None,
+    ):
+        """Record an HTTP request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the request.
+            status (Union[int, None]): The response status, or None if no response
+                was received.
+            bytes_sent (int): The size of the request body.
+            bytes_received (int): The size of the response body.
+            started (float): The timestamp the request was sent at.
+            elapsed (float): The number of seconds until the response was received.
+            retry (bool): Whether the request is a retry of a failed request.
+            error (Union[str, None]): The error raised instead of receiving a response.
+        """
+        call = dict(
+            endpoint=endpoint(method, path),
+            method=method,
+            path=path,
+            status=status,
+            bytes_sent=bytes_sent,
+            bytes_received=bytes_received,
+            started=started,
+            elapsed=elapsed,
+            retry=retry,
+            error=error,
+            phase=self.current_phase,
+        )
+        with self._lock:
+            self.calls.append(call)
+
+    def summary(self) -> dict:
+        """Aggregate the recorded requests.
+
+        Returns:
+            dict: The number of requests, retries and errors, the bytes sent and
+                received, the total time of the requests and of the module run,
+                and the same per phase and per endpoint.
+        """
+
+        def aggregate(calls):
+            return dict(
+                requests=len(calls),
+                retries=sum(1 for call in calls if call["retry"]),
+                errors=sum(
+                    1
+                    for call in calls
+                    if call["error"] is not None or call["status"] >= 400
+                ),
+                bytes_sent=sum(call["bytes_sent"] for call in calls),
+                bytes_received=sum(call["bytes_received"] for call in calls),
+                request_time=round(sum(call["elapsed"] for call in calls), 6),
+            )
+
+        def group(key):
+            groups = {}
+            for call in self.calls:
+                groups.setdefault(call[key], []).append(call)
+            return groups
+
+        phase_calls = group("phase")
+        phases = dict(
+            (
+                name,
+                dict(
+                    aggregate(phase_calls.get(name, [])),
+                    elapsed=round(self.phases[name], 6)
+                    if name in self.phases
+                    else None,
+                ),
+            )
+            for name in dict.fromkeys(list(self.phases) + list(phase_calls))
+        )
+        endpoints = dict(
+            (name, aggregate(calls)) for name, calls in group("endpoint").items()
+        )
+        return dict(
+            aggregate(self.calls),
+            elapsed=round(time.monotonic() - self.start, 6),
+            phases=phases,
+            endpoints=endpoints,
+        )
+
+    def write(self, path: str, summary: dict):
+        """Append the metrics of the module run to a JSON lines file.
+
+        The file is locked while appending, so that the metrics of many hosts
+        can be written to the same file.
+
+        Args:
+            path (str): The path of the file.
+            summary (dict): The summary of the metrics.
+        """
+        line = json.dumps(
+            dict(
+                time=datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                module=self.module_name,
+                pid=os.getpid(),
+                metrics=summary,
+                calls=self.calls,
+            )
+        )
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.write(line + "\n")
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def export_spans(self):
+        """Record the module run and its requests as OpenTelemetry spans.
+
+        The spans are exported by the tracer provider configured in the process,
+        and dropped if there is none.
+        """
+        from opentelemetry import trace
+
+        tracer = trace.get_tracer("community.beszel")
+        root = tracer.start_span(
+            f"community.beszel.{self.module_name}",
+            start_time=int(self.started * 1e9),
+        )
+        context = trace.set_span_in_context(root)
+        for call in self.calls:
+            attributes = {
+                "http.request.method": call["method"],
+                "url.path": call["path"],
+                "beszel.phase": call["phase"],
+                "beszel.retry": call["retry"],
+            }
+            if call["status"] is not None:
+                attributes["http.response.status_code"] = call["status"]
+            if call["error"] is not None:
+                attributes["error.type"] = call["error"]
+            span = tracer.start_span(
+                call["endpoint"],
+                context=context,
+                kind=trace.SpanKind.CLIENT,
+                attributes=attributes,
+                start_time=int(call["started"] * 1e9),
+            )
+            span.end(end_time=int((call["started"] + call["elapsed"]) * 1e9))
+        root.end()
+
+
+def start_metrics(module, module_name: str) -> Union[RequestMetrics, None]:
+    """Start collecting the metrics of a module run, if enabled by its parameters.
+
+    The metrics are added to the result of the module under the metrics key
+    when it exits or fails, and exported to the metrics_file and to OpenTelemetry.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        module_name (str): The name of the module, such as system.
+
+    Returns:
+        Union[RequestMetrics, None]: The metrics, or None if they are not collected.
+    """
+    global _ACTIVE
+    params = module.params
+    if not (params.get("collect_metrics") or params.get("metrics_file")):
+        _ACTIVE = None
+        return None
+    metrics = _ACTIVE = RequestMetrics(module_name)
+    exit_json, fail_json = module.exit_json, module.fail_json
+
+    def finish(result: dict):
+        global _ACTIVE
+        if _ACTIVE is not metrics:
+            return
+        _ACTIVE = None
+        result["metrics"] = metrics.summary()
+        try:
+            if params.get("metrics_file"):
+                metrics.write(params["metrics_file"], result["metrics"])
+            if HAS_OPENTELEMETRY:
+                metrics.export_spans()
+        except Exception as e:
+            module.warn(f"Failed to export metrics: {e}")
+
+    def exit_with_metrics(**kwargs):
+        finish(kwargs)
+        exit_json(**kwargs)
+
+    def fail_with_metrics(msg: str, **kwargs):
+        finish(kwargs)
+        fail_json(msg=msg, **kwargs)
+
+    module.exit_json = exit_with_metrics
+    module.fail_json = fail_with_metrics
+    return metrics
+
+
+@contextmanager
+def metrics_phase(name: str):
+    """Attribute the requests sent within the context to a phase of the running module.
+
+    Does nothing if the module does not collect metrics.
+
+    Args:
+        name (str): The name of the phase, such as login, lookup or write.
+    """
+    if _ACTIVE is None:
+        yield
+    else:
+        with _ACTIVE.phase(name):
+            yield
+
+
+class MetricsTransport:
+    """HTTP transport recording the requests into the metrics of the running module.
+
+    Implements the interfaces of httpx.BaseTransport and httpx.AsyncBaseTransport
+    without subclassing them, so that httpx is only imported when the transport
+    is used. Requests are passed through untouched when no module collects metrics.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    @staticmethod
+    def _attempt(request) -> int:
+        # The retry transport sends the same request object again, so count
+        # the attempts in its extensions
+        attempt = request.extensions.get("beszel_attempt", 0)
+        request.extensions["beszel_attempt"] = attempt + 1
+        return attempt
+
+    @staticmethod
+    def _record(metrics, request, attempt, started, start, response=None, error=None):
+        metrics.record(
+            request.method,
+            request.url.path,
+            None if response is None else response.status_code,
+            len(request.content),
+            0 if response is None else len(response.content),
+            started,
+            time.monotonic() - start,
+            retry=attempt > 0,
+            error=None if error is None else type(error).__name__,
+        )
+
+    def handle_request(self, request):
+        metrics = _ACTIVE
+        if metrics is None:
+            return self.transport.handle_request(request)
+        attempt = self._attempt(request)
+        started, start = time.time(), time.monotonic()
+        try:
+            response = self.transport.handle_request(request)
+            response.read()
+        except Exception as e:
+            self._record(metrics, request, attempt, started, start, error=e)
+            raise
+        self._record(metrics, request, attempt, started, start, response=response)
+        return response
+
+    async def handle_async_request(self, request):
+        metrics = _ACTIVE
+        if metrics is None:
+            return await self.transport.handle_async_request(request)
+        attempt = self._attempt(request)
+        started, start = time.time(), time.monotonic()
+        try:
+            response = await self.transport.handle_async_request(request)
+            await response.aread()
+        except Exception as e:
+            self._record(metrics, request, attempt, started, start, error=e)
+            raise
+        self._record(metrics, request, attempt, started, start, response=response)
+        return response
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.transport.close()
+
+    async def aclose(self):
+        await self.transport.aclose()
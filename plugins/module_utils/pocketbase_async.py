@@ -0,0 +1,349 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import asyncio
+import time
+
+from typing import Awaitable, Callable, Iterable, List, Union
+
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    MetricsTransport,
+    metrics_phase,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_H2,
+    HAS_POCKETBASE,
+    IDEMPOTENT_METHODS,
+    TOKEN_EXPIRY_THRESHOLD,
+    HubLimiter,
+    RetryTransport,
+    TokenCache,
+    token_expires_at,
+)
+
+try:
+    import httpx
+    from pocketbase.errors import ClientResponseError
+    from pocketbase.models import Record
+except ImportError:
+    httpx = None
+    ClientResponseError = None
+    Record = None
+
+
+class AsyncRetryTransport(
+    RetryTransport, httpx.AsyncBaseTransport if HAS_POCKETBASE else object
+):
+    """Asynchronous counterpart of RetryTransport, also applying the hub limits."""
+
+    def __init__(
+        self,
+        transport,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30,
+        limiter: Union[HubLimiter, None] = None,
+    ):
+        super(AsyncRetryTransport, self).__init__(
+            transport, retries, backoff, max_backoff
+        )
+        self.limiter = limiter
+
+    async def _send(self, request):
+        if self.limiter is None:
+            response = await self.transport.handle_async_request(request)
+            await response.aread()
+            return response
+        # Waiting for the shared limits blocks on file locks, so wait in a
+        # thread to let the other requests make progress meanwhile
+        loop = asyncio.get_running_loop()
+        fd = await loop.run_in_executor(None, self.limiter.acquire)
+        try:
+            response = await self.transport.handle_async_request(request)
+            await response.aread()
+            return response
+        finally:
+            self.limiter.release(fd)
+
+    async def handle_async_request(self, request):
+        idempotent = request.method in IDEMPOTENT_METHODS
+        # Read the body so that it can be sent again
+        await request.aread()
+        attempt = 0
+        while True:
+            try:
+                response = await self._send(request)
+            except self.retry_always_errors + self.retry_idempotent_errors as e:
+                delay = self._retry_delay(attempt, idempotent, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(attempt, idempotent, response=response)
+                if delay is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class AsyncPocketBaseClient:
+    """Asynchronous client for the PocketBase API of the Beszel hub.
+
+    Takes the same arguments as PocketBaseClient, so it can be created from
+    pocketbase_client_args. Records are returned as PocketBase Record objects,
+    like the synchronous client does.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        timeout: float = 120,
+        connect_timeout: float = 10,
+        retries: int = 3,
+        retry_backoff: float = 0.5,
+        retry_max_backoff: float = 30,
+        rate_limit: Union[float, None] = None,
+        max_in_flight: Union[int, None] = None,
+        token_cache: Union[str, None] = None,
+        pool_size: int = 10,
+        http2: bool = False,
+        token: Union[str, None] = None,
+    ):
+        if not HAS_POCKETBASE:
+            raise ImportError("pocketbase library is required but not available.")
+        self.url = url
+        self.username = username
+        self.password = password
+        self.token_cache = TokenCache(token_cache) if token_cache else None
+        self.token = token
+        limiter = None
+        if rate_limit or max_in_flight:
+            limiter = HubLimiter(url, rate_limit, max_in_flight)
+        transport = AsyncRetryTransport(
+            MetricsTransport(
+                httpx.AsyncHTTPTransport(
+                    # Fall back to HTTP/1.1 without h2, like PocketBaseClient
+                    http2=http2 and HAS_H2,
+                    limits=httpx.Limits(
+                        max_connections=pool_size, max_keepalive_connections=pool_size
+                    ),
+                )
+            ),
+            retries,
+            retry_backoff,
+            retry_max_backoff,
+            limiter,
+        )
+        self.http_client = httpx.AsyncClient(
+            base_url=url.rstrip("/"),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            transport=transport,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled connections to the Beszel hub."""
+        await self.http_client.aclose()
+
+    async def send(
+        self,
+        method: str,
+        path: str,
+        params: Union[dict, None] = None,
+        body: Union[dict, None] = None,
+    ):
+        """Send a request to the PocketBase API.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the API endpoint.
+            params (Union[dict, None]): The query parameters.
+            body (Union[dict, None]): The JSON body.
+
+        Returns:
+            Any: The decoded JSON response, or None if the response has no body.
+        """
+        headers = {"Authorization": self.token} if self.token else None
+        try:
+            response = await self.http_client.request(
+                method, path, params=params, json=body, headers=headers
+            )
+        except Exception as e:
+            raise ClientResponseError(
+                f"General request error. Original error: {e}", original_error=e
+            )
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        if response.status_code >= 400:
+            raise ClientResponseError(
+                f"Response error. Status code:{response.status_code}",
+                url=str(response.url),
+                status=response.status_code,
+                data=data,
+            )
+        return data
+
+    async def _authenticate(self, collection: str, auth_type: str):
+        if self.token is not None:
+            # A token about to expire is replaced, like the cached tokens
+            if token_expires_at(self.token) - TOKEN_EXPIRY_THRESHOLD > time.time():
+                return self
+            self.token = None
+        cache_key = TokenCache.key(self.url, self.username, auth_type)
+        if self.token_cache is not None:
+            self.token = self.token_cache.get(cache_key)
+            if self.token is not None:
+                return self
+        try:
+            data = await self.send(
+                "POST",
+                f"/api/collections/{collection}/auth-with-password",
+                body={"identity": self.username, "password": self.password},
+            )
+        except Exception as e:
+            raise Exception(f"Authentication failed: {e}")
+        self.token = data["token"]
+        if self.token_cache is not None:
+            self.token_cache.set(cache_key, self.token)
+        return self
+
+    async def authenticate(self):
+        """Authenticate with PocketBase API using admin auth."""
+        with metrics_phase("login"):
+            return await self._authenticate("_superusers", "admin")
+
+    async def authenticate_user(self):
+        """Authenticate with PocketBase API using user auth."""
+        with metrics_phase("login"):
+            return await self._authenticate("users", "user")
+
+    async def get_list(
+        self,
+        collection: str,
+        page: int = 1,
+        per_page: int = 30,
+        query_params: Union[dict, None] = None,
+    ) -> dict:
+        """Get a page of records of a collection.
+
+        Returns:
+            dict: The page, with the records in the items key.
+        """
+        params = dict(query_params or {}, page=page, perPage=per_page)
+        data = await self.send(
+            "GET", f"/api/collections/{collection}/records", params=params
+        )
+        data["items"] = [Record(item) for item in data.get("items", [])]
+        return data
+
+    async def get_one(
+        self, collection: str, record_id: str, query_params: Union[dict, None] = None
+    ):
+        """Get a record of a collection by ID."""
+        return Record(
+            await self.send(
+                "GET",
+                f"/api/collections/{collection}/records/{record_id}",
+                params=query_params,
+            )
+        )
+
+    async def create(self, collection: str, body_params: dict):
+        """Create a record in a collection."""
+        return Record(
+            await self.send(
+                "POST", f"/api/collections/{collection}/records", body=body_params
+            )
+        )
+
+    async def update(self, collection: str, record_id: str, body_params: dict):
+        """Update a record of a collection."""
+        return Record(
+            await self.send(
+                "PATCH",
+                f"/api/collections/{collection}/records/{record_id}",
+                body=body_params,
+            )
+        )
+
+    async def delete(self, collection: str, record_id: str):
+        """Delete a record of a collection."""
+        await self.send("DELETE", f"/api/collections/{collection}/records/{record_id}")
+
+
+async def gather_bounded(
+    awaitables: Iterable[Awaitable],
+    concurrency: int,
+    return_exceptions: bool = False,
+) -> list:
+    """Await many awaitables with at most concurrency of them running at a time.
+
+    Args:
+        awaitables (Iterable[Awaitable]): The awaitables, for example coroutines.
+        concurrency (int): The maximum number of awaitables running at a time.
+        return_exceptions (bool): Whether to return exceptions as results instead
+            of raising the first one.
+
+    Returns:
+        list: The results in the same order as the awaitables.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(awaitable):
+        async with semaphore:
+            return await awaitable
+
+    return await asyncio.gather(
+        *(bounded(awaitable) for awaitable in awaitables),
+        return_exceptions=return_exceptions,
+    )
+
+
+def run_concurrently(
+    client_args: dict,
+    operations: List[Callable[[AsyncPocketBaseClient], Awaitable]],
+    concurrency: int = 10,
+    token: Union[str, None] = None,
+    auth_type: str = "admin",
+) -> list:
+    """Run operations concurrently from synchronous code.
+
+    Args:
+        client_args (dict): The keyword arguments for AsyncPocketBaseClient,
+            as returned by pocketbase_client_args.
+        operations (List[Callable[[AsyncPocketBaseClient], Awaitable]]): Functions
+            taking the authenticated client and returning the awaitable to run.
+        concurrency (int): The maximum number of operations running at a time.
+        token (Union[str, None]): A token of an already authenticated client to
+            reuse instead of logging in again.
+        auth_type (str): Either admin or user.
+
+    Returns:
+        list: The result, or the exception raised, of each operation in order.
+    """
+
+    async def run():
+        async with AsyncPocketBaseClient(token=token, **client_args) as client:
+            if auth_type == "user":
+                await client.authenticate_user()
+            else:
+                await client.authenticate()
+            return await gather_bounded(
+                (operation(client) for operation in operations),
+                concurrency,
+                return_exceptions=True,
+            )
+
+    return asyncio.run(run())
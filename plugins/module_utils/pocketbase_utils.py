@@ -1,49 +1,664 @@
 # Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
 # GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
-try:
-    from pocketbase import PocketBase
-    from pocketbase.errors import ClientResponseError
+import base64
+import fcntl
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
 
-    HAS_POCKETBASE = True
-except ImportError:
-    HAS_POCKETBASE = False
-    PocketBase = None
-    ClientResponseError = None
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from importlib.util import find_spec
+from typing import Tuple, Union
+
+from ansible.module_utils.basic import env_fallback
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    MetricsTransport,
+    metrics_phase,
+)
+
+# Importing the pocketbase library and its httpx dependency takes longer than
+# the rest of a module run when the hub does not have to be contacted, for
+# example when the module fails validating its arguments, so they are only
+# looked up here and imported when the first client is created
+HAS_POCKETBASE = find_spec("pocketbase") is not None and find_spec("httpx") is not None
+HAS_H2 = find_spec("h2") is not None
+
+# Cached tokens expiring within this many seconds are not reused
+TOKEN_EXPIRY_THRESHOLD = 60
+
+# Response statuses which are retried for any request method, as the hub did
+# not process the request
+RETRY_ALWAYS_STATUSES = frozenset((429, 503))
+# Response statuses which are only retried for idempotent requests, as the
+# request may have reached the hub
+RETRY_IDEMPOTENT_STATUSES = frozenset((502, 504))
+IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+
+def retry_errors() -> Tuple[tuple, tuple]:
+    """Get the httpx errors which are retried.
+
+    Returns:
+        Tuple[tuple, tuple]: The errors raised before the request was sent, so
+            retried for any request method, and the errors raised while waiting
+            for the response, such as a connection reset, only retried for
+            idempotent requests.
+    """
+    import httpx
+
+    return (
+        (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout),
+        (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError),
+    )
+
+
+def pocketbase_argument_spec(module: bool = True) -> dict:
+    """Get the argument spec shared by all modules that talk to the Beszel hub.
+
+    Args:
+        module (bool): Whether to include the options only documented for
+            modules, such as collect_metrics, which lookup and inventory
+            plugins do not have.
+
+    Returns:
+        dict: The shared argument spec.
+    """
+    argument_spec = dict(
+        url=dict(type="str", required=True),
+        username=dict(type="str", required=True),
+        password=dict(type="str", required=True, no_log=True),
+        timeout=dict(type="float", required=False, default=120),
+        connect_timeout=dict(type="float", required=False, default=10),
+        retries=dict(type="int", required=False, default=3),
+        retry_backoff=dict(type="float", required=False, default=0.5),
+        retry_max_backoff=dict(type="float", required=False, default=30),
+        rate_limit=dict(type="float", required=False),
+        max_in_flight=dict(type="int", required=False),
+        token_cache=dict(type="path", required=False, no_log=False),
+        pool_size=dict(type="int", required=False, default=10),
+        http2=dict(type="bool", required=False, default=False),
+    )
+    if module:
+        argument_spec.update(
+            collect_metrics=dict(
+                type="bool",
+                required=False,
+                default=False,
+                fallback=(env_fallback, ["BESZEL_COLLECT_METRICS"]),
+            ),
+            metrics_file=dict(type="path", required=False),
+        )
+    return argument_spec
+
+
+def pocketbase_client_args(params: dict) -> dict:
+    """Get the PocketBaseClient arguments from the module parameters.
+
+    Args:
+        params (dict): The module parameters validated against
+            pocketbase_argument_spec.
+
+    Returns:
+        dict: The keyword arguments for PocketBaseClient.
+
+    Raises:
+        ValueError: If rate_limit or max_in_flight would never let a request through.
+    """
+    if params["rate_limit"] is not None and params["rate_limit"] <= 0:
+        raise ValueError("rate_limit must be greater than 0.")
+    if params["max_in_flight"] is not None and params["max_in_flight"] < 1:
+        raise ValueError("max_in_flight must be at least 1.")
+    return dict(
+        url=params["url"],
+        username=params["username"],
+        password=params["password"],
+        timeout=params["timeout"],
+        connect_timeout=params["connect_timeout"],
+        retries=params["retries"],
+        retry_backoff=params["retry_backoff"],
+        retry_max_backoff=params["retry_max_backoff"],
+        rate_limit=params["rate_limit"],
+        max_in_flight=params["max_in_flight"],
+        token_cache=params["token_cache"],
+        pool_size=params["pool_size"],
+        http2=params["http2"],
+    )
+
+
+class ModuleExit(SystemExit):
+    """Raised instead of exiting the process by the stand-ins for AnsibleModule.
+
+    Like the SystemExit raised by AnsibleModule, it is not caught by the
+    except Exception handlers of the module code.
+    """
+
+    def __init__(self, result: dict):
+        super(ModuleExit, self).__init__()
+        self.result = result
+
+
+def token_expires_at(token: str) -> float:
+    """Get the expiry timestamp of a PocketBase (JWT) token.
+
+    Args:
+        token (str): The token to inspect.
+
+    Returns:
+        float: The expiry timestamp, or 0 if the token cannot be decoded.
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return 0
+
+
+def iter_records(
+    service,
+    query_params: Union[dict, None] = None,
+    per_page: int = 100,
+    limit: Union[int, None] = None,
+):
+    """Lazily iterate over the records of a collection, one page at a time.
+
+    Unlike get_full_list, only the current page is held in memory and
+    the total number of records is never counted by the hub.
+
+    Args:
+        service (RecordService): The collection service.
+        query_params (Union[dict, None]): The query parameters of each page request.
+        per_page (int): The number of records to request per page.
+        limit (Union[int, None]): The maximum number of records to yield.
+
+    Yields:
+        Record: The records of the collection.
+
+    Raises:
+        ValueError: If per_page is lower than 1.
+    """
+    if per_page < 1:
+        raise ValueError("per_page must be at least 1.")
+    query_params = dict(query_params or {}, skipTotal=1)
+    page = 1
+    count = 0
+    while limit is None or count < limit:
+        # get_list updates the query parameters it is given, so pass a copy
+        data = service.get_list(page, per_page, dict(query_params))
+        items = data.items
+        for item in items[: None if limit is None else limit - count]:
+            yield item
+            count += 1
+        # The hub caps the number of records per page (1000), so the last page
+        # is the one with fewer records than the page size it reports
+        page_size = getattr(data, "per_page", None) or per_page
+        total_pages = getattr(data, "total_pages", -1)
+        if (
+            not items
+            or len(items) < min(per_page, page_size)
+            or 0 < total_pages <= page
+        ):
+            return
+        page += 1
+
+
+def retry_after(response) -> Union[float, None]:
+    """Get the number of seconds to wait from the Retry-After header of a response.
+
+    Args:
+        response (httpx.Response): The response.
+
+    Returns:
+        Union[float, None]: The number of seconds, or None if the header is missing
+            or invalid.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryTransport:
+    """HTTP transport retrying requests that failed because of transient hub errors.
+
+    Implements the interface of httpx.BaseTransport without subclassing it, so
+    that httpx is only imported when the transport is created.
+
+    Rate limited (429) and unavailable (503) responses and connection errors
+    are retried for any request. Bad gateway (502), gateway timeout (504) and
+    errors raised while waiting for the response, such as a connection reset,
+    are only retried for idempotent requests, as the hub may have processed
+    them. Any other response, such as 400, 403 or 404, is returned as is.
+
+    Retries wait for the number of seconds of the Retry-After header if the
+    response has one, otherwise for an exponential backoff with full jitter.
+    """
+
+    def __init__(
+        self,
+        transport,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 30,
+    ):
+        self.transport = transport
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_always_errors, self.retry_idempotent_errors = retry_errors()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def _retry_delay(
+        self, attempt: int, idempotent: bool, response=None, error=None
+    ) -> Union[float, None]:
+        """Get the number of seconds to wait before retrying a request.
+
+        Args:
+            attempt (int): The number of retries already made.
+            idempotent (bool): Whether the request is safe to repeat.
+            response (Union[httpx.Response, None]): The response, if one was received.
+            error (Union[Exception, None]): The error raised instead of a response.
+
+        Returns:
+            Union[float, None]: The number of seconds, or None if the request must
+                not be retried.
+        """
+        if attempt >= self.retries:
+            return None
+        if error is not None:
+            if isinstance(error, self.retry_always_errors) or (
+                idempotent and isinstance(error, self.retry_idempotent_errors)
+            ):
+                return self._backoff(attempt)
+            return None
+        if response.status_code in RETRY_ALWAYS_STATUSES or (
+            idempotent and response.status_code in RETRY_IDEMPOTENT_STATUSES
+        ):
+            delay = retry_after(response)
+            return self._backoff(attempt) if delay is None else delay
+        return None
+
+    def handle_request(self, request):
+        idempotent = request.method in IDEMPOTENT_METHODS
+        # Read the body so that it can be sent again
+        request.read()
+        attempt = 0
+        while True:
+            try:
+                response = self.transport.handle_request(request)
+            except self.retry_always_errors + self.retry_idempotent_errors as e:
+                delay = self._retry_delay(attempt, idempotent, error=e)
+                if delay is None:
+                    raise
+            else:
+                delay = self._retry_delay(attempt, idempotent, response=response)
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.transport.close()
+
+
+class HubLimiter:
+    """Rate and concurrency limits shared by all processes talking to a hub.
+
+    The state is kept in lock files in a directory derived from the user and
+    the hub URL, so all module and plugin processes of the same user and host
+    share the same budget. Locks held by a process are released by the kernel
+    when it exits, so a killed process never leaks its budget. If the lock
+    files can not be created, requests are sent without the limits.
+    """
+
+    # Number of seconds to wait between attempts to get a free in-flight slot
+    SLOT_POLL_INTERVAL = 0.05
+
+    def __init__(
+        self,
+        url: str,
+        rate_limit: Union[float, None] = None,
+        max_in_flight: Union[int, None] = None,
+        directory: Union[str, None] = None,
+    ):
+        self.rate_limit = rate_limit
+        self.max_in_flight = max_in_flight
+        if directory is None:
+            # The directory is per user, as the one of another user can not be written
+            digest = hashlib.sha256(url.rstrip("/").encode()).hexdigest()[:16]
+            directory = os.path.join(
+                tempfile.gettempdir(), f"beszel-{os.getuid()}-{digest}"
+            )
+        self.directory = directory
+        self.disabled = False
+        self._checked = False
+
+    def _open(self, name: str) -> int:
+        if not self._checked:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            # Do not share a budget with a directory created by another user
+            if os.stat(self.directory).st_uid != os.getuid():
+                raise PermissionError(f"{self.directory} is owned by another user")
+            self._checked = True
+        return os.open(
+            os.path.join(self.directory, name), os.O_RDWR | os.O_CREAT, 0o600
+        )
+
+    def _wait_for_rate(self):
+        """Wait until the request is allowed by the requests per second limit.
+
+        The time at which the next request may be sent is stored in a shared
+        file. Each request reserves the next interval under an exclusive lock
+        and then sleeps until its reserved time without holding the lock.
+        """
+        fd = self._open("rate")
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                data = os.pread(fd, 32, 0)
+                now = time.time()
+                try:
+                    scheduled = max(now, float(data))
+                except ValueError:
+                    scheduled = now
+                os.ftruncate(fd, 0)
+                os.pwrite(fd, repr(scheduled + 1 / self.rate_limit).encode(), 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+    def _acquire_slot(self) -> int:
+        """Wait for one of the max_in_flight slots to be free and lock it.
+
+        Returns:
+            int: The file descriptor holding the lock of the slot.
+        """
+        while True:
+            for slot in range(self.max_in_flight):
+                fd = self._open(f"slot-{slot}")
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                return fd
+            time.sleep(self.SLOT_POLL_INTERVAL)
+
+    def acquire(self) -> Union[int, None]:
+        """Wait until a request may be sent to the hub.
+
+        Returns:
+            Union[int, None]: The file descriptor holding the in-flight slot, which
+                must be passed to release once the request is complete.
+        """
+        if self.disabled:
+            return None
+        try:
+            if self.rate_limit:
+                self._wait_for_rate()
+            return self._acquire_slot() if self.max_in_flight else None
+        except OSError:
+            # Limiting requests is best effort, so they are sent without the
+            # limits rather than failing the module
+            self.disabled = True
+            return None
+
+    def release(self, fd: Union[int, None]):
+        if fd is not None:
+            # Closing the file releases the lock of the slot
+            os.close(fd)
+
+    @contextmanager
+    def limit(self):
+        """Wait until a request may be sent to the hub and hold its budget meanwhile."""
+        fd = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(fd)
+
+
+class LimitTransport:
+    """HTTP transport sending requests within the budget of a HubLimiter."""
+
+    def __init__(self, transport, limiter: HubLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    def handle_request(self, request):
+        with self.limiter.limit():
+            response = self.transport.handle_request(request)
+            # Read the response while holding the in-flight slot, as the
+            # request is not complete until the hub has sent the body
+            try:
+                response.read()
+            except Exception:
+                response.close()
+                raise
+        return response
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.transport.close()
+
+
+class TokenCache:
+    """File backed cache of PocketBase authentication tokens."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def key(url: str, username: str, auth_type: str) -> str:
+        return f"{auth_type}:{username}@{url.rstrip('/')}"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @contextmanager
+    def _lock(self):
+        """Hold an exclusive lock on the cache while updating it.
+
+        The cache file itself is replaced on each update, so the lock is taken
+        on a separate lock file next to it. Like the locks of HubLimiter, it is
+        released by the kernel if the process is killed.
+        """
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+
+    def get(self, key: str):
+        """Get a cached token that is not about to expire.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            Union[str, None]: The cached token if usable, otherwise None.
+        """
+        token = self._load().get(key)
+        if not token or token_expires_at(token) - TOKEN_EXPIRY_THRESHOLD <= time.time():
+            return None
+        return token
+
+    def set(self, key: str, token: Union[str, None]):
+        """Store (or remove when token is None) a token in the cache.
+
+        The cache is written to a temporary file with 0600 permissions and
+        atomically moved into place, so concurrent module invocations never
+        observe a partially written file. The cache is read and written under
+        a lock, so that concurrent updates of different keys are not lost.
+
+        Args:
+            key (str): The cache key.
+            token (Union[str, None]): The token to store.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        with self._lock():
+            data = self._load()
+            if token is None:
+                if data.pop(key, None) is None:
+                    return
+            else:
+                data[key] = token
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".beszel-token-")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
 
 
 class PocketBaseClient:
-    def __init__(self, url: str, username: str, password: str, timeout: float = 120):
+    def __init__(
+        self,
+        url: str,
+        username: str,
+        password: str,
+        timeout: float = 120,
+        connect_timeout: float = 10,
+        retries: int = 3,
+        retry_backoff: float = 0.5,
+        retry_max_backoff: float = 30,
+        rate_limit: Union[float, None] = None,
+        max_in_flight: Union[int, None] = None,
+        token_cache: Union[str, None] = None,
+        pool_size: int = 10,
+        http2: bool = False,
+    ):
         if not HAS_POCKETBASE:
             raise ImportError("pocketbase library is required but not available.")
+        import httpx
+        from pocketbase import PocketBase
+
         self.url = url
         self.username = username
         self.password = password
         self.timeout = timeout
-        self.client = PocketBase(base_url=self.url, timeout=timeout)
+        self.token_cache = TokenCache(token_cache) if token_cache else None
+        # HTTP/2 requires the optional h2 library, fall back to HTTP/1.1 without it
+        self.http2 = http2 and HAS_H2
+        # All requests of a module run share one pool of keep-alive connections
+        self.transport = httpx.HTTPTransport(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+        # Requests are recorded when the running module collects metrics
+        transport = MetricsTransport(self.transport)
+        # Every request, including retries, counts against the shared limits
+        if rate_limit or max_in_flight:
+            transport = LimitTransport(
+                transport, HubLimiter(url, rate_limit, max_in_flight)
+            )
+        # Transient hub errors are retried for every request, including logins
+        self.retry_transport = RetryTransport(
+            transport, retries, retry_backoff, retry_max_backoff
+        )
+        self.client = PocketBase(
+            base_url=self.url,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            transport=self.retry_transport,
+        )
 
-    def authenticate(self):
-        """Authenticate with PocketBase API using admin auth."""
+    def close(self):
+        """Close the pooled connections to the Beszel hub."""
+        self.client.http_client.close()
+
+    def _refresh_cached_token(self, service, cache_key: str) -> bool:
+        """Reuse and refresh a cached token instead of logging in.
+
+        Args:
+            service (RecordService): The auth collection service.
+            cache_key (str): The token cache key.
+
+        Returns:
+            bool: True if the cached token was accepted by the hub, otherwise False.
+        """
+        from pocketbase.errors import ClientResponseError
+
+        token = self.token_cache.get(cache_key)
+        if token is None:
+            return False
+        self.client.auth_store.save(token)
         try:
-            auth_data = self.client.admins.auth_with_password(
-                self.username, self.password
-            )
+            auth_data = service.auth_refresh()
+        except ClientResponseError:
+            # The hub rejected the token, fall back to a password login
+            self.client.auth_store.clear()
+            self.token_cache.set(cache_key, None)
+            return False
+        if not auth_data.is_valid:
+            self.client.auth_store.clear()
+            return False
+        self.token_cache.set(cache_key, auth_data.token)
+        return True
+
+    def _authenticate(self, service, auth_type: str):
+        cache_key = TokenCache.key(self.url, self.username, auth_type)
+        try:
+            if self.token_cache is not None and self._refresh_cached_token(
+                service, cache_key
+            ):
+                return self.client
+            auth_data = service.auth_with_password(self.username, self.password)
             if auth_data.is_valid:
+                if self.token_cache is not None:
+                    self.token_cache.set(cache_key, auth_data.token)
                 return self.client
             else:
                 raise Exception("Token is not valid.")
-        except (ClientResponseError, Exception) as e:
+        except Exception as e:
             raise Exception(f"Authentication failed: {e}")
 
+    def authenticate(self):
+        """Authenticate with PocketBase API using admin auth."""
+        with metrics_phase("login"):
+            return self._authenticate(self.client.admins, "admin")
+
     def authenticate_user(self):
         """Authenticate with PocketBase API using user auth."""
-        try:
-            auth_data = self.client.collection("users").auth_with_password(
-                self.username, self.password
-            )
-            if auth_data.is_valid:
-                return self.client
-            else:
-                raise Exception("Token is not valid.")
-        except (ClientResponseError, Exception) as e:
-            raise Exception(f"Authentication failed: {e}")
+        with metrics_phase("login"):
+            return self._authenticate(self.client.collection("users"), "user")
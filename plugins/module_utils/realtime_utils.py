@@ -0,0 +1,142 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import json
+import queue
+import threading
+
+from typing import Iterable, List, Union
+
+
+def iter_sse_events(lines: Iterable[str]):
+    """Parse a stream of server-sent events.
+
+    Args:
+        lines (Iterable[str]): The lines of the stream, without line endings.
+
+    Yields:
+        dict: The events, with their event name, id and data.
+    """
+    event = dict(event="message", id="", data=[])
+    for line in lines:
+        if not line:
+            if event["data"]:
+                yield dict(event, data="\n".join(event["data"]))
+            event = dict(event="message", id="", data=[])
+            continue
+        # Lines starting with a colon are comments, used to keep connections alive
+        if line.startswith(":"):
+            continue
+        field, separator, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "data":
+            event["data"].append(value)
+        elif field in ("event", "id"):
+            event[field] = value
+
+
+class RealtimeSubscription:
+    """Subscription to the realtime events of the Beszel hub.
+
+    The PocketBase realtime API streams the events as server-sent events over
+    a single long-lived connection. The stream is read by a background thread,
+    so that waiting for the next event can time out without closing the
+    connection. The connection does not go through the retries and limits of
+    PocketBaseClient, as it would otherwise hold an in-flight slot for as long
+    as it is open.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client, used to
+            submit the subscriptions.
+        topics (List[str]): The topics to subscribe to, for example systems
+            for all systems, or systems/<id> for a single system.
+        connect_timeout (float): The number of seconds to wait for the
+            connection to be established.
+    """
+
+    def __init__(self, client, topics: List[str], connect_timeout: float = 10):
+        import httpx
+
+        self.client = client
+        self.topics = topics
+        self.connect_timeout = connect_timeout
+        self.events = queue.Queue()
+        self.http_client = httpx.Client(
+            base_url=client.base_url.rstrip("/"),
+            timeout=httpx.Timeout(connect_timeout, read=None),
+        )
+        self.thread = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read(self):
+        try:
+            with self.http_client.stream("GET", "/api/realtime") as response:
+                response.raise_for_status()
+                for event in iter_sse_events(response.iter_lines()):
+                    self.events.put(event)
+            self.events.put(
+                ConnectionError("The Beszel hub closed the realtime connection.")
+            )
+        except Exception as e:
+            self.events.put(e)
+
+    def _next(self, timeout: float) -> Union[dict, None]:
+        try:
+            event = self.events.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            return None
+        if isinstance(event, Exception):
+            raise event
+        return event
+
+    def connect(self):
+        """Open the realtime connection and submit the subscriptions.
+
+        Returns:
+            RealtimeSubscription: The subscription.
+        """
+        self.thread = threading.Thread(target=self._read, name="beszel-realtime")
+        self.thread.daemon = True
+        self.thread.start()
+        # The hub first sends the ID of the realtime client to subscribe with
+        event = self._next(self.connect_timeout)
+        if event is None or event["event"] != "PB_CONNECT":
+            raise ConnectionError(
+                "The Beszel hub did not accept the realtime connection."
+            )
+        self.client.send(
+            "/api/realtime",
+            {
+                "method": "POST",
+                "body": {"clientId": event["id"], "subscriptions": self.topics},
+            },
+        )
+        return self
+
+    def get(self, timeout: float) -> Union[dict, None]:
+        """Wait for the next record event.
+
+        Args:
+            timeout (float): The number of seconds to wait for.
+
+        Returns:
+            Union[dict, None]: The event, with the action (create, update or
+                delete) and the record, or None if no event was received in time.
+
+        Raises:
+            Exception: If the realtime connection was closed.
+        """
+        event = self._next(timeout)
+        if event is None:
+            return None
+        return json.loads(event["data"])
+
+    def close(self):
+        """Close the realtime connection, which also stops the background thread."""
+        self.http_client.close()
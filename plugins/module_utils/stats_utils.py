@@ -0,0 +1,238 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import re
+
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple, Union
+
+# Collections of the Beszel hub holding time series of the systems
+STATS_COLLECTIONS = ("system_stats", "container_stats")
+
+# Intervals the Beszel hub averages the stats of the systems over
+STATS_TYPES = ("1m", "10m", "20m", "120m", "480m")
+
+# Metrics aggregated when none are requested: the CPU, memory and disk usage
+# percentages of systems, and the CPU usage percentage and memory of containers
+DEFAULT_METRICS = {
+    "system_stats": ["cpu", "mp", "dp"],
+    "container_stats": ["c", "m"],
+}
+
+DURATION_UNITS = {
+    "s": "seconds",
+    "m": "minutes",
+    "h": "hours",
+    "d": "days",
+    "w": "weeks",
+}
+
+
+def parse_time(value: str, now: Union[datetime, None] = None) -> datetime:
+    """Parse a point in time given either as a duration ago or as a date.
+
+    Args:
+        value (str): A duration ago such as 90s, 30m, 1h, 7d or 2w, or an
+            ISO 8601 date such as 2025-08-30T10:00:00Z.
+        now (Union[datetime, None]): The current time. If None, the current UTC time.
+
+    Returns:
+        datetime: The point in time in UTC.
+    """
+    match = re.match(r"^\s*(\d+)\s*([smhdw])\s*$", value)
+    if match:
+        if now is None:
+            now = datetime.now(timezone.utc)
+        return now - timedelta(**{DURATION_UNITS[match.group(2)]: int(match.group(1))})
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(
+            f"Invalid time '{value}': expected a duration such as 1h or an ISO 8601 date."
+        )
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def get_metric(stats: dict, metric: str) -> Union[float, None]:
+    """Get the value of a metric from the stats of a record.
+
+    Args:
+        stats (dict): The stats of the record.
+        metric (str): The key of the metric. Dots select keys of nested
+            dictionaries, for example t.cpu_thermal for a temperature sensor.
+
+    Returns:
+        Union[float, None]: The value, or None if it is missing or not a number.
+    """
+    value = stats
+    for key in metric.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+class MetricReducer:
+    """Aggregate the values of a metric as they are streamed.
+
+    The count, sum, minimum and maximum are updated with each value. Percentiles
+    need all values, which are kept in a compact array of doubles and only sorted
+    once when summarizing.
+    """
+
+    __slots__ = ("count", "total", "minimum", "maximum", "values")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+        self.values = array("d")
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        self.values.append(value)
+
+    def merge(self, other: "MetricReducer"):
+        """Add the values of another reducer to this one."""
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        if self.minimum is None or other.minimum < self.minimum:
+            self.minimum = other.minimum
+        if self.maximum is None or other.maximum > self.maximum:
+            self.maximum = other.maximum
+        self.values.extend(other.values)
+
+    def summary(self, percentiles: Iterable[float] = ()) -> dict:
+        """Summarize the values.
+
+        Args:
+            percentiles (Iterable[float]): The percentiles to compute, between 0 and 100.
+
+        Returns:
+            dict: The count, mean, min, max and percentiles, such as p95, of the values.
+                The statistics are None if there are no values.
+        """
+        result = dict(count=self.count, mean=None, min=self.minimum, max=self.maximum)
+        if self.count:
+            result["mean"] = self.total / self.count
+        values = sorted(self.values)
+        for q in percentiles:
+            result[f"p{q:g}"] = percentile(values, q)
+        return result
+
+
+def percentile(values: List[float], q: float) -> Union[float, None]:
+    """Compute a percentile by linear interpolation between the closest ranks.
+
+    This is the default method of numpy.percentile.
+
+    Args:
+        values (List[float]): The sorted values.
+        q (float): The percentile, between 0 and 100.
+
+    Returns:
+        Union[float, None]: The percentile, or None if there are no values.
+    """
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def aggregate_stats(
+    records: Iterable, collection: str, metrics: List[str], system_names: Dict[str, str]
+) -> Tuple[dict, int]:
+    """Aggregate the metrics of stats records per system, and per container.
+
+    Args:
+        records (Iterable): The records of the system_stats or container_stats
+            collection, with their system and stats fields.
+        collection (str): The collection of the records.
+        metrics (List[str]): The keys of the metrics to aggregate.
+        system_names (Dict[str, str]): The names of the systems keyed by ID.
+
+    Returns:
+        Tuple[dict, int]: The reducers keyed by system name, then by container
+            name for container_stats, then by metric, and the number of records.
+    """
+    groups = {}
+    count = 0
+    for record in records:
+        count += 1
+        system = system_names.get(record.system, record.system)
+        if collection == "container_stats":
+            containers = groups.setdefault(system, {})
+            samples = [
+                (containers.setdefault(container.get("n"), {}), container)
+                for container in record.stats or []
+            ]
+        else:
+            samples = [(groups.setdefault(system, {}), record.stats or {})]
+        for reducers, stats in samples:
+            for metric in metrics:
+                value = get_metric(stats, metric)
+                if value is not None:
+                    if metric not in reducers:
+                        reducers[metric] = MetricReducer()
+                    reducers[metric].add(value)
+    return groups, count
+
+
+def summarize_stats(
+    groups: dict, collection: str, metrics: List[str], percentiles: List[float]
+) -> Tuple[dict, dict]:
+    """Summarize the reducers returned by aggregate_stats.
+
+    Args:
+        groups (dict): The reducers returned by aggregate_stats.
+        collection (str): The collection of the records.
+        metrics (List[str]): The keys of the aggregated metrics.
+        percentiles (List[float]): The percentiles to compute.
+
+    Returns:
+        Tuple[dict, dict]: The summaries with the same keys as the reducers, and
+            the summary of each metric over all the systems, or containers.
+    """
+    fleet = dict((metric, MetricReducer()) for metric in metrics)
+
+    def summarize(reducers):
+        for metric, reducer in reducers.items():
+            fleet[metric].merge(reducer)
+        return dict(
+            (metric, reducer.summary(percentiles))
+            for metric, reducer in reducers.items()
+        )
+
+    if collection == "container_stats":
+        stats = dict(
+            (
+                system,
+                dict(
+                    (container, summarize(reducers))
+                    for container, reducers in containers.items()
+                ),
+            )
+            for system, containers in groups.items()
+        )
+    else:
+        stats = dict(
+            (system, summarize(reducers)) for system, reducers in groups.items()
+        )
+    return stats, dict(
+        (metric, reducer.summary(percentiles)) for metric, reducer in fleet.items()
+    )
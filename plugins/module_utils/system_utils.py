@@ -0,0 +1,882 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import csv
+import filecmp
+import json
+import os
+import tempfile
+import time
+
+from datetime import datetime
+from importlib.util import find_spec
+from typing import Dict, Iterable, List, Tuple, Union
+
+from ansible.module_utils.common.json import AnsibleJSONEncoder
+from ansible_collections.community.beszel.plugins.module_utils.filter_utils import (
+    FILTER_CHUNK_SIZE,
+    all_of,
+    bind,
+    chunked_any_of,
+    format_datetime,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    TokenCache,
+    iter_records,
+)
+
+# pyarrow is only imported when writing a Parquet or Arrow file, as importing
+# it takes longer than running most modules
+HAS_PYARROW = find_spec("pyarrow") is not None
+
+
+# Maximum number of requests PocketBase accepts in a single batch by default
+BATCH_SIZE = 50
+
+# File formats records can be exported to
+EXPORT_FORMATS = ("jsonl", "csv", "parquet", "arrow")
+
+
+def record_to_dict(record, fields: Union[List[str], None] = None) -> dict:
+    """Convert a PocketBase record to a dictionary.
+
+    Args:
+        record (Union[Record, dict]): The PocketBase record, or a record
+            already converted, for example by SystemsCache.
+        fields (Union[List[str], None]): The fields requested from the hub.
+            If provided, only these fields are kept instead of every attribute
+            the PocketBase library sets on the record.
+
+    Returns:
+        dict: The record as a dictionary.
+    """
+    data = record if isinstance(record, dict) else record.__dict__
+    if not fields:
+        return data
+    keep = set(field.split(".")[0] for field in fields)
+    return {key: value for key, value in data.items() if key in keep}
+
+
+def stringify_dates(data: dict) -> dict:
+    """Convert the datetime values of a dictionary to ISO 8601 strings.
+
+    Used by the controller side plugins, which do not go through the module
+    JSON encoder, so their results match the module results and can be cached.
+
+    Args:
+        data (dict): The dictionary to convert, for example a converted record.
+
+    Returns:
+        dict: A copy of the dictionary with datetime values as strings.
+    """
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in data.items()
+    }
+
+
+def flatten_record(record: dict, prefix: str = "") -> dict:
+    """Flatten the nested dictionaries of a record into dotted keys.
+
+    For example, the cpu of the info of a system becomes the info.cpu key.
+
+    Args:
+        record (dict): The record.
+        prefix (str): The prefix of the keys.
+
+    Returns:
+        dict: The flattened record.
+    """
+    flat = {}
+    for key, value in record.items():
+        if isinstance(value, dict):
+            flat.update(flatten_record(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def _spool_json_lines(
+    directory: Union[str, None],
+    records: Iterable[dict],
+    columns: Union[dict, None] = None,
+) -> Tuple[str, int]:
+    """Write records to a temporary file, one JSON document per line.
+
+    Args:
+        directory (Union[str, None]): The directory to create the temporary file in.
+            If None, the default temporary directory is used.
+        records (Iterable[dict]): The records to write.
+        columns (Union[dict, None]): If provided, the keys of the records are
+            added to it, in the order they are first seen.
+
+    Returns:
+        Tuple[str, int]: The path of the temporary file and the number of records.
+    """
+    count = 0
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".beszel-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            for record in records:
+                if columns is not None:
+                    columns.update(dict.fromkeys(record))
+                f.write(json.dumps(record, cls=AnsibleJSONEncoder))
+                f.write("\n")
+                count += 1
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, count
+
+
+def _read_json_lines(path: str):
+    with open(path) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _write_csv(spool_path: str, path: str, columns: List[str]):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for record in _read_json_lines(spool_path):
+            writer.writerow(
+                dict(
+                    (key, json.dumps(value) if isinstance(value, list) else value)
+                    for key, value in record.items()
+                )
+            )
+
+
+def _write_arrow(spool_path: str, path: str, columns: List[str], file_format: str):
+    import pyarrow
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    # Arrow tables are built column by column, so the columns are loaded in
+    # memory, which is far more compact than the records as Python objects
+    values = dict((column, []) for column in columns)
+    for record in _read_json_lines(spool_path):
+        for column, column_values in values.items():
+            column_values.append(record.get(column))
+    table = pyarrow.table(
+        dict(
+            (column, pyarrow.array(column_values))
+            for column, column_values in values.items()
+        )
+    )
+    if file_format == "parquet":
+        pyarrow.parquet.write_table(table, path)
+    else:
+        pyarrow.feather.write_feather(table, path)
+
+
+def _temp_directory(module, dest: str) -> Union[str, None]:
+    # In check mode the file is written to the default temporary directory, so
+    # nothing is created next to the destination
+    if module.check_mode:
+        return None
+    return os.path.dirname(os.path.abspath(dest))
+
+
+def _replace_file(module, tmp_path: str, dest: str) -> bool:
+    """Move a temporary file to its destination if their content differs.
+
+    The temporary file is removed when the destination already has the same
+    content, or when running in check mode.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        tmp_path (str): The path of the temporary file.
+        dest (str): The path of the destination file.
+
+    Returns:
+        bool: Whether the destination file was, or would be, changed.
+    """
+    changed = not (os.path.isfile(dest) and filecmp.cmp(tmp_path, dest, shallow=False))
+    if changed and not module.check_mode:
+        module.atomic_move(tmp_path, dest)
+    else:
+        os.unlink(tmp_path)
+    return changed
+
+
+def write_json_lines(module, dest: str, records: Iterable[dict]) -> Tuple[int, bool]:
+    """Write records to a file, one JSON document per line.
+
+    The records are written to a temporary file as they are consumed from
+    the iterable, which is then atomically moved to the destination if its
+    content differs. In check mode, the destination is left untouched.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        dest (str): The path of the file to write.
+        records (Iterable[dict]): The records to write.
+
+    Returns:
+        Tuple[int, bool]: The number of records written and whether the file
+            was, or would be, changed.
+    """
+    tmp_path, count = _spool_json_lines(_temp_directory(module, dest), records)
+    return count, _replace_file(module, tmp_path, dest)
+
+
+def write_records(
+    module, dest: str, records: Iterable[dict], file_format: str = "jsonl"
+) -> Tuple[int, bool]:
+    """Write records to a file in one of the EXPORT_FORMATS.
+
+    JSON lines files hold the records as they are. The other formats hold one
+    column per field, with nested dictionaries flattened into dotted columns
+    (see flatten_record). As the fields reported by the hub can vary between
+    records, the flattened records are first spooled to a temporary JSON lines
+    file to work out the columns. CSV files are then written row by row, while
+    Parquet and Arrow files require the pyarrow library and are built from
+    the columns in memory.
+
+    The file is only replaced when its content changes, and never in check mode.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        dest (str): The path of the file to write.
+        records (Iterable[dict]): The records to write.
+        file_format (str): One of EXPORT_FORMATS.
+
+    Returns:
+        Tuple[int, bool]: The number of records written and whether the file
+            was, or would be, changed.
+    """
+    if file_format == "jsonl":
+        return write_json_lines(module, dest, records)
+    directory = _temp_directory(module, dest)
+    columns = {}
+    spool_path, count = _spool_json_lines(
+        directory, (flatten_record(record) for record in records), columns
+    )
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".beszel-")
+        os.close(fd)
+        try:
+            if file_format == "csv":
+                _write_csv(spool_path, tmp_path, list(columns))
+            else:
+                _write_arrow(spool_path, tmp_path, list(columns), file_format)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+    finally:
+        os.unlink(spool_path)
+    return count, _replace_file(module, tmp_path, dest)
+
+
+def list_systems(client) -> List[dict]:
+    """Get all existing systems with a single listing of the systems collection.
+
+    The systems are requested in pages of 500 records, and unlike with
+    get_full_list, the hub is not asked to count them.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+
+    Returns:
+        List[dict]: The existing systems sorted by creation date.
+    """
+    return [
+        record.__dict__
+        for record in iter_records(
+            client.collection("systems"), {"sort": "created"}, per_page=500
+        )
+    ]
+
+
+def sort_records(records: Iterable[dict], sort: str) -> List[dict]:
+    """Sort records like the sort query parameter of PocketBase does.
+
+    Args:
+        records (Iterable[dict]): The records.
+        sort (str): Comma separated list of fields to sort by, each prefixed
+            with - to sort in descending order.
+
+    Returns:
+        List[dict]: The sorted records. Records missing a field come first.
+    """
+    records = list(records)
+    # Sort by the last field first, as sorts are stable
+    for field in reversed(
+        [field.strip() for field in sort.split(",") if field.strip()]
+    ):
+        descending = field.startswith("-")
+        field = field.lstrip("-+")
+        records.sort(
+            key=lambda record: (record.get(field) is not None, record.get(field)),
+            reverse=descending,
+        )
+    return records
+
+
+class SystemsCache:
+    """File backed copy of the systems collection of a Beszel hub, refreshed incrementally.
+
+    The first refresh gets all systems. The following ones only get the systems
+    updated since the most recent update date seen, and compare the number of
+    systems of the hub with the number of cached systems to detect deletions,
+    in which case only the IDs of the systems are requested to drop the deleted
+    ones. A refresh with no changes therefore costs two small requests, whatever
+    the number of systems.
+
+    Like TokenCache, the file holds the systems of every hub, user and filter
+    it was used with, and is replaced atomically with 0600 permissions.
+
+    Args:
+        path (str): The path of the cache file.
+        url (str): The URL of the Beszel hub.
+        username (str): The user the systems are requested as, as the systems a
+            user can see depend on the user.
+        system_filter (Union[str, None]): A filter expression selecting the systems to
+            cache. Systems which stop matching it are detected like deleted systems,
+            so it should only use the fields of the systems.
+    """
+
+    def __init__(
+        self, path: str, url: str, username: str, system_filter: Union[str, None] = None
+    ):
+        self.path = path
+        self.filter = system_filter or None
+        # The systems of all filters are invalidated together, so they share a prefix
+        self.prefix = TokenCache.key(url, username, "systems")
+        self.key = (
+            self.prefix if self.filter is None else f"{self.prefix}?{self.filter}"
+        )
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save(self, data: dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".beszel-systems-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _fetch(
+        service, query_params: dict, per_page: int, systems: dict
+    ) -> Union[str, None]:
+        """Add the systems matching the query parameters, keyed by ID.
+
+        Returns:
+            Union[str, None]: The most recent update date of the systems, or None
+                if there are none.
+        """
+        synced = None
+        for record in iter_records(service, query_params, per_page):
+            if isinstance(record.updated, datetime):
+                updated = format_datetime(record.updated)
+                if synced is None or updated > synced:
+                    synced = updated
+            systems[record.id] = stringify_dates(record.__dict__)
+        return synced
+
+    def get(self, client, ttl: float = 0, per_page: int = 500) -> List[dict]:
+        """Get the systems, refreshing the cache unless it was refreshed recently.
+
+        Args:
+            client (PocketBase): The authenticated PocketBase client.
+            ttl (float): The number of seconds after a refresh during which the
+                cached systems are returned without contacting the hub.
+            per_page (int): The number of systems to request per page.
+
+        Returns:
+            List[dict]: The systems sorted by creation date, with their dates as
+                ISO 8601 strings.
+        """
+        data = self._load()
+        entry = data.get(self.key)
+        if entry is not None and time.time() - entry["checked"] < ttl:
+            return entry["systems"]
+
+        service = client.collection("systems")
+        checked = time.time()
+        if entry is None:
+            systems = {}
+            query = {"sort": "created"}
+            if self.filter is not None:
+                query["filter"] = self.filter
+            synced = self._fetch(service, query, per_page, systems)
+        else:
+            systems = dict((system["id"], system) for system in entry["systems"])
+            synced = entry["synced"]
+            query = {}
+            # Systems updated in the same millisecond as the most recent
+            # update seen may have been missed, so they are requested again
+            delta_filter = all_of(
+                self.filter,
+                None if synced is None else bind("updated>={:synced}", synced=synced),
+            )
+            if delta_filter:
+                query["filter"] = delta_filter
+            synced = self._fetch(service, query, per_page, systems) or synced
+            # Every created or updated system was added, so there are more
+            # cached systems than systems on the hub if and only if some were deleted
+            id_query = {"fields": "id"}
+            if self.filter is not None:
+                id_query["filter"] = self.filter
+            total = service.get_list(1, 1, dict(id_query)).total_items
+            if total != len(systems):
+                ids = set(record.id for record in iter_records(service, id_query, 1000))
+                systems = dict(
+                    (system_id, system)
+                    for system_id, system in systems.items()
+                    if system_id in ids
+                )
+
+        entry = dict(
+            synced=synced,
+            checked=checked,
+            systems=sorted(systems.values(), key=lambda system: system["created"]),
+        )
+        data[self.key] = entry
+        self._save(data)
+        return entry["systems"]
+
+    def invalidate(self):
+        """Make the next get refresh the cache, for example after changing systems.
+
+        The cached systems of all filters of the hub and user are invalidated.
+        """
+        data = self._load()
+        keys = [
+            key
+            for key, entry in data.items()
+            if (key == self.prefix or key.startswith(f"{self.prefix}?"))
+            and entry.get("checked")
+        ]
+        for key in keys:
+            data[key]["checked"] = 0
+        if keys:
+            self._save(data)
+
+
+def index_systems(systems: List[dict]) -> Dict[str, dict]:
+    """Index systems by name.
+
+    Args:
+        systems (List[dict]): The systems sorted by creation date.
+
+    Returns:
+        Dict[str, dict]: The systems keyed by name. If several systems share
+            the same name, the oldest one is kept.
+    """
+    index = {}
+    for system in systems:
+        index.setdefault(system["name"], system)
+    return index
+
+
+def delete_systems(client, systems: List[dict]):
+    """Delete systems using as few requests as possible.
+
+    The deletes are sent through the PocketBase batch API in chunks of
+    BATCH_SIZE. If batch requests are not enabled on the Beszel hub, each
+    system is deleted individually instead.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        systems (List[dict]): The systems to delete.
+    """
+    for start in range(0, len(systems), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        batch = client.create_batch()
+        for system in systems[start:end]:
+            batch.collection("systems").delete(system["id"])
+        try:
+            batch.send()
+        except Exception as e:
+            # PocketBase responds with 403 when batch requests are disabled
+            if getattr(e, "status", None) != 403:
+                raise Exception(f"Failed to delete systems: {e}")
+            break
+    else:
+        return
+    for system in systems[start:]:
+        try:
+            client.collection("systems").delete(id=system["id"])
+        except Exception as e:
+            raise Exception(f"Failed to delete system '{system['name']}': {e}")
+
+
+def get_user_ids(client, emails: List[str]) -> Dict[str, str]:
+    """Get the IDs of users given their emails.
+
+    The users are fetched with a single OR-combined filter per chunk of
+    FILTER_CHUNK_SIZE emails, instead of one request per email.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        emails (List[str]): The emails of the users.
+
+    Returns:
+        Dict[str, str]: The IDs of the users that exist, keyed by lowercase email.
+    """
+    user_ids = {}
+    for query in chunked_any_of("email", emails):
+        for record in client.collection("users").get_full_list(
+            batch=FILTER_CHUNK_SIZE,
+            query_params={"filter": query, "fields": "id,email"},
+        ):
+            user_ids[record.email.lower()] = record.id
+    return user_ids
+
+
+def get_user_emails(client, user_ids: List[str]) -> Dict[str, str]:
+    """Get the emails of users given their IDs, for example to map users between hubs.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        user_ids (List[str]): The IDs of the users.
+
+    Returns:
+        Dict[str, str]: The lowercase emails of the users that exist, keyed by ID.
+    """
+    emails = {}
+    for query in chunked_any_of("id", user_ids):
+        for record in client.collection("users").get_full_list(
+            batch=FILTER_CHUNK_SIZE,
+            query_params={"filter": query, "fields": "id,email"},
+        ):
+            emails[record.id] = record.email.lower()
+    return emails
+
+
+def resolve_user_ids(
+    users: Union[List[str], None], username: str, user_ids: Dict[str, str]
+) -> List[str]:
+    """Map user emails to IDs.
+
+    Args:
+        users (Union[List[str], None]): The user emails. If None, the ID of
+            the current user is returned.
+        username (str): The email of the current user.
+        user_ids (Dict[str, str]): The user IDs keyed by lowercase email,
+            as returned by get_user_ids.
+
+    Returns:
+        List[str]: The IDs of the users.
+    """
+    if users is None:
+        if username.lower() not in user_ids:
+            raise Exception(
+                f"Failed to get ID of current user '{username}': user does not exist."
+            )
+        return [user_ids[username.lower()]]
+    missing = [user for user in users if user.lower() not in user_ids]
+    if missing:
+        raise Exception(
+            "Failed to get ID of users {0}: users do not exist.".format(
+                ", ".join(f"'{user}'" for user in missing)
+            )
+        )
+    return [user_ids[user.lower()] for user in users]
+
+
+def normalize_port(port) -> Union[int, None]:
+    """Convert a port as stored by the hub (a string) or given by the user to an int.
+
+    Args:
+        port (Union[int, str, None]): The port.
+
+    Returns:
+        Union[int, None]: The port, or None if it is not set or not a number.
+    """
+    try:
+        return int(port)
+    except (TypeError, ValueError):
+        return None
+
+
+def system_changes(
+    desired: dict, existing: dict, user_ids: Union[List[str], None]
+) -> dict:
+    """Get the fields of an existing system which differ from the desired state.
+
+    The port is compared as a number and the users as a set, as their order
+    has no meaning to the hub.
+
+    Args:
+        desired (dict): The desired system with name, host, port and state keys.
+        existing (dict): The existing system.
+        user_ids (Union[List[str], None]): The IDs of the users of the system.
+
+    Returns:
+        dict: The changed fields with their desired values.
+    """
+    changes = {}
+    if existing["host"] != desired["host"]:
+        changes["host"] = desired["host"]
+    if normalize_port(existing["port"]) != desired["port"]:
+        changes["port"] = desired["port"]
+    if set(existing["users"] or []) != set(user_ids or []):
+        changes["users"] = user_ids
+    return changes
+
+
+def plan_system(
+    desired: dict, existing: Union[dict, None], user_ids: Union[List[str], None]
+) -> Union[dict, None]:
+    """Get the request needed to bring a single system into the desired state.
+
+    Args:
+        desired (dict): The desired system with name, host, port and state keys.
+        existing (Union[dict, None]): The existing system, or None if it does not exist.
+        user_ids (Union[List[str], None]): The IDs of the users of the system.
+            Only used when the desired state is present.
+
+    Returns:
+        Union[dict, None]: The action (create, update or delete) and body of the
+            request, or None if the system is already in the desired state.
+    """
+    if desired["state"] == "absent":
+        if existing is None:
+            return None
+        return dict(action="delete", body=None)
+
+    # If we have an existing system, then we only send the fields which are
+    # different from the existing config, as any write bumps its updated date
+    if existing is not None:
+        body = system_changes(desired, existing, user_ids)
+        if not body:
+            return None
+        return dict(action="update", body=body)
+
+    return dict(
+        action="create",
+        body={
+            "name": desired["name"],
+            "host": desired["host"],
+            "port": desired["port"],
+            "users": user_ids,
+        },
+    )
+
+
+def apply_plan(client, name: str, existing: Union[dict, None], plan: dict) -> dict:
+    """Send the request of a plan.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        name (str): The name of the system.
+        existing (Union[dict, None]): The existing system, or None if it does not exist.
+        plan (dict): The plan, as returned by plan_system.
+
+    Returns:
+        dict: The system as returned by the hub, or the existing system if deleted.
+    """
+    try:
+        if plan["action"] == "delete":
+            client.collection("systems").delete(id=existing["id"])
+            return existing
+        if plan["action"] == "update":
+            return (
+                client.collection("systems")
+                .update(id=existing["id"], body_params=plan["body"])
+                .__dict__
+            )
+        return client.collection("systems").create(body_params=plan["body"]).__dict__
+    except Exception as e:
+        raise Exception(f"Failed to {plan['action']} system '{name}': {e}")
+
+
+def apply_plans(client, changes: List[Tuple[str, Union[dict, None], dict]]) -> list:
+    """Send the requests of many plans using as few requests as possible.
+
+    The requests are sent through the PocketBase batch API in chunks of
+    BATCH_SIZE. If batch requests are not enabled on the Beszel hub, the
+    remaining plans are applied one by one instead. The plans are applied in
+    order and stop at the first failure.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        changes (List[Tuple[str, Union[dict, None], dict]]): The name of the system,
+            the existing system, or None if it does not exist, and the plan, as
+            returned by plan_system, of each system to change.
+
+    Returns:
+        list: The system as returned by the hub, or the exception raised, of each
+            plan which was sent, in order. As a batch is applied in a single
+            transaction, all the plans of a failed batch get its exception.
+    """
+    from pocketbase.models import Record
+
+    outcomes = []
+    for start in range(0, len(changes), BATCH_SIZE):
+        chunk = changes[start : start + BATCH_SIZE]  # noqa: E203
+        batch = client.create_batch()
+        for _name, existing, plan in chunk:
+            if plan["action"] == "delete":
+                batch.collection("systems").delete(existing["id"])
+            elif plan["action"] == "update":
+                batch.collection("systems").update(
+                    existing["id"], body_params=plan["body"]
+                )
+            else:
+                batch.collection("systems").create(body_params=plan["body"])
+        try:
+            results = batch.send()
+        except Exception as e:
+            # PocketBase responds with 403 when batch requests are disabled
+            if getattr(e, "status", None) == 403:
+                break
+            error = Exception(f"Failed to change systems: {e}")
+            return outcomes + [error] * len(chunk)
+        for (_name, existing, plan), result in zip(chunk, results):
+            if plan["action"] == "delete":
+                outcomes.append(existing)
+            else:
+                outcomes.append(Record(result["body"]).__dict__)
+    else:
+        return outcomes
+    for name, existing, plan in changes[len(outcomes) :]:  # noqa: E203
+        try:
+            outcomes.append(apply_plan(client, name, existing, plan))
+        except Exception as e:
+            outcomes.append(e)
+            break
+    return outcomes
+
+
+async def apply_plan_async(
+    client, name: str, existing: Union[dict, None], plan: dict
+) -> dict:
+    """Send the request of a plan with an AsyncPocketBaseClient.
+
+    Args:
+        client (AsyncPocketBaseClient): The authenticated asynchronous client.
+        name (str): The name of the system.
+        existing (Union[dict, None]): The existing system, or None if it does not exist.
+        plan (dict): The plan, as returned by plan_system.
+
+    Returns:
+        dict: The system as returned by the hub, or the existing system if deleted.
+    """
+    try:
+        if plan["action"] == "delete":
+            await client.delete("systems", existing["id"])
+            return existing
+        if plan["action"] == "update":
+            return (
+                await client.update("systems", existing["id"], plan["body"])
+            ).__dict__
+        return (await client.create("systems", plan["body"])).__dict__
+    except Exception as e:
+        raise Exception(f"Failed to {plan['action']} system '{name}': {e}")
+
+
+def system_fields(system: dict) -> dict:
+    """Get the fields of a system managed by the module, as compared by plan_system.
+
+    Args:
+        system (dict): The system.
+
+    Returns:
+        dict: The host, port and users of the system.
+    """
+    return dict(
+        host=system["host"],
+        port=normalize_port(system["port"]),
+        users=system["users"],
+    )
+
+
+def plan_diff(existing: Union[dict, None], plan: Union[dict, None]) -> dict:
+    """Get the before and after state of the fields changed by a plan.
+
+    Only the changed fields are included, so that the diff stays small.
+
+    Args:
+        existing (Union[dict, None]): The existing system, or None if it does not exist.
+        plan (Union[dict, None]): The plan, as returned by plan_system.
+
+    Returns:
+        dict: The before and after keys of the diff.
+    """
+    if plan is None:
+        return dict(before={}, after={})
+    if plan["action"] == "delete":
+        return dict(before=system_fields(existing), after={})
+    if plan["action"] == "update":
+        before = system_fields(existing)
+        return dict(
+            before=dict((field, before[field]) for field in plan["body"]),
+            after=dict(plan["body"]),
+        )
+    after = dict(plan["body"])
+    del after["name"]
+    return dict(before={}, after=after)
+
+
+def plan_result(
+    desired: dict,
+    existing: Union[dict, None],
+    plan: Union[dict, None],
+    check_mode: bool,
+    system: Union[dict, None] = None,
+) -> dict:
+    """Build the result of bringing a single system into the desired state.
+
+    Args:
+        desired (dict): The desired system with name, host, port and state keys.
+        existing (Union[dict, None]): The existing system, or None if it does not exist.
+        plan (Union[dict, None]): The plan, as returned by plan_system.
+        check_mode (bool): Whether the plan was only reported and not applied.
+        system (Union[dict, None]): The system returned by the hub when the plan
+            was applied.
+
+    Returns:
+        dict: The changed, msg and system keys of the result.
+    """
+    if plan is None:
+        if desired["state"] == "absent":
+            # The system does not exist, so we don't need to do anything
+            return dict(
+                changed=False,
+                msg="System does not exist. Nothing to remove.",
+                system={},
+            )
+        # The system is already in the desired state
+        return dict(
+            changed=False,
+            msg="System is already in the desired state.",
+            system=existing,
+        )
+    if plan["action"] == "delete":
+        if check_mode:
+            # In check mode, show what would be deleted
+            return dict(changed=True, msg="System would be deleted.", system=existing)
+        return dict(changed=True, msg="System was deleted.", system=existing)
+    if plan["action"] == "update":
+        if check_mode:
+            # In check mode, simulate what the update would look like
+            simulated_system = existing.copy()
+            simulated_system.update(plan["body"])
+            return dict(
+                changed=True, msg="System would be updated.", system=simulated_system
+            )
+        return dict(changed=True, msg="System was updated.", system=system)
+    if check_mode:
+        # In check mode, only show the fields the new system would be created
+        # with, as the hub sets the others
+        simulated_system = dict(plan["body"], status="pending")
+        return dict(
+            changed=True, msg="System would be created.", system=simulated_system
+        )
+    return dict(changed=True, msg="System was created.", system=system)
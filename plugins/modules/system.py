@@ -15,32 +15,81 @@ short_description: Manage Beszel systems.
 
 version_added: "0.3.0"
 
-description: Create, update and delete Beszel systems.
+description:
+    - Create, update and delete Beszel systems.
+    - Reconcile the systems of many Beszel hubs at once with O(hubs).
 
 author:
     - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
 
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+    - community.beszel.pocketbase.module
+
 options:
     url:
-        description: URL of the Beszel hub.
-        required: true
+        description:
+            - URL of the Beszel hub.
+            - Required unless O(hubs) is provided.
+        required: false
         type: str
     username:
-        description: Username used to authenticate to Beszel hub.
-        required: true
+        description:
+            - Username used to authenticate to Beszel hub.
+            - Required with O(url).
+            - With O(hubs), the default username of the hubs.
+        required: false
         type: str
     password:
-        description: Password used to authenticate to Beszel hub.
-        required: true
+        description:
+            - Password used to authenticate to Beszel hub.
+            - Required with O(url).
+            - With O(hubs), the default password of the hubs.
+        required: false
         type: str
-    timeout:
-        description: Number of seconds to wait for the Beszel hub to respond.
+    hubs:
+        description:
+            - List of Beszel hubs to reconcile O(systems) on, instead of the single hub of O(url).
+            - The hubs are reconciled concurrently, so the module takes as long as the slowest hub
+              rather than the sum of all hubs. O(systems) and the other options apply to every hub.
+            - The results of the systems of all hubs are returned in RV(systems), each with the
+              name of its hub in its C(hub) field. With diff mode, the changes are keyed by hub
+              name.
+            - A hub which fails does not fail the module, unless all hubs fail. The outcome of
+              each hub is returned in RV(hubs), and a warning is shown for each failed hub.
+            - Requires O(systems). Mutually exclusive with O(url) and O(systems_cache).
         required: false
-        type: float
-        default: 120
+        type: list
+        elements: dict
+        version_added: "1.1.0"
+        suboptions:
+            name:
+                description:
+                    - Name of the Beszel hub, set in the C(hub) field of the results of its
+                      systems.
+                    - Defaults to the URL of the hub.
+                required: false
+                type: str
+            url:
+                description: URL of the Beszel hub.
+                required: true
+                type: str
+            username:
+                description:
+                    - Username used to authenticate to the Beszel hub. Defaults to O(username).
+                    - Also the user added to the systems of the hub which do not set any users.
+                required: false
+                type: str
+            password:
+                description:
+                    - Password used to authenticate to the Beszel hub. Defaults to O(password).
+                required: false
+                type: str
     name:
-        description: Name of the Beszel system.
-        required: true
+        description:
+            - Name of the Beszel system.
+            - Required unless O(systems) is provided.
+        required: false
         type: str
     host:
         description:
@@ -49,7 +98,9 @@ options:
         required: false
         type: str
     port:
-        description: Port of the Beszel system.
+        description:
+            - Port of the Beszel system.
+            - Default port of the entries in O(systems) which do not set one.
         required: false
         default: 45876
         type: int
@@ -58,23 +109,106 @@ options:
             List of users to add to the Beszel system.
             If not provided, the current user specified in the
             username option will be added to the system.
+            Also used for the entries in O(systems) which do not set any users.
         required: false
         type: list
         elements: str
     state:
-        description: State of the Beszel system.
+        description:
+            - State of the Beszel system.
+            - Default state of the entries in O(systems) which do not set one.
         required: false
         default: present
         type: str
         choices: ["present", "absent"]
+    systems:
+        description:
+            - List of Beszel systems to reconcile in a single module invocation.
+            - The existing systems are fetched with one listing of the systems collection
+              and only the systems that differ from the desired state are created,
+              updated or deleted.
+            - Mutually exclusive with O(name) and O(host).
+        required: false
+        type: list
+        elements: dict
+        version_added: "1.1.0"
+        suboptions:
+            name:
+                description: Name of the Beszel system.
+                required: true
+                type: str
+            host:
+                description:
+                    - IP address, FQDN or hostname of the Beszel system.
+                    - Required when state is present.
+                required: false
+                type: str
+            port:
+                description: Port of the Beszel system. Defaults to O(port).
+                required: false
+                type: int
+            users:
+                description: List of users to add to the Beszel system. Defaults to O(users).
+                required: false
+                type: list
+                elements: str
+            state:
+                description: State of the Beszel system. Defaults to O(state).
+                required: false
+                type: str
+                choices: ["present", "absent"]
+    exclusive:
+        description:
+            - Whether O(systems) is the authoritative list of Beszel systems.
+            - When V(true), every system on the Beszel hub which is not in O(systems)
+              is deleted. This includes systems sharing a name with an entry of O(systems),
+              other than the oldest one.
+            - The systems to delete are worked out from the same single listing of the systems
+              collection and deleted using the PocketBase batch API when it is enabled on the
+              Beszel hub. Otherwise, they are deleted one by one.
+            - Requires O(systems).
+        required: false
+        type: bool
+        default: false
+        version_added: "1.1.0"
+    concurrency:
+        description:
+            - Maximum number of systems of O(systems) to create, update or delete at the
+              same time.
+            - When greater than V(1), the requests are sent concurrently over an
+              asynchronous connection to the Beszel hub, overlapping their network latency.
+            - When a request fails, the other requests are still sent and all failures are
+              reported. Otherwise, the systems are changed one by one and the module stops
+              at the first failure.
+            - Only used with O(systems).
+        required: false
+        type: int
+        default: 1
+        version_added: "1.1.0"
+    systems_cache:
+        description:
+            - Path of the file keeping a copy of the systems of the Beszel hub, as set by
+              O(community.beszel.system_info#module:systems_cache).
+            - With O(systems), the existing systems are read from the cache, after getting only
+              the systems changed since the cache was last refreshed from the Beszel hub.
+            - After changing systems, the cache is marked as stale, so that the next run of
+              M(community.beszel.system_info) refreshes it even within its
+              O(community.beszel.system_info#module:systems_cache_ttl).
+        required: false
+        type: path
+        version_added: "1.1.0"
 
 attributes:
     check_mode:
         description: This module supports check mode.
         support: full
     diff_mode:
-        description: This module does not support diff mode.
-        support: none
+        description:
+            - This module supports diff mode.
+            - Only the O(host), O(port) and O(users) of the systems which are changed are shown.
+            - With O(systems), the changes of all systems are shown in a single diff,
+              keyed by system name.
+        support: full
 """
 
 EXAMPLES = r"""
@@ -99,6 +233,17 @@ EXAMPLES = r"""
     port: 45877
     state: present
 
+- name: Register a Beszel system reusing a cached authentication token
+  community.beszel.system:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    token_cache: ~/.cache/community.beszel/tokens.json
+    name: instance
+    host: instance
+    port: 45876
+    state: present
+
 - name: Unregister a Beszel system
   community.beszel.system:
     url: https://beszel.example.tld
@@ -106,6 +251,45 @@ EXAMPLES = r"""
     password: admin
     name: instance
     state: absent
+
+- name: Reconcile many Beszel systems in a single task
+  community.beszel.system:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    systems:
+      - name: instance1
+        host: instance1
+      - name: instance2
+        host: instance2
+        port: 45877
+      - name: instance3
+        state: absent
+
+- name: Ensure only these Beszel systems are registered, removing all others
+  community.beszel.system:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    exclusive: true
+    systems:
+      - name: instance1
+        host: instance1
+      - name: instance2
+        host: instance2
+
+- name: Register the same Beszel systems on the hubs of all regions
+  community.beszel.system:
+    username: admin@example.com
+    password: admin
+    hubs:
+      - name: eu
+        url: https://beszel-eu.example.tld
+      - name: us
+        url: https://beszel-us.example.tld
+    systems:
+      - name: instance1
+        host: instance1
 """
 
 RETURN = r"""
@@ -123,6 +307,8 @@ system:
         Information about the Beszel system.
         When state is absent and the system does not exist,
         the system will be returned as an empty dictionary.
+        In check mode, when the system would be created, only the fields
+        it would be created with and its pending status are returned.
     type: dict
     returned: always
     sample:
@@ -161,243 +347,548 @@ system:
                 "zsk3bb1p2uisg4g"
             ]
         }
+systems:
+    description:
+        - Result of each system in O(systems).
+        - When O(exclusive=true), followed by the result of each system which was
+          not in O(systems).
+        - When O(systems) is not provided, an empty list is returned.
+    type: list
+    elements: dict
+    returned: always
+    version_added: "1.1.0"
+    contains:
+        name:
+            description: Name of the Beszel system.
+            type: str
+        changed:
+            description: Whether the Beszel system was changed.
+            type: bool
+        msg:
+            description: Message indicating the result of the operation.
+            type: str
+        system:
+            description: Information about the Beszel system. See RV(system).
+            type: dict
+        hub:
+            description: Name of the Beszel hub of the system.
+            type: str
+            returned: when O(hubs) is provided
+hubs:
+    description:
+        - Outcome of each hub of O(hubs), in the same order.
+        - Holds the C(name) of the hub, whether it C(failed) or C(changed) and its C(msg).
+    type: list
+    elements: dict
+    returned: when O(hubs) is provided
+    version_added: "1.1.0"
+    sample: [
+        {"name": "eu", "failed": false, "changed": true, "msg": "1 system(s) were changed."},
+        {"name": "us", "failed": true, "changed": false, "msg": "Failed to authenticate"}
+    ]
+metrics:
+    description: Summary of the HTTP requests sent to the Beszel hub, see O(collect_metrics).
+    type: dict
+    returned: when O(collect_metrics=true) or O(metrics_file) is provided
+    sample: {
+        "requests": 1,
+        "retries": 0,
+        "errors": 0,
+        "bytes_sent": 96,
+        "bytes_received": 412,
+        "request_time": 0.021,
+        "elapsed": 0.025,
+        "phases": {
+            "write": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 96,
+                "bytes_received": 412,
+                "request_time": 0.021,
+                "elapsed": 0.023
+            }
+        },
+        "endpoints": {
+            "POST /api/collections/systems/records": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 96,
+                "bytes_received": 412,
+                "request_time": 0.021
+            }
+        }
+    }
 """
 
-import traceback
+from typing import Union
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import missing_required_lib
+from ansible_collections.community.beszel.plugins.module_utils.filter_utils import (
+    equals,
+)
+from ansible_collections.community.beszel.plugins.module_utils.hub_utils import (
+    add_hubs_argument_spec,
+    hub_summary,
+    run_on_hubs,
+)
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    metrics_phase,
+    start_metrics,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    PocketBaseClient,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+)
+from ansible_collections.community.beszel.plugins.module_utils.system_utils import (
+    SystemsCache,
+    apply_plan,
+    apply_plan_async,
+    delete_systems,
+    get_user_ids,
+    index_systems,
+    list_systems,
+    plan_diff,
+    plan_result,
+    plan_system,
+    resolve_user_ids,
+)
+
+
+def get_existing_system(module: AnsibleModule, client, name: str) -> Union[dict, None]:
+    """Get the existing system given the name.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (PocketBase): The authenticated PocketBase client.
+        name (str): The name of the system to get.
+
+    Returns:
+        Union[dict, None]: The existing system if it exists, otherwise None.
+    """
+    from pocketbase.errors import ClientResponseError
 
-try:
-    from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
-        PocketBaseClient,
+    try:
+        return (
+            client.collection("systems")
+            .get_first_list_item(filter=equals("name", name))
+            .__dict__
+        )
+    except ClientResponseError as e:
+        # Other errors, such as an unavailable hub, must not be taken for a missing system
+        if e.status == 404:
+            return None
+        module.fail_json(msg=f"Failed to get existing system with name '{name}': {e}")
+    except Exception as e:
+        module.fail_json(msg=f"Failed to get existing system with name '{name}': {e}")
+
+
+def get_systems_cache(module: AnsibleModule) -> Union[SystemsCache, None]:
+    """Get the systems cache set by the systems_cache option.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+
+    Returns:
+        Union[SystemsCache, None]: The systems cache, or None if it is not used.
+    """
+    if not module.params["systems_cache"]:
+        return None
+    return SystemsCache(
+        module.params["systems_cache"], module.params["url"], module.params["username"]
     )
-    from pocketbase.errors import ClientResponseError
 
-    HAS_POCKETBASE = True
-    POCKETBASE_IMPORT_ERROR = None
-except ImportError:
-    HAS_POCKETBASE = False
-    POCKETBASE_IMPORT_ERROR = traceback.format_exc()
 
-from typing import Union
-from datetime import datetime
-from ansible.module_utils.basic import AnsibleModule
-from ansible.module_utils.basic import missing_required_lib
+def invalidate_systems_cache(module: AnsibleModule):
+    """Make the next run of system_info refresh the systems cache after changing systems.
 
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+    """
+    cache = get_systems_cache(module)
+    if cache is None:
+        return
+    try:
+        cache.invalidate()
+    except Exception as e:
+        module.warn(f"Failed to invalidate the systems cache: {e}")
 
-def run_module():
-    def get_existing_system(
-        module: AnsibleModule, client: PocketBaseClient, name: str
-    ) -> Union[dict, None]:
-        """Get the existing system given the name.
-
-        Args:
-            module (AnsibleModule): The Ansible module instance.
-            client (PocketBaseClient): The PocketBaseClient instance.
-            name (str): The name of the system to get.
-
-        Returns:
-            Union[dict, None]: The existing system if it exists, otherwise None.
-        """
-        try:
-            return (
-                client.collection("systems")
-                .get_first_list_item(filter=f"name='{name}'")
-                .__dict__
-            )
-        except ClientResponseError:
-            return None
-        except Exception as e:
-            module.fail_json(
-                msg=f"Failed to get existing system with name '{name}': {e}"
-            )
 
-    module_args = dict(
-        url=dict(type="str", required=True),
-        username=dict(type="str", required=True),
-        password=dict(type="str", required=True, no_log=True),
-        timeout=dict(type="float", required=False, default=120),
-        name=dict(type="str", required=True),
+def apply_plan_operation(desired: dict, existing: Union[dict, None], plan: dict):
+    """Get the operation sending the request of a plan for run_concurrently.
+
+    Args:
+        desired (dict): The desired system.
+        existing (Union[dict, None]): The existing system, or None if it does not exist.
+        plan (dict): The plan, as returned by plan_system.
+
+    Returns:
+        Callable: The function taking the asynchronous client and returning the
+            coroutine sending the request.
+    """
+    return lambda client: apply_plan_async(client, desired["name"], existing, plan)
+
+
+def module_kwargs() -> dict:
+    """Get the keyword arguments to create the module with.
+
+    Returns:
+        dict: The argument spec and the constraints between the options.
+    """
+    module_args = pocketbase_argument_spec()
+    module_args.update(
+        name=dict(type="str", required=False),
         host=dict(type="str", required=False),
         port=dict(type="int", required=False, default=45876),
         users=dict(type="list", required=False, elements="str"),
         state=dict(
             type="str", required=False, default="present", choices=["present", "absent"]
         ),
+        systems=dict(
+            type="list",
+            required=False,
+            elements="dict",
+            options=dict(
+                name=dict(type="str", required=True),
+                host=dict(type="str", required=False),
+                port=dict(type="int", required=False),
+                users=dict(type="list", required=False, elements="str"),
+                state=dict(type="str", required=False, choices=["present", "absent"]),
+            ),
+        ),
+        exclusive=dict(type="bool", required=False, default=False),
+        concurrency=dict(type="int", required=False, default=1),
+        systems_cache=dict(type="path", required=False),
+    )
+    constraints = add_hubs_argument_spec(module_args)
+    return dict(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_if=[("exclusive", True, ("systems",))],
+        required_one_of=[("name", "systems")] + constraints["required_one_of"],
+        required_by=dict(constraints["required_by"], hubs=("systems",)),
+        mutually_exclusive=[("name", "systems"), ("host", "systems")]
+        + constraints["mutually_exclusive"]
+        + [("hubs", "systems_cache")],
     )
 
-    result = dict(changed=False, msg="", system={})
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+def run(module, client=None):
+    """Bring the systems into the desired state and exit the module.
 
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client to reuse.
+            If None, a new client is created from the module parameters.
+    """
     if not HAS_POCKETBASE:
-        module.fail_json(
-            msg=missing_required_lib("pocketbase"), exception=POCKETBASE_IMPORT_ERROR
+        module.fail_json(msg=missing_required_lib("pocketbase"))
+    start_metrics(module, "system")
+
+    if module.params["hubs"]:
+        run_hubs(module)
+    run_hub(module, client)
+
+
+def run_hubs(module: AnsibleModule):
+    """Bring the systems into the desired state on all hubs of the hubs option and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+    """
+    result = dict(changed=False, msg="", system={}, systems=[], hubs=[])
+    diff = dict(before={}, after={})
+    for name, hub_result in run_on_hubs(module, run_hub):
+        summary = hub_summary(name, hub_result)
+        summary["changed"] = bool(hub_result.get("changed"))
+        if summary["failed"]:
+            module.warn(
+                f"Failed to reconcile the systems of hub '{name}': {summary['msg']}"
+            )
+        result["systems"].extend(
+            dict(item, hub=name) for item in hub_result.get("systems", [])
         )
+        result["changed"] = result["changed"] or summary["changed"]
+        for key in ("before", "after"):
+            if hub_result.get("diff", {}).get(key):
+                diff[key][name] = hub_result["diff"][key]
+        result["hubs"].append(summary)
+
+    if module._diff:
+        result["diff"] = diff
+    failed = [summary for summary in result["hubs"] if summary["failed"]]
+    if len(failed) == len(result["hubs"]):
+        result["msg"] = "Failed to reconcile the systems of all hubs. " + " ".join(
+            f"{summary['name']}: {summary['msg']}" for summary in failed
+        )
+        module.fail_json(**result)
+    changed_count = len([item for item in result["systems"] if item["changed"]])
+    if module.check_mode:
+        result["msg"] = f"{changed_count} system(s) would be changed."
+    else:
+        result["msg"] = f"{changed_count} system(s) were changed."
+    if failed:
+        result["msg"] += f" {len(failed)} of {len(result['hubs'])} hub(s) failed."
+    module.exit_json(**result)
 
-    try:
-        client = PocketBaseClient(
-            url=module.params["url"],
-            username=module.params["username"],
-            password=module.params["password"],
-            timeout=module.params["timeout"],
-        ).authenticate()
-    except Exception as e:
-        module.fail_json(msg=str(e))
 
-    if module.params["state"] == "present":
-        if module.params["host"] is None:
+def run_hub(module: AnsibleModule, client=None):
+    """Bring the systems of a single hub into the desired state and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client to reuse.
+            If None, a new client is created from the module parameters.
+    """
+    result = dict(changed=False, msg="", system={}, systems=[])
+
+    # Resolve the desired state of each system, falling back to the
+    # top-level options for anything an entry does not set
+    if module.params["systems"] is not None:
+        desired_systems = []
+        for entry in module.params["systems"]:
+            desired = dict(
+                name=entry["name"],
+                host=entry["host"],
+                port=entry["port"]
+                if entry["port"] is not None
+                else module.params["port"],
+                users=entry["users"]
+                if entry["users"] is not None
+                else module.params["users"],
+                state=entry["state"] or module.params["state"],
+            )
+            if desired["state"] == "present" and desired["host"] is None:
+                module.fail_json(
+                    msg=f"Host is required when state is present for system '{desired['name']}'."
+                )
+            desired_systems.append(desired)
+        names = [desired["name"] for desired in desired_systems]
+        duplicates = sorted(set(name for name in names if names.count(name) > 1))
+        if duplicates:
+            module.fail_json(
+                msg=f"System names must be unique: {', '.join(duplicates)}."
+            )
+    else:
+        if module.params["state"] == "present" and module.params["host"] is None:
             module.fail_json(msg="Host is required when state is present.")
+        desired_systems = [
+            dict(
+                name=module.params["name"],
+                host=module.params["host"],
+                port=module.params["port"],
+                users=module.params["users"],
+                state=module.params["state"],
+            )
+        ]
 
-        # Attempt to get the existing system (if it exists)
-        existing_system = get_existing_system(module, client, module.params["name"])
+    if client is None:
+        try:
+            client = PocketBaseClient(
+                **pocketbase_client_args(module.params)
+            ).authenticate()
+        except Exception as e:
+            module.fail_json(msg=str(e))
+
+    # Resolve the emails of the users of all systems with a single lookup.
+    # If a system has no users, the current user is added to it
+    emails = set()
+    for desired in desired_systems:
+        if desired["state"] == "present":
+            if desired["users"] is None:
+                emails.add(module.params["username"])
+            else:
+                emails.update(desired["users"])
+    try:
+        with metrics_phase("users"):
+            user_ids_by_email = get_user_ids(client, sorted(emails))
+    except Exception as e:
+        module.fail_json(msg=f"Failed to get IDs of users: {e}")
 
-        # If we have a list of users, then we need to get the IDs of the users
-        if module.params["users"] is not None:
-            user_ids = []
-            for user in module.params["users"]:
-                try:
-                    user_ids.append(
-                        client.collection("users")
-                        .get_first_list_item(filter=f"email='{user}'")
-                        .id
-                    )
-                except Exception as e:
-                    module.fail_json(msg=f"Failed to get ID of user '{user}': {e}")
-        else:
-            # Get the ID of the current user
+    if module.params["systems"] is not None:
+        # Fetch all existing systems at once and diff them in memory
+        try:
+            with metrics_phase("lookup"):
+                cache = get_systems_cache(module)
+                if cache is None:
+                    all_systems = list_systems(client)
+                else:
+                    all_systems = cache.get(client)
+        except Exception as e:
+            module.fail_json(msg=f"Failed to list existing systems: {e}")
+        existing_systems = index_systems(all_systems)
+
+        plans = []
+        for desired in desired_systems:
+            existing = existing_systems.get(desired["name"])
             try:
-                user_ids = [
-                    client.collection("users")
-                    .get_first_list_item(filter=f"email='{module.params['username']}'")
-                    .id
-                ]
+                user_ids = None
+                if desired["state"] == "present":
+                    user_ids = resolve_user_ids(
+                        desired["users"],
+                        module.params["username"],
+                        user_ids_by_email,
+                    )
             except Exception as e:
-                module.fail_json(
-                    msg=f"Failed to get ID of current user '{module.params['username']}': {e}"
-                )
+                result["msg"] = str(e)
+                module.fail_json(**result)
+            plans.append((desired, existing, plan_system(desired, existing, user_ids)))
+
+        # Send the requests of the systems to change, either concurrently or
+        # one by one, stopping at the first failure
+        changes = [item for item in plans if item[2] is not None]
+        if module.check_mode:
+            outcomes = []
+        elif module.params["concurrency"] > 1:
+            from ansible_collections.community.beszel.plugins.module_utils.pocketbase_async import (
+                run_concurrently,
+            )
 
-        # If we have an existing system, then we need to determine if the
-        # new config is different from the existing config
-        if existing_system is not None:
-            if (
-                existing_system["host"] != module.params["host"]
-                or int(existing_system["port"]) != module.params["port"]
-                or existing_system["users"] != user_ids
-            ):
-                # We need to update the system
-                if module.check_mode:
-                    # In check mode, simulate what the update would look like
-                    simulated_system = existing_system.copy()
-                    simulated_system.update(
-                        {
-                            "host": module.params["host"],
-                            "port": module.params["port"],
-                            "users": user_ids,
-                        }
+            try:
+                with metrics_phase("write"):
+                    outcomes = run_concurrently(
+                        pocketbase_client_args(module.params),
+                        [apply_plan_operation(*change) for change in changes],
+                        module.params["concurrency"],
+                        token=client.auth_store.token,
                     )
-                    result["system"] = simulated_system
-                    result["changed"] = True
-                    result["msg"] = "System would be updated."
-                else:
-                    try:
-                        data = client.collection("systems").update(
-                            id=existing_system["id"],
-                            body_params={
-                                "host": module.params["host"],
-                                "port": module.params["port"],
-                                "users": user_ids,
-                            },
-                        )
-                        result["system"] = data.__dict__
-                        result["changed"] = True
-                        result["msg"] = "System was updated."
-                    except Exception as e:
-                        module.fail_json(
-                            msg=f"Failed to update system '{module.params['name']}': {e}"
-                        )
-            else:
-                # The system is already in the desired state
-                result["system"] = existing_system
-                result["changed"] = False
-                result["msg"] = "System is already in the desired state."
+            except Exception as e:
+                result["msg"] = str(e)
+                module.fail_json(**result)
         else:
-            # We need to create a new system
-            if module.check_mode:
-                # In check mode, simulate what the new system would look like
-                simulated_system = {
-                    "collection_id": "2hz5ncl8tizk5nx",
-                    "collection_name": "systems",
-                    "created": datetime.now().isoformat()[:19],
-                    "expand": {},
-                    "host": module.params["host"],
-                    "id": "zh6pbqnwwjx0lxv",
-                    "info": {
-                        "b": 0,
-                        "bb": 0,
-                        "c": 0,
-                        "cpu": 0,
-                        "dp": 0,
-                        "h": "",
-                        "la": [0, 0, 0],
-                        "m": "",
-                        "mp": 0,
-                        "os": 0,
-                        "u": 0,
-                        "v": "",
-                    },
-                    "name": module.params["name"],
-                    "port": module.params["port"],
-                    "status": "pending",
-                    "updated": datetime.now().isoformat()[:19],
-                    "users": user_ids,
-                }
-                result["system"] = simulated_system
-                result["changed"] = True
-                result["msg"] = "System would be created."
-            else:
+            outcomes = []
+            for desired, existing, plan in changes:
                 try:
-                    data = client.collection("systems").create(
-                        body_params={
-                            "name": module.params["name"],
-                            "host": module.params["host"],
-                            "port": module.params["port"],
-                            "users": user_ids,
-                        }
-                    )
-                    result["system"] = data.__dict__
-                    result["changed"] = True
-                    result["msg"] = "System was created."
+                    with metrics_phase("write"):
+                        outcomes.append(
+                            apply_plan(client, desired["name"], existing, plan)
+                        )
                 except Exception as e:
-                    module.fail_json(
-                        msg=f"Failed to create system '{module.params['name']}': {e}"
-                    )
+                    outcomes.append(e)
+                    break
+        if outcomes:
+            invalidate_systems_cache(module)
+        applied = dict(
+            (change[0]["name"], outcome) for change, outcome in zip(changes, outcomes)
+        )
 
-    elif module.params["state"] == "absent":
-        existing_system = get_existing_system(module, client, module.params["name"])
-        if existing_system is None:
-            # The system does not exist, so we don't need to do anything
-            result["changed"] = False
-            result["msg"] = "System does not exist. Nothing to remove."
-        else:
-            # We need to delete the system
-            if module.check_mode:
-                # In check mode, show what would be deleted
-                result["changed"] = True
-                result["system"] = existing_system
-                result["msg"] = "System would be deleted."
-            else:
+        errors = []
+        diff = dict(before={}, after={})
+        for desired, existing, plan in plans:
+            if plan is not None:
+                # Aggregate the changed fields of all systems keyed by name
+                system_diff = plan_diff(existing, plan)
+                for key in ("before", "after"):
+                    if system_diff[key]:
+                        diff[key][desired["name"]] = system_diff[key]
+            system = None
+            if plan is not None and not module.check_mode:
+                if desired["name"] not in applied:
+                    # Not sent as a previous request failed
+                    break
+                system = applied[desired["name"]]
+                if isinstance(system, Exception):
+                    errors.append(str(system))
+                    continue
+            system_result = plan_result(
+                desired, existing, plan, module.check_mode, system
+            )
+            result["systems"].append(dict(name=desired["name"], **system_result))
+            result["changed"] = result["changed"] or system_result["changed"]
+        if errors:
+            result["msg"] = " ".join(errors)
+            module.fail_json(**result)
+
+        if module.params["exclusive"]:
+            # Remove every system which is not in the desired list, including
+            # duplicates of desired systems which share the same name
+            managed_ids = set(
+                existing_systems[desired["name"]]["id"]
+                for desired in desired_systems
+                if desired["name"] in existing_systems
+            )
+            unmanaged_systems = [
+                existing
+                for existing in all_systems
+                if existing["id"] not in managed_ids
+            ]
+            if unmanaged_systems and not module.check_mode:
                 try:
-                    client.collection("systems").delete(id=existing_system["id"])
-                    result["changed"] = True
-                    result["system"] = existing_system
-                    result["msg"] = "System was deleted."
+                    with metrics_phase("write"):
+                        delete_systems(client, unmanaged_systems)
                 except Exception as e:
-                    module.fail_json(
-                        msg=f"Failed to delete system '{module.params['name']}': {e}"
+                    result["msg"] = str(e)
+                    module.fail_json(**result)
+                finally:
+                    invalidate_systems_cache(module)
+            for existing in unmanaged_systems:
+                key = existing["name"]
+                if key in diff["before"]:
+                    # Duplicate of a managed system sharing the same name
+                    key = f"{key} ({existing['id']})"
+                diff["before"][key] = plan_diff(existing, dict(action="delete"))[
+                    "before"
+                ]
+                result["systems"].append(
+                    dict(
+                        name=existing["name"],
+                        changed=True,
+                        msg="System would be deleted."
+                        if module.check_mode
+                        else "System was deleted.",
+                        system=existing,
                     )
+                )
+                result["changed"] = True
+
+        if module._diff:
+            result["diff"] = diff
+        changed_count = len([item for item in result["systems"] if item["changed"]])
+        if module.check_mode:
+            result["msg"] = f"{changed_count} system(s) would be changed."
+        else:
+            result["msg"] = f"{changed_count} system(s) were changed."
+        module.exit_json(**result)
+
+    desired = desired_systems[0]
+
+    # Attempt to get the existing system (if it exists)
+    with metrics_phase("lookup"):
+        existing_system = get_existing_system(module, client, desired["name"])
+
+    try:
+        user_ids = None
+        if desired["state"] == "present":
+            user_ids = resolve_user_ids(
+                desired["users"], module.params["username"], user_ids_by_email
+            )
+        plan = plan_system(desired, existing_system, user_ids)
+        system = None
+        if plan is not None and not module.check_mode:
+            try:
+                with metrics_phase("write"):
+                    system = apply_plan(client, desired["name"], existing_system, plan)
+            finally:
+                invalidate_systems_cache(module)
+    except Exception as e:
+        module.fail_json(msg=str(e))
+
+    result.update(
+        plan_result(desired, existing_system, plan, module.check_mode, system)
+    )
+    if module._diff:
+        result["diff"] = plan_diff(existing_system, plan)
 
     module.exit_json(**result)
 
 
+def run_module():
+    run(AnsibleModule(**module_kwargs()))
+
+
 def main():
     run_module()
 
@@ -15,43 +15,196 @@ short_description: Get information about Beszel systems.
 
 version_added: "0.3.0"
 
-description: Get information about registered Beszel systems.
+description:
+    - Get information about registered Beszel systems.
+    - Get the systems of many Beszel hubs at once with O(hubs).
 
 author:
     - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
 
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+    - community.beszel.pocketbase.module
+
 options:
     url:
-        description: URL of the Beszel hub.
-        required: true
+        description:
+            - URL of the Beszel hub.
+            - Required unless O(hubs) is provided.
+        required: false
         type: str
     username:
-        description: Username used to authenticate to Beszel hub.
-        required: true
+        description:
+            - Username used to authenticate to Beszel hub.
+            - Required with O(url).
+            - With O(hubs), the default username of the hubs.
+        required: false
         type: str
     password:
-        description: Password used to authenticate to Beszel hub.
-        required: true
+        description:
+            - Password used to authenticate to Beszel hub.
+            - Required with O(url).
+            - With O(hubs), the default password of the hubs.
+        required: false
         type: str
-    timeout:
-        description: Number of seconds to wait for the Beszel hub to respond.
+    hubs:
+        description:
+            - List of Beszel hubs to get the systems of, instead of the single hub of O(url).
+            - The hubs are queried concurrently, so the module takes as long as the slowest hub
+              rather than the sum of all hubs. The other options apply to every hub.
+            - The systems of all hubs are returned in RV(systems), each with the name of its
+              hub in its C(hub) field.
+            - A hub which fails does not fail the module, unless all hubs fail. The outcome of
+              each hub is returned in RV(hubs), and a warning is shown for each failed hub.
+            - Mutually exclusive with O(url), O(dest) and O(systems_cache).
         required: false
-        type: float
-        default: 120
+        type: list
+        elements: dict
+        version_added: "1.1.0"
+        suboptions:
+            name:
+                description:
+                    - Name of the Beszel hub, set in the C(hub) field of its systems.
+                    - Defaults to the URL of the hub.
+                required: false
+                type: str
+            url:
+                description: URL of the Beszel hub.
+                required: true
+                type: str
+            username:
+                description:
+                    - Username used to authenticate to the Beszel hub. Defaults to O(username).
+                required: false
+                type: str
+            password:
+                description:
+                    - Password used to authenticate to the Beszel hub. Defaults to O(password).
+                required: false
+                type: str
     name:
         description:
             - Name of the Beszel system.
             - If not provided, all systems will be returned.
         required: false
         type: str
+    filter:
+        description:
+            - PocketBase filter expression evaluated by the Beszel hub to select
+              the systems to return.
+            - Mutually exclusive with O(systems_cache).
+            - For example V(status = 'down'), V(host ~ '.example.tld')
+              or V(users ?= 'zsk3bb1p2uisg4g').
+            - Combined with O(name) when both are provided.
+            - See U(https://pocketbase.io/docs/api-records/#listsearch-records) for the syntax.
+        required: false
+        type: str
+        version_added: "1.1.0"
+    fields:
+        description:
+            - List of fields to return for each system, for example V(name) and V(status).
+            - Only the requested fields are transferred from the Beszel hub.
+            - If not provided, all fields are returned.
+        required: false
+        type: list
+        elements: str
+        version_added: "1.1.0"
+    sort:
+        description:
+            - Comma separated list of fields to sort the systems by.
+            - Prefix a field with V(-) to sort in descending order, for example V(-updated).
+        required: false
+        type: str
+        default: created
+        version_added: "1.1.0"
+    page:
+        description:
+            - Page of systems to return, starting at V(1).
+            - If not provided, all pages are returned.
+            - Mutually exclusive with O(systems_cache).
+        required: false
+        type: int
+        version_added: "1.1.0"
+    per_page:
+        description:
+            - Number of systems to request from the Beszel hub per page.
+            - Pages are requested one at a time as the systems are returned,
+              so this also bounds the number of systems held in memory when O(dest) is provided.
+        required: false
+        type: int
+        default: 100
+        version_added: "1.1.0"
+    limit:
+        description:
+            - Maximum number of systems to return.
+            - Pages are only requested from the Beszel hub until the limit is reached.
+            - With O(page), the page is requested with O(per_page) systems and only its first
+              O(limit) systems are returned.
+        required: false
+        type: int
+        version_added: "1.1.0"
+    dest:
+        description:
+            - Path of a file to write the systems to, in the format set by O(format).
+            - The systems are written as they are received from the Beszel hub and are not
+              returned in RV(systems), so memory usage does not grow with the number of systems.
+            - The file is written on the Ansible controller, unless the module is executed
+              on the target, and replaced atomically.
+            - The file is only replaced, and the module only reports a change, when the content
+              of the file changes.
+        required: false
+        type: path
+        version_added: "1.1.0"
+    format:
+        description:
+            - Format of the file written to O(dest).
+            - V(jsonl) writes one JSON document per system, as returned in RV(systems).
+            - V(csv), V(parquet) and V(arrow) write one row per system and one column per field,
+              with nested fields flattened into dotted columns such as C(info.cpu), for
+              offline analysis with tools like pandas or DuckDB.
+              Lists, such as C(users), are JSON encoded in CSV files.
+            - V(parquet) and V(arrow) (the Arrow IPC file format, also known as Feather) require
+              the C(pyarrow) library, and hold the columns in memory while writing the file.
+        required: false
+        type: str
+        default: jsonl
+        choices: ["jsonl", "csv", "parquet", "arrow"]
+        version_added: "1.1.0"
+    systems_cache:
+        description:
+            - Path of a file to keep a copy of the systems of the Beszel hub in, such as
+              V(~/.cache/community.beszel/systems.json).
+            - The first run gets all systems. Later runs only get the systems updated since the
+              previous run, and the IDs of all systems when some were deleted, which is much
+              cheaper than getting all systems on large Beszel hubs.
+            - O(name), O(sort), O(limit) and O(fields) are applied to the cached systems.
+            - The file is written on the Ansible controller, unless the module is executed on
+              the target, with 0600 permissions. It is shared with the M(community.beszel.system)
+              module, which makes the next run refresh the cache after changing systems.
+        required: false
+        type: path
+        version_added: "1.1.0"
+    systems_cache_ttl:
+        description:
+            - Number of seconds after a refresh of O(systems_cache) during which the cached
+              systems are returned without contacting the Beszel hub.
+            - With the default V(0), the cache is refreshed on every run.
+            - Changes made to the systems by other clients than the modules of this collection,
+              including the status updates of the systems by the Beszel hub, may be missed
+              for up to this number of seconds.
+        required: false
+        type: float
+        default: 0
+        version_added: "1.1.0"
 
 attributes:
     check_mode:
-        description: This module does not support check mode.
+        description: This module supports check mode.
         details:
-            - This module is read-only.
-            - Check mode behavior is the same as normal execution.
-        support: N/A
+            - The Beszel hub is only read from.
+            - When O(dest) is provided, the file is not written in check mode, and C(changed)
+              reports whether its content would change.
+        support: full
     diff_mode:
         description: This module does not support diff mode.
         support: none
@@ -71,12 +224,69 @@ EXAMPLES = r"""
     url: https://beszel.example.tld
     username: admin@example.com
     password: admin
+
+- name: Get the names of all Beszel systems that are down
+  community.beszel.system_info:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    filter: status = 'down'
+    fields:
+      - name
+
+- name: Write all Beszel systems to a JSON lines file
+  community.beszel.system_info:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    dest: /tmp/beszel_systems.jsonl
+  delegate_to: localhost
+
+- name: Export all Beszel systems to a Parquet file for offline analysis
+  community.beszel.system_info:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    dest: /tmp/beszel_systems.parquet
+    format: parquet
+  delegate_to: localhost
+
+- name: Get the 10 most recently updated Beszel systems
+  community.beszel.system_info:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    sort: -updated
+    limit: 10
+
+- name: Get the systems that are down on the Beszel hubs of all regions
+  community.beszel.system_info:
+    username: admin@example.com
+    password: admin
+    hubs:
+      - name: eu
+        url: https://beszel-eu.example.tld
+      - name: us
+        url: https://beszel-us.example.tld
+        password: other
+    filter: status = 'down'
+
+- name: Get all Beszel systems, only requesting the systems changed since the previous run
+  community.beszel.system_info:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    systems_cache: ~/.cache/community.beszel/systems.json
+  delegate_to: localhost
 """
 
 RETURN = r"""
 ---
 systems:
-    description: List of Beszel systems.
+    description:
+        - List of Beszel systems.
+        - Empty when O(dest) is provided.
+        - With O(hubs), the systems of all hubs, each with the name of its hub in a C(hub) field.
     type: list
     returned: always
     sample: [
@@ -116,73 +326,327 @@ systems:
             ]
         }
     ]
+dest:
+    description: Path of the file the systems were written to.
+    type: str
+    returned: when O(dest) is provided
+    version_added: "1.1.0"
+count:
+    description: Number of systems written to O(dest).
+    type: int
+    returned: when O(dest) is provided
+    version_added: "1.1.0"
+total_items:
+    description: Total number of systems matching O(filter) on the Beszel hub.
+    type: int
+    returned: when O(page) is provided
+    version_added: "1.1.0"
+total_pages:
+    description: Total number of pages of systems matching O(filter) on the Beszel hub.
+    type: int
+    returned: when O(page) is provided
+    version_added: "1.1.0"
+hubs:
+    description:
+        - Outcome of each hub of O(hubs), in the same order.
+        - Holds the C(name) of the hub, whether it C(failed) with its error C(msg), and
+          the C(count) of systems returned. C(total_items) and C(total_pages) are also set
+          when O(page) is provided.
+    type: list
+    elements: dict
+    returned: when O(hubs) is provided
+    version_added: "1.1.0"
+    sample: [
+        {"name": "eu", "failed": false, "msg": "", "count": 12},
+        {"name": "us", "failed": true, "msg": "Failed to authenticate"}
+    ]
+metrics:
+    description: Summary of the HTTP requests sent to the Beszel hub, see O(collect_metrics).
+    type: dict
+    returned: when O(collect_metrics=true) or O(metrics_file) is provided
+    sample: {
+        "requests": 1,
+        "retries": 0,
+        "errors": 0,
+        "bytes_sent": 0,
+        "bytes_received": 1191,
+        "request_time": 0.021,
+        "elapsed": 0.025,
+        "phases": {
+            "lookup": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 1191,
+                "request_time": 0.021,
+                "elapsed": 0.023
+            }
+        },
+        "endpoints": {
+            "GET /api/collections/systems/records": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 1191,
+                "request_time": 0.021
+            }
+        }
+    }
 """
 
-import traceback
-
-try:
-    from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
-        PocketBaseClient,
-    )
-except ImportError:
-    HAS_POCKETBASE = False
-    POCKETBASE_IMPORT_ERROR = traceback.format_exc()
-else:
-    HAS_POCKETBASE = True
-    POCKETBASE_IMPORT_ERROR = None
-
+from typing import List
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.basic import missing_required_lib
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    PocketBaseClient,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+    iter_records,
+)
+from ansible_collections.community.beszel.plugins.module_utils.filter_utils import (
+    all_of,
+    equals,
+)
+from ansible_collections.community.beszel.plugins.module_utils.hub_utils import (
+    add_hubs_argument_spec,
+    hub_summary,
+    run_on_hubs,
+)
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    metrics_phase,
+    start_metrics,
+)
+from ansible_collections.community.beszel.plugins.module_utils.system_utils import (
+    EXPORT_FORMATS,
+    HAS_PYARROW,
+    SystemsCache,
+    record_to_dict,
+    sort_records,
+    write_records,
+)
 
 
-def run_module():
-    # Note: This module is read-only, so check_mode behavior is the same as normal execution
-    module_args = dict(
-        url=dict(type="str", required=True),
-        username=dict(type="str", required=True),
-        password=dict(type="str", required=True, no_log=True),
-        timeout=dict(type="float", required=False, default=120),
+def module_kwargs() -> dict:
+    """Get the keyword arguments to create the module with.
+
+    Returns:
+        dict: The argument spec and the constraints between the options.
+    """
+    module_args = pocketbase_argument_spec()
+    module_args.update(
         name=dict(type="str", required=False),
+        filter=dict(type="str", required=False),
+        fields=dict(type="list", required=False, elements="str"),
+        sort=dict(type="str", required=False, default="created"),
+        page=dict(type="int", required=False),
+        per_page=dict(type="int", required=False, default=100),
+        limit=dict(type="int", required=False),
+        dest=dict(type="path", required=False),
+        format=dict(
+            type="str", required=False, default="jsonl", choices=list(EXPORT_FORMATS)
+        ),
+        systems_cache=dict(type="path", required=False),
+        systems_cache_ttl=dict(type="float", required=False, default=0),
+    )
+    constraints = add_hubs_argument_spec(module_args)
+    return dict(
+        argument_spec=module_args,
+        supports_check_mode=True,
+        required_one_of=constraints["required_one_of"],
+        required_by=constraints["required_by"],
+        mutually_exclusive=constraints["mutually_exclusive"]
+        + [
+            ("systems_cache", "filter"),
+            ("systems_cache", "page"),
+            ("hubs", "dest"),
+            ("hubs", "systems_cache"),
+        ],
     )
 
-    result = dict(changed=False, systems=[])
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+def get_cached_systems(module, client) -> List[dict]:
+    """Get the systems from the systems cache, refreshing it if needed.
 
-    if not HAS_POCKETBASE:
-        module.fail_json(
-            msg=missing_required_lib("pocketbase"), exception=POCKETBASE_IMPORT_ERROR
-        )
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (PocketBase): The authenticated PocketBase client.
 
+    Returns:
+        List[dict]: The systems selected by the name, sort and limit options.
+    """
+    cache = SystemsCache(
+        module.params["systems_cache"], module.params["url"], module.params["username"]
+    )
     try:
-        client = PocketBaseClient(
-            url=module.params["url"],
-            username=module.params["username"],
-            password=module.params["password"],
-            timeout=module.params["timeout"],
-        ).authenticate()
+        with metrics_phase("lookup"):
+            systems = cache.get(
+                client, module.params["systems_cache_ttl"], module.params["per_page"]
+            )
     except Exception as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=f"Failed to refresh the systems cache: {e}")
+    if module.params["name"]:
+        systems = [
+            system for system in systems if system["name"] == module.params["name"]
+        ]
+        if not systems:
+            module.fail_json(
+                msg=f"System with name '{module.params['name']}' not found."
+            )
+    return sort_records(systems, module.params["sort"])[: module.params["limit"]]
+
+
+def run(module, client=None):
+    """Get the systems and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client to reuse.
+            If None, a new client is created from the module parameters.
+    """
+    # Note: The hub is only read from. The file written to dest is left
+    # untouched in check mode, and only replaced when its content changes
+    if not HAS_POCKETBASE:
+        module.fail_json(msg=missing_required_lib("pocketbase"))
+    start_metrics(module, "system_info")
+    for option in ("per_page", "limit"):
+        if module.params[option] is not None and module.params[option] < 1:
+            module.fail_json(msg=f"{option} must be at least 1.")
+    if (
+        module.params["dest"]
+        and module.params["format"] in ("parquet", "arrow")
+        and not HAS_PYARROW
+    ):
+        module.fail_json(msg=missing_required_lib("pyarrow"))
+
+    if module.params["hubs"]:
+        run_hubs(module)
+    run_hub(module, client)
 
+
+def run_hubs(module):
+    """Get the systems of all hubs of the hubs option concurrently and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+    """
+    result = dict(changed=False, systems=[], hubs=[])
+    for name, hub_result in run_on_hubs(module, run_hub):
+        summary = hub_summary(name, hub_result, ("total_items", "total_pages"))
+        if summary["failed"]:
+            module.warn(f"Failed to get the systems of hub '{name}': {summary['msg']}")
+        else:
+            summary["count"] = len(hub_result["systems"])
+            result["systems"].extend(
+                dict(system, hub=name) for system in hub_result["systems"]
+            )
+        result["hubs"].append(summary)
+    if all(summary["failed"] for summary in result["hubs"]):
+        result["msg"] = "Failed to get the systems of all hubs. " + " ".join(
+            f"{summary['name']}: {summary['msg']}" for summary in result["hubs"]
+        )
+        module.fail_json(**result)
+    module.exit_json(**result)
+
+
+def run_hub(module, client=None):
+    """Get the systems of a single hub and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client to reuse.
+            If None, a new client is created from the module parameters.
+    """
+    result = dict(changed=False, systems=[])
+
+    if client is None:
+        try:
+            client = PocketBaseClient(
+                **pocketbase_client_args(module.params)
+            ).authenticate()
+        except Exception as e:
+            module.fail_json(msg=str(e))
+
+    fields = module.params["fields"]
+    query_params = {"sort": module.params["sort"]}
+    if fields:
+        query_params["fields"] = ",".join(fields)
+
+    if module.params["systems_cache"]:
+        records = get_cached_systems(module, client)
+        if module.params["name"]:
+            records = records[:1]
     # If we are provided a system name, we want to get a single record for that system
-    if module.params["name"]:
+    elif module.params["name"]:
+        name_filter = all_of(
+            equals("name", module.params["name"]), module.params["filter"]
+        )
         try:
-            data = client.collection("systems").get_first_list_item(
-                filter=f"name='{module.params['name']}'"
-            )
-            result["systems"] = [data.__dict__]
+            with metrics_phase("lookup"):
+                records = [
+                    client.collection("systems").get_first_list_item(
+                        filter=name_filter, query_params=query_params
+                    )
+                ]
         except Exception as e:
             module.fail_json(msg=str(e))
-    # If we are not provided a system name, get all systems sorted by creation date
     else:
-        data = client.collection("systems").get_full_list(
-            query_params={"sort": "created"}
-        )
-        result["systems"] = [record.__dict__ for record in data]
+        if module.params["filter"]:
+            query_params["filter"] = module.params["filter"]
+        per_page = module.params["per_page"]
+        limit = module.params["limit"]
+
+        # If we are provided a page, only get the systems of that page. The page
+        # size sets the window of the page, so the limit only truncates it
+        if module.params["page"] is not None:
+            try:
+                with metrics_phase("lookup"):
+                    data = client.collection("systems").get_list(
+                        module.params["page"], per_page, query_params
+                    )
+            except Exception as e:
+                module.fail_json(msg=str(e))
+            result["total_items"] = data.total_items
+            result["total_pages"] = data.total_pages
+            records = data.items[:limit]
+        # Otherwise, lazily walk the pages of systems (sorted by creation date
+        # by default) until the limit, if any, is reached
+        else:
+            if limit is not None:
+                per_page = min(per_page, limit)
+            records = iter_records(
+                client.collection("systems"), query_params, per_page, limit
+            )
+
+    # Convert the systems one at a time, so that at most one page of records
+    # is held in memory when writing them to a file. The pages are requested
+    # as the systems are converted, so this is part of the lookup
+    try:
+        with metrics_phase("lookup"):
+            if module.params["dest"]:
+                result["dest"] = module.params["dest"]
+                result["count"], result["changed"] = write_records(
+                    module,
+                    module.params["dest"],
+                    (record_to_dict(record, fields) for record in records),
+                    module.params["format"],
+                )
+            else:
+                result["systems"] = [
+                    record_to_dict(record, fields) for record in records
+                ]
+    except Exception as e:
+        module.fail_json(msg=str(e))
 
     module.exit_json(**result)
 
 
+def run_module():
+    run(AnsibleModule(**module_kwargs()))
+
+
 def main():
     run_module()
 
@@ -0,0 +1,447 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+module: system_stats_info
+
+short_description: Get aggregated stats of Beszel systems and containers.
+
+version_added: "1.1.0"
+
+description:
+    - Summarize the time series of the Beszel systems, or of their containers, recorded by
+      the Beszel hub over a time window, for example to check the CPU usage of the fleet
+      before a deployment.
+    - The stats records are requested from the Beszel hub page by page and aggregated as they
+      are received, so only compact summaries are returned instead of the records.
+
+author:
+    - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
+
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+    - community.beszel.pocketbase.module
+
+options:
+    names:
+        description:
+            - Names of the Beszel systems to get the stats of.
+            - If not provided, the stats of all systems are returned.
+        required: false
+        type: list
+        elements: str
+    collection:
+        description:
+            - Collection of the Beszel hub to get the stats from.
+            - V(system_stats) holds the stats of the systems.
+            - V(container_stats) holds the stats of the containers running on the systems,
+              which are summarized per container.
+        required: false
+        type: str
+        default: system_stats
+        choices: ["system_stats", "container_stats"]
+    type:
+        description:
+            - Interval the stats records are averaged over by the Beszel hub.
+            - Longer intervals are kept for longer by the Beszel hub and require fewer records
+              to be read for long time windows.
+        required: false
+        type: str
+        default: 1m
+        choices: ["1m", "10m", "20m", "120m", "480m"]
+    since:
+        description:
+            - Start of the time window, either as a duration ago such as V(30m), V(1h), V(7d)
+              or V(2w), or as an ISO 8601 date such as V(2025-08-30T10:00:00Z).
+            - Dates without a time zone are in UTC.
+        required: false
+        type: str
+        default: 1h
+    until:
+        description:
+            - End of the time window, in the same formats as O(since).
+            - If not provided, the time window ends now.
+        required: false
+        type: str
+    filter:
+        description:
+            - PocketBase filter expression evaluated by the Beszel hub to further select
+              the stats records, combined with the other options.
+            - See U(https://pocketbase.io/docs/api-records/#listsearch-records) for the syntax.
+        required: false
+        type: str
+    metrics:
+        description:
+            - Keys of the stats to aggregate. Dots select nested keys, for example
+              V(t.cpu_thermal) for a temperature sensor.
+            - Values that are missing or not numbers are ignored.
+            - Defaults to the CPU usage V(cpu), memory usage V(mp) and disk usage V(dp)
+              percentages of systems, or to the CPU usage percentage V(c) and memory V(m)
+              of containers.
+        required: false
+        type: list
+        elements: str
+    percentiles:
+        description: Percentiles of the metrics to compute, between V(0) and V(100).
+        required: false
+        type: list
+        elements: float
+        default: [50, 90, 95, 99]
+    per_page:
+        description: Number of stats records to request from the Beszel hub per page.
+        required: false
+        type: int
+        default: 500
+
+attributes:
+    check_mode:
+        description: This module does not support check mode.
+        details:
+            - This module is read-only.
+            - Check mode behavior is the same as normal execution.
+        support: N/A
+    diff_mode:
+        description: This module does not support diff mode.
+        support: none
+"""
+
+EXAMPLES = r"""
+---
+- name: Get the CPU usage of the Beszel systems over the last hour
+  community.beszel.system_stats_info:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    since: 1h
+    metrics:
+      - cpu
+  register: stats
+  run_once: true
+
+- name: Do not deploy if the p95 CPU usage of the fleet is above 80%
+  ansible.builtin.assert:
+    that:
+      - stats.fleet.cpu.p95 is none or stats.fleet.cpu.p95 <= 80
+  run_once: true
+
+- name: Get the memory of the containers of a system over the last week
+  community.beszel.system_stats_info:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    names:
+      - instance
+    collection: container_stats
+    type: 120m
+    since: 7d
+    metrics:
+      - m
+    percentiles:
+      - 99
+"""
+
+RETURN = r"""
+---
+stats:
+    description:
+        - Summary of each metric keyed by system name, then by metric.
+        - For O(collection=container_stats), keyed by system name, then by container name,
+          then by metric.
+        - Each summary holds the C(count) of values, their C(mean), C(min) and C(max),
+          and each percentile of O(percentiles), such as C(p95).
+    type: dict
+    returned: always
+    sample: {
+        "instance": {
+            "cpu": {
+                "count": 60,
+                "mean": 12.5,
+                "min": 1.2,
+                "max": 97.3,
+                "p50": 8.1,
+                "p90": 30.4,
+                "p95": 45.2,
+                "p99": 90.8
+            }
+        }
+    }
+fleet:
+    description:
+        - Summary of each metric over all the systems, or containers.
+        - The statistics are V(null) when no values were found.
+    type: dict
+    returned: always
+    sample: {
+        "cpu": {
+            "count": 60,
+            "mean": 12.5,
+            "min": 1.2,
+            "max": 97.3,
+            "p50": 8.1,
+            "p90": 30.4,
+            "p95": 45.2,
+            "p99": 90.8
+        }
+    }
+count:
+    description: Number of stats records read from the Beszel hub.
+    type: int
+    returned: always
+    sample: 60
+since:
+    description: Start of the time window, in UTC.
+    type: str
+    returned: always
+    sample: "2025-08-30T10:08:36+00:00"
+until:
+    description: End of the time window, in UTC.
+    type: str
+    returned: when O(until) is provided
+    sample: "2025-08-30T11:08:36+00:00"
+metrics:
+    description: Summary of the HTTP requests sent to the Beszel hub, see O(collect_metrics).
+    type: dict
+    returned: when O(collect_metrics=true) or O(metrics_file) is provided
+    sample: {
+        "requests": 1,
+        "retries": 0,
+        "errors": 0,
+        "bytes_sent": 0,
+        "bytes_received": 48210,
+        "request_time": 0.021,
+        "elapsed": 0.025,
+        "phases": {
+            "stats": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 48210,
+                "request_time": 0.021,
+                "elapsed": 0.023
+            }
+        },
+        "endpoints": {
+            "GET /api/collections/system_stats/records": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 48210,
+                "request_time": 0.021
+            }
+        }
+    }
+"""
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import missing_required_lib
+from ansible_collections.community.beszel.plugins.module_utils.filter_utils import (
+    all_of,
+    bind,
+    chunked_any_of,
+    equals,
+)
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    metrics_phase,
+    start_metrics,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    PocketBaseClient,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+    iter_records,
+)
+from ansible_collections.community.beszel.plugins.module_utils.stats_utils import (
+    DEFAULT_METRICS,
+    STATS_COLLECTIONS,
+    STATS_TYPES,
+    aggregate_stats,
+    parse_time,
+    summarize_stats,
+)
+
+
+def module_kwargs() -> dict:
+    """Get the keyword arguments to create the module with.
+
+    Returns:
+        dict: The argument spec and the constraints between the options.
+    """
+    module_args = pocketbase_argument_spec()
+    module_args.update(
+        names=dict(type="list", required=False, elements="str"),
+        collection=dict(
+            type="str",
+            required=False,
+            default="system_stats",
+            choices=list(STATS_COLLECTIONS),
+        ),
+        type=dict(type="str", required=False, default="1m", choices=list(STATS_TYPES)),
+        since=dict(type="str", required=False, default="1h"),
+        until=dict(type="str", required=False),
+        filter=dict(type="str", required=False),
+        metrics=dict(type="list", required=False, elements="str"),
+        percentiles=dict(
+            type="list", required=False, elements="float", default=[50, 90, 95, 99]
+        ),
+        per_page=dict(type="int", required=False, default=500),
+    )
+    return dict(argument_spec=module_args, supports_check_mode=True)
+
+
+def get_system_names(client, names) -> dict:
+    """Get the names of the systems keyed by ID.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        names (Union[List[str], None]): The names of the systems to get. They are
+            combined into the filter in chunks of FILTER_CHUNK_SIZE. If None, all
+            systems are returned.
+
+    Returns:
+        dict: The names of the systems keyed by ID.
+    """
+    if names is None:
+        name_filters = [None]
+    else:
+        name_filters = chunked_any_of("name", names)
+    system_names = {}
+    for name_filter in name_filters:
+        query_params = {"fields": "id,name"}
+        if name_filter is not None:
+            query_params["filter"] = name_filter
+        for record in iter_records(client.collection("systems"), query_params, 500):
+            system_names[record.id] = record.name
+    if names is not None:
+        missing = set(names) - set(system_names.values())
+        if missing:
+            raise Exception(
+                "Failed to get systems {0}: systems do not exist.".format(
+                    ", ".join(f"'{name}'" for name in sorted(missing))
+                )
+            )
+    return system_names
+
+
+def iter_stats_records(client, collection: str, query: str, system_ids, per_page: int):
+    """Lazily iterate over the stats records matching a filter.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        collection (str): The collection of the stats records.
+        query (str): The filter expression of the records.
+        system_ids (Union[List[str], None]): The IDs of the systems to get the
+            records of. They are combined into the filter in chunks of
+            FILTER_CHUNK_SIZE. If None, the records of all systems are returned.
+        per_page (int): The number of records to request per page.
+
+    Yields:
+        Record: The stats records, with their system and stats fields.
+    """
+    if system_ids is None:
+        chunks = [query]
+    else:
+        chunks = [
+            all_of(query, systems) for systems in chunked_any_of("system", system_ids)
+        ]
+    for chunk in chunks:
+        yield from iter_records(
+            client.collection(collection),
+            {"filter": chunk, "fields": "system,stats"},
+            per_page,
+        )
+
+
+def run(module, client=None):
+    """Get the aggregated stats and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client to reuse.
+            If None, a new client is created from the module parameters.
+    """
+    # Note: This module is read-only, so check_mode behavior is the same as normal execution
+    result = dict(changed=False, stats={}, fleet={}, count=0)
+
+    if not HAS_POCKETBASE:
+        module.fail_json(msg=missing_required_lib("pocketbase"))
+    start_metrics(module, "system_stats_info")
+
+    collection = module.params["collection"]
+    metrics = module.params["metrics"] or DEFAULT_METRICS[collection]
+    percentiles = module.params["percentiles"]
+    if any(q < 0 or q > 100 for q in percentiles):
+        module.fail_json(msg="percentiles must be between 0 and 100.")
+    if module.params["per_page"] < 1:
+        module.fail_json(msg="per_page must be at least 1.")
+
+    try:
+        since = parse_time(module.params["since"])
+        until = parse_time(module.params["until"]) if module.params["until"] else None
+    except ValueError as e:
+        module.fail_json(msg=str(e))
+    result["since"] = since.isoformat()
+    until_query = None
+    if until is not None:
+        result["until"] = until.isoformat()
+        until_query = bind("created<={:until}", until=until)
+    query = all_of(
+        equals("type", module.params["type"]),
+        bind("created>={:since}", since=since),
+        until_query,
+        module.params["filter"],
+    )
+
+    if client is None:
+        try:
+            client = PocketBaseClient(
+                **pocketbase_client_args(module.params)
+            ).authenticate()
+        except Exception as e:
+            module.fail_json(msg=str(e))
+
+    try:
+        with metrics_phase("lookup"):
+            system_names = get_system_names(client, module.params["names"])
+        system_ids = None
+        if module.params["names"] is not None:
+            system_ids = list(system_names)
+        # The records are aggregated as the pages are received, so that only
+        # the values of the metrics are held in memory
+        with metrics_phase("stats"):
+            groups, result["count"] = aggregate_stats(
+                iter_stats_records(
+                    client, collection, query, system_ids, module.params["per_page"]
+                ),
+                collection,
+                metrics,
+                system_names,
+            )
+    except Exception as e:
+        module.fail_json(msg=str(e))
+    result["stats"], result["fleet"] = summarize_stats(
+        groups, collection, metrics, percentiles
+    )
+
+    module.exit_json(**result)
+
+
+def run_module():
+    run(AnsibleModule(**module_kwargs()))
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
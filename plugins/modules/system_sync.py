@@ -0,0 +1,481 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+module: system_sync
+
+short_description: Replicate Beszel systems from one Beszel hub to another.
+
+version_added: "1.1.0"
+
+description:
+    - Create and update the systems of the Beszel hub of O(url) so that they match the systems
+      of the O(source) Beszel hub, for example when splitting or consolidating hubs.
+    - The systems of the source hub are requested page by page, and the systems of the
+      destination hub with a single listing, so the systems are compared in memory instead
+      of being looked up one by one.
+    - The users of the systems are mapped between the hubs by email, as the users of each hub
+      have their own IDs.
+    - Only the systems which differ are changed, using the PocketBase batch API when it is
+      enabled on the destination hub. Systems of the destination hub which are not on the
+      source hub are left untouched.
+    - Systems are matched by name. If several systems share a name on a hub, the oldest one is used.
+
+author:
+    - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
+
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+    - community.beszel.pocketbase.module
+
+options:
+    source:
+        description:
+            - The Beszel hub to copy the systems from.
+            - The other connection options, such as O(timeout), apply to both hubs.
+        required: true
+        type: dict
+        suboptions:
+            url:
+                description: URL of the source Beszel hub.
+                required: true
+                type: str
+            username:
+                description:
+                    - Username used to authenticate to the source Beszel hub.
+                      Defaults to O(username).
+                required: false
+                type: str
+            password:
+                description:
+                    - Password used to authenticate to the source Beszel hub.
+                      Defaults to O(password).
+                required: false
+                type: str
+    filter:
+        description:
+            - PocketBase filter expression evaluated by the source hub to select the systems
+              to copy, for example V(host ~ '.eu.example.tld').
+            - If not provided, all systems of the source hub are copied.
+            - See U(https://pocketbase.io/docs/api-records/#listsearch-records) for the syntax.
+        required: false
+        type: str
+    per_page:
+        description: Number of systems to request from the source hub per page.
+        required: false
+        type: int
+        default: 500
+    missing_users:
+        description:
+            - What to do when a user of a system of the source hub does not exist on the
+              destination hub, matched by email.
+            - V(fail) fails the module before changing any system.
+            - V(ignore) leaves the user out of the system on the destination hub.
+        required: false
+        type: str
+        default: fail
+        choices: ["fail", "ignore"]
+    concurrency:
+        description:
+            - Maximum number of systems to create or update at the same time.
+            - When greater than V(1), the requests are sent concurrently over an
+              asynchronous connection to the destination hub instead of in batches,
+              and all failures are reported. Otherwise, the module stops at the first failure.
+        required: false
+        type: int
+        default: 1
+
+attributes:
+    check_mode:
+        description: This module supports check mode.
+        support: full
+    diff_mode:
+        description:
+            - This module supports diff mode.
+            - Only the host, port and users of the systems which are changed are shown,
+              keyed by system name.
+        support: full
+"""
+
+EXAMPLES = r"""
+---
+- name: Copy the systems of the old Beszel hub to the new one
+  community.beszel.system_sync:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    source:
+      url: https://beszel-old.example.tld
+
+- name: Show the systems of the EU region which would be moved to the EU hub
+  community.beszel.system_sync:
+    url: https://beszel-eu.example.tld
+    username: admin@example.com
+    password: admin
+    source:
+      url: https://beszel.example.tld
+      password: other
+    filter: host ~ '.eu.example.tld'
+    missing_users: ignore
+  check_mode: true
+"""
+
+RETURN = r"""
+---
+summary:
+    description: Number of systems of the source hub, and of systems created, updated and unchanged.
+    type: dict
+    returned: always
+    sample: {
+        "source": 120,
+        "created": 100,
+        "updated": 2,
+        "unchanged": 18
+    }
+systems:
+    description:
+        - Name and C(action) of each system which was changed, or would be changed in check mode,
+          either V(create) or V(update).
+        - On failure, the error C(msg) of the systems which failed.
+    type: list
+    elements: dict
+    returned: always
+    sample: [
+        {
+            "name": "instance",
+            "action": "create"
+        }
+    ]
+metrics:
+    description: Summary of the HTTP requests sent to the Beszel hub, see O(collect_metrics).
+    type: dict
+    returned: when O(collect_metrics=true) or O(metrics_file) is provided
+    sample: {
+        "requests": 1,
+        "retries": 0,
+        "errors": 0,
+        "bytes_sent": 0,
+        "bytes_received": 5310,
+        "request_time": 0.021,
+        "elapsed": 0.025,
+        "phases": {
+            "source": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 5310,
+                "request_time": 0.021,
+                "elapsed": 0.023
+            }
+        },
+        "endpoints": {
+            "GET /api/collections/systems/records": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 5310,
+                "request_time": 0.021
+            }
+        }
+    }
+"""
+
+from typing import Dict, List, Tuple
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import missing_required_lib
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    metrics_phase,
+    start_metrics,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    PocketBaseClient,
+    iter_records,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+)
+from ansible_collections.community.beszel.plugins.module_utils.system_utils import (
+    apply_plan_async,
+    apply_plans,
+    get_user_emails,
+    get_user_ids,
+    index_systems,
+    list_systems,
+    normalize_port,
+    plan_diff,
+    plan_system,
+)
+
+
+def module_kwargs() -> dict:
+    """Get the keyword arguments to create the module with.
+
+    Returns:
+        dict: The argument spec and the constraints between the options.
+    """
+    module_args = pocketbase_argument_spec()
+    module_args.update(
+        source=dict(
+            type="dict",
+            required=True,
+            options=dict(
+                url=dict(type="str", required=True),
+                username=dict(type="str", required=False),
+                password=dict(type="str", required=False, no_log=True),
+            ),
+        ),
+        filter=dict(type="str", required=False),
+        per_page=dict(type="int", required=False, default=500),
+        missing_users=dict(
+            type="str", required=False, default="fail", choices=["fail", "ignore"]
+        ),
+        concurrency=dict(type="int", required=False, default=1),
+    )
+    return dict(argument_spec=module_args, supports_check_mode=True)
+
+
+def source_client(module):
+    """Get an authenticated client of the source hub.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+
+    Returns:
+        PocketBase: The authenticated PocketBase client.
+    """
+    source = module.params["source"]
+    client_args = pocketbase_client_args(
+        dict(
+            module.params,
+            url=source["url"],
+            username=source["username"] or module.params["username"],
+            password=source["password"] or module.params["password"],
+        )
+    )
+    # Modules running on the controller share the client between tasks
+    get_client = getattr(module, "get_client", None)
+    if get_client is not None:
+        return get_client(client_args)
+    return PocketBaseClient(**client_args).authenticate()
+
+
+def get_source_systems(module, client) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """Get the systems of the source hub, with the emails of their users.
+
+    Only the fields copied to the destination hub are requested, one page
+    at a time.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (PocketBase): The authenticated PocketBase client of the source hub.
+
+    Returns:
+        Tuple[Dict[str, dict], Dict[str, str]]: The systems keyed by name, keeping
+            the oldest of the systems sharing a name, and the lowercase emails of
+            their users keyed by ID.
+    """
+    query_params = {"sort": "created", "fields": "id,name,host,port,users"}
+    if module.params["filter"]:
+        query_params["filter"] = module.params["filter"]
+    systems = {}
+    for record in iter_records(
+        client.collection("systems"), query_params, module.params["per_page"]
+    ):
+        systems.setdefault(
+            record.name,
+            dict(
+                name=record.name,
+                host=record.host,
+                port=normalize_port(record.port),
+                users=list(record.users or []),
+                state="present",
+            ),
+        )
+    user_ids = set(user for system in systems.values() for user in system["users"])
+    return systems, get_user_emails(client, sorted(user_ids))
+
+
+def map_users(
+    module, systems: Dict[str, dict], emails: Dict[str, str], user_ids: Dict[str, str]
+) -> Dict[str, List[str]]:
+    """Map the users of the systems of the source hub to the users of the destination hub.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        systems (Dict[str, dict]): The systems of the source hub keyed by name.
+        emails (Dict[str, str]): The emails of the users of the source hub keyed by ID.
+        user_ids (Dict[str, str]): The IDs of the users of the destination hub keyed
+            by lowercase email.
+
+    Returns:
+        Dict[str, List[str]]: The IDs of the users of each system on the
+            destination hub, keyed by system name.
+    """
+    missing = set()
+    users = {}
+    for name, system in systems.items():
+        users[name] = []
+        for user in system["users"]:
+            # Users which do not exist on the source hub are reported by ID
+            email = emails.get(user, user)
+            if email in user_ids:
+                users[name].append(user_ids[email])
+            else:
+                missing.add(email)
+    if missing and module.params["missing_users"] == "fail":
+        module.fail_json(
+            msg="Users of the source hub do not exist on the destination hub: {0}.".format(
+                ", ".join(f"'{user}'" for user in sorted(missing))
+            ),
+            systems=[],
+        )
+    return users
+
+
+def apply_plan_operation(name: str, existing, plan: dict):
+    """Get the operation sending the request of a plan for run_concurrently.
+
+    Args:
+        name (str): The name of the system.
+        existing (Union[dict, None]): The existing system, or None if it does not exist.
+        plan (dict): The plan, as returned by plan_system.
+
+    Returns:
+        Callable: The function taking the asynchronous client and returning the
+            coroutine sending the request.
+    """
+    return lambda client: apply_plan_async(client, name, existing, plan)
+
+
+def run(module, client=None):
+    """Copy the systems of the source hub to the destination hub and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client of the
+            destination hub to reuse. If None, a new client is created from the
+            module parameters.
+    """
+    result = dict(changed=False, msg="", summary={}, systems=[])
+
+    if not HAS_POCKETBASE:
+        module.fail_json(msg=missing_required_lib("pocketbase"))
+    start_metrics(module, "system_sync")
+    if module.params["per_page"] < 1:
+        result["msg"] = "per_page must be at least 1."
+        module.fail_json(**result)
+
+    try:
+        if client is None:
+            client = PocketBaseClient(
+                **pocketbase_client_args(module.params)
+            ).authenticate()
+        source = source_client(module)
+    except Exception as e:
+        result["msg"] = str(e)
+        module.fail_json(**result)
+
+    try:
+        with metrics_phase("source"):
+            systems, emails = get_source_systems(module, source)
+    except Exception as e:
+        result["msg"] = f"Failed to get the systems of the source hub: {e}"
+        module.fail_json(**result)
+
+    try:
+        with metrics_phase("users"):
+            user_ids = get_user_ids(client, sorted(set(emails.values())))
+        with metrics_phase("lookup"):
+            existing_systems = index_systems(list_systems(client))
+    except Exception as e:
+        result["msg"] = f"Failed to get the systems of the destination hub: {e}"
+        module.fail_json(**result)
+    users = map_users(module, systems, emails, user_ids)
+
+    changes = []
+    diff = dict(before={}, after={})
+    for name, desired in systems.items():
+        existing = existing_systems.get(name)
+        plan = plan_system(desired, existing, users[name])
+        if plan is None:
+            continue
+        changes.append((name, existing, plan))
+        system_diff = plan_diff(existing, plan)
+        for key in ("before", "after"):
+            if system_diff[key]:
+                diff[key][name] = system_diff[key]
+    if module.check_mode:
+        outcomes = [None] * len(changes)
+    elif module.params["concurrency"] > 1:
+        from ansible_collections.community.beszel.plugins.module_utils.pocketbase_async import (
+            run_concurrently,
+        )
+
+        try:
+            with metrics_phase("write"):
+                outcomes = run_concurrently(
+                    pocketbase_client_args(module.params),
+                    [apply_plan_operation(*change) for change in changes],
+                    module.params["concurrency"],
+                    token=client.auth_store.token,
+                )
+        except Exception as e:
+            result["msg"] = str(e)
+            module.fail_json(**result)
+    else:
+        with metrics_phase("write"):
+            outcomes = apply_plans(client, changes)
+
+    counts = dict(create=0, update=0)
+    errors = []
+    for (name, _existing, plan), outcome in zip(changes, outcomes):
+        if isinstance(outcome, Exception):
+            errors.append(str(outcome))
+            result["systems"].append(
+                dict(name=name, action=plan["action"], msg=str(outcome))
+            )
+            continue
+        counts[plan["action"]] += 1
+        result["systems"].append(dict(name=name, action=plan["action"]))
+    result["changed"] = any(counts.values())
+    result["summary"] = dict(
+        source=len(users),
+        created=counts["create"],
+        updated=counts["update"],
+        unchanged=len(users) - len(changes),
+    )
+    if module._diff:
+        result["diff"] = diff
+    if errors:
+        # Only report the distinct errors, as a failed batch fails all its systems
+        result["msg"] = " ".join(dict.fromkeys(errors))
+        module.fail_json(**result)
+
+    verb = "would be" if module.check_mode else "were"
+    result["msg"] = (
+        f"{counts['create']} system(s) {verb} created and "
+        f"{counts['update']} system(s) {verb} updated."
+    )
+    module.exit_json(**result)
+
+
+def run_module():
+    run(AnsibleModule(**module_kwargs()))
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/python
+
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+DOCUMENTATION = r"""
+---
+module: system_wait
+
+short_description: Wait for Beszel systems to reach a status.
+
+version_added: "1.1.0"
+
+description:
+    - Wait until all the given Beszel systems have the desired status, for example until the
+      Beszel hub marks the systems as V(up) after their agents have been started.
+    - The module subscribes to the realtime events of the systems of the Beszel hub, so it returns
+      as soon as the last system changes status, using a single connection.
+    - If the realtime API of the Beszel hub cannot be used, the module falls back to polling
+      the systems that do not have the desired status yet, see O(method).
+    - Systems that do not exist yet, for example because their agent registers them with the
+      universal token, are waited for until they are created.
+
+author:
+    - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
+
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+    - community.beszel.pocketbase.module
+
+options:
+    names:
+        description: Names of the Beszel systems to wait for.
+        required: true
+        type: list
+        elements: str
+    status:
+        description: Status to wait for the systems to have.
+        required: false
+        type: str
+        default: up
+        choices: ["up", "down", "paused", "pending"]
+    wait_timeout:
+        description:
+            - Maximum number of seconds to wait for the systems to have the status.
+            - The module fails if the timeout expires.
+        required: false
+        type: float
+        default: 300
+    method:
+        description:
+            - How to be notified of the changes of the systems.
+            - V(realtime) subscribes to the realtime events of the Beszel hub.
+            - V(poll) requests the systems that do not have the status yet
+              every O(poll_interval) seconds.
+            - V(auto) uses V(realtime), and falls back to V(poll) if the realtime connection
+              cannot be established.
+        required: false
+        type: str
+        default: auto
+        choices: ["auto", "realtime", "poll"]
+    poll_interval:
+        description:
+            - Number of seconds to wait between requests when polling.
+            - Also the number of seconds to wait before subscribing again when the realtime
+              connection fails.
+            - Must be greater than V(0).
+        required: false
+        type: float
+        default: 5
+
+attributes:
+    check_mode:
+        description: This module does not support check mode.
+        details:
+            - This module is read-only.
+            - Check mode behavior is the same as normal execution.
+        support: N/A
+    diff_mode:
+        description: This module does not support diff mode.
+        support: none
+"""
+
+EXAMPLES = r"""
+---
+- name: Wait for the Beszel systems of all hosts to be up
+  community.beszel.system_wait:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    names: "{{ ansible_play_hosts }}"
+    wait_timeout: 120
+  run_once: true
+
+- name: Wait for a Beszel system to be paused by polling
+  community.beszel.system_wait:
+    url: https://beszel.example.tld
+    username: admin@example.com
+    password: admin
+    names:
+      - instance
+    status: paused
+    method: poll
+    poll_interval: 10
+"""
+
+RETURN = r"""
+---
+systems:
+    description:
+        - The ID, name and status of the systems that exist.
+        - Returned on failure too, to show the systems that do not have the status.
+    type: list
+    elements: dict
+    returned: always
+    sample: [
+        {
+            "id": "q5y5h742bwueyns",
+            "name": "instance",
+            "status": "up"
+        }
+    ]
+method:
+    description:
+        - How the module was notified of the changes of the systems,
+          either V(realtime) or V(poll).
+    type: str
+    returned: always
+    sample: realtime
+elapsed:
+    description: Number of seconds waited for.
+    type: float
+    returned: always
+    sample: 12.3
+metrics:
+    description: Summary of the HTTP requests sent to the Beszel hub, see O(collect_metrics).
+    type: dict
+    returned: when O(collect_metrics=true) or O(metrics_file) is provided
+    sample: {
+        "requests": 1,
+        "retries": 0,
+        "errors": 0,
+        "bytes_sent": 0,
+        "bytes_received": 1191,
+        "request_time": 0.021,
+        "elapsed": 0.025,
+        "phases": {
+            "lookup": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 1191,
+                "request_time": 0.021,
+                "elapsed": 0.023
+            }
+        },
+        "endpoints": {
+            "GET /api/collections/systems/records": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 0,
+                "bytes_received": 1191,
+                "request_time": 0.021
+            }
+        }
+    }
+"""
+
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.basic import missing_required_lib
+from ansible_collections.community.beszel.plugins.module_utils.filter_utils import (
+    FILTER_CHUNK_SIZE,
+    chunked_any_of,
+)
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    metrics_phase,
+    start_metrics,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    PocketBaseClient,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+)
+from ansible_collections.community.beszel.plugins.module_utils.realtime_utils import (
+    RealtimeSubscription,
+)
+
+
+def module_kwargs() -> dict:
+    """Get the keyword arguments to create the module with.
+
+    Returns:
+        dict: The argument spec and the constraints between the options.
+    """
+    module_args = pocketbase_argument_spec()
+    module_args.update(
+        names=dict(type="list", required=True, elements="str"),
+        status=dict(
+            type="str",
+            required=False,
+            default="up",
+            choices=["up", "down", "paused", "pending"],
+        ),
+        wait_timeout=dict(type="float", required=False, default=300),
+        method=dict(
+            type="str",
+            required=False,
+            default="auto",
+            choices=["auto", "realtime", "poll"],
+        ),
+        poll_interval=dict(type="float", required=False, default=5),
+    )
+    return dict(argument_spec=module_args, supports_check_mode=True)
+
+
+class SystemWaiter:
+    """Track the status of the systems being waited for.
+
+    Args:
+        names (List[str]): The names of the systems.
+        status (str): The status to wait for.
+    """
+
+    def __init__(self, names, status: str):
+        self.names = set(names)
+        self.status = status
+        self.systems = {}
+
+    @property
+    def pending(self) -> list:
+        """The names of the systems that do not have the status yet, sorted."""
+        return sorted(
+            name
+            for name in self.names
+            if self.systems.get(name, {}).get("status") != self.status
+        )
+
+    def update(self, record: dict, action: str = "update"):
+        """Update the status of a system from a record.
+
+        Args:
+            record (dict): The record of the system.
+            action (str): The action of the realtime event, either create, update or delete.
+        """
+        if record.get("name") not in self.names:
+            return
+        if action == "delete":
+            if self.systems.get(record["name"], {}).get("id") == record.get("id"):
+                self.systems.pop(record["name"])
+            return
+        self.systems[record["name"]] = dict(
+            id=record.get("id"), name=record["name"], status=record.get("status")
+        )
+
+    def refresh(self, client):
+        """Get the pending systems from the hub.
+
+        Only the systems that do not have the status yet are requested, with a
+        single OR-combined filter per chunk of FILTER_CHUNK_SIZE names.
+
+        Args:
+            client (PocketBase): The authenticated PocketBase client.
+        """
+        with metrics_phase("lookup"):
+            for query in chunked_any_of("name", self.pending):
+                for record in client.collection("systems").get_full_list(
+                    batch=FILTER_CHUNK_SIZE,
+                    query_params={"filter": query, "fields": "id,name,status"},
+                ):
+                    self.update(
+                        dict(id=record.id, name=record.name, status=record.status)
+                    )
+
+    def result(self) -> list:
+        """The systems that exist, sorted by name."""
+        return [self.systems[name] for name in sorted(self.systems)]
+
+
+def subscribe(client, connect_timeout: float):
+    """Subscribe to the realtime events of the systems.
+
+    Args:
+        client (PocketBase): The authenticated PocketBase client.
+        connect_timeout (float): The number of seconds to wait for the connection.
+
+    Returns:
+        RealtimeSubscription: The connected subscription.
+    """
+    subscription = RealtimeSubscription(client, ["systems"], connect_timeout)
+    try:
+        with metrics_phase("subscribe"):
+            return subscription.connect()
+    except Exception:
+        subscription.close()
+        raise
+
+
+def run(module, client=None):
+    """Wait for the systems and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client to reuse.
+            If None, a new client is created from the module parameters.
+    """
+    # Note: This module is read-only, so check_mode behavior is the same as normal execution
+    result = dict(changed=False, systems=[], method=module.params["method"])
+
+    if not HAS_POCKETBASE:
+        module.fail_json(msg=missing_required_lib("pocketbase"))
+    start_metrics(module, "system_wait")
+    if module.params["poll_interval"] <= 0:
+        module.fail_json(msg="poll_interval must be greater than 0.")
+
+    if client is None:
+        try:
+            client = PocketBaseClient(
+                **pocketbase_client_args(module.params)
+            ).authenticate()
+        except Exception as e:
+            module.fail_json(msg=str(e))
+
+    start = time.monotonic()
+    deadline = start + module.params["wait_timeout"]
+    waiter = SystemWaiter(module.params["names"], module.params["status"])
+    subscription = None
+    try:
+        # Subscribe before getting the systems, so that no change is missed in between
+        if module.params["method"] != "poll":
+            try:
+                subscription = subscribe(client, module.params["connect_timeout"])
+            except Exception as e:
+                if module.params["method"] == "realtime":
+                    raise Exception(f"Failed to subscribe to realtime events: {e}")
+        result["method"] = "poll" if subscription is None else "realtime"
+        waiter.refresh(client)
+        while waiter.pending and time.monotonic() < deadline:
+            if subscription is None:
+                # The deadline may have passed since the loop condition was checked
+                remaining = deadline - time.monotonic()
+                time.sleep(max(0, min(module.params["poll_interval"], remaining)))
+                waiter.refresh(client)
+                continue
+            try:
+                event = subscription.get(deadline - time.monotonic())
+            except Exception:
+                # The hub closes idle realtime connections, so subscribe again
+                # and get the systems that may have changed meanwhile. Wait
+                # before that, so that a failing hub is not flooded with requests
+                subscription.close()
+                subscription = None
+                remaining = deadline - time.monotonic()
+                time.sleep(max(0, min(module.params["poll_interval"], remaining)))
+                subscription = subscribe(client, module.params["connect_timeout"])
+                waiter.refresh(client)
+                continue
+            if event is not None:
+                waiter.update(event.get("record") or {}, event.get("action"))
+    except Exception as e:
+        result["systems"] = waiter.result()
+        module.fail_json(msg=str(e), **result)
+    finally:
+        if subscription is not None:
+            subscription.close()
+
+    result["systems"] = waiter.result()
+    result["elapsed"] = round(time.monotonic() - start, 3)
+    if waiter.pending:
+        module.fail_json(
+            msg="Timed out waiting for systems {0} to be {1}.".format(
+                ", ".join(f"'{name}'" for name in waiter.pending),
+                module.params["status"],
+            ),
+            **result,
+        )
+    module.exit_json(**result)
+
+
+def run_module():
+    run(AnsibleModule(**module_kwargs()))
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
@@ -15,29 +15,17 @@ short_description: Enable or disable the universal token for the Beszel hub.
 
 version_added: "0.6.0"
 
-description: Enable or disable the universal token for the Beszel hub.
+description:
+    - Enable or disable the universal token for the Beszel hub.
 
 author:
     - Daniel Brennand (@dbrennand) <contact@danielbrennand.com>
 
+extends_documentation_fragment:
+    - community.beszel.pocketbase
+    - community.beszel.pocketbase.module
+
 options:
-    url:
-        description: URL of the Beszel hub.
-        required: true
-        type: str
-    username:
-        description: Username used to authenticate to Beszel hub.
-        required: true
-        type: str
-    password:
-        description: Password used to authenticate to Beszel hub.
-        required: true
-        type: str
-    timeout:
-        description: Number of seconds to wait for the Beszel hub to respond.
-        required: false
-        type: float
-        default: 120
     state:
         description: State of the universal token.
         required: false
@@ -98,31 +86,64 @@ universal_token:
         "active": true,
         "permanent": false
     }
+metrics:
+    description: Summary of the HTTP requests sent to the Beszel hub, see O(collect_metrics).
+    type: dict
+    returned: when O(collect_metrics=true) or O(metrics_file) is provided
+    sample: {
+        "requests": 1,
+        "retries": 0,
+        "errors": 0,
+        "bytes_sent": 61,
+        "bytes_received": 702,
+        "request_time": 0.021,
+        "elapsed": 0.025,
+        "phases": {
+            "login": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 61,
+                "bytes_received": 702,
+                "request_time": 0.021,
+                "elapsed": 0.023
+            }
+        },
+        "endpoints": {
+            "POST /api/collections/users/auth-with-password": {
+                "requests": 1,
+                "retries": 0,
+                "errors": 0,
+                "bytes_sent": 61,
+                "bytes_received": 702,
+                "request_time": 0.021
+            }
+        }
+    }
 """
 
-import traceback
-
-try:
-    from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
-        PocketBaseClient,
-    )
-except ImportError:
-    HAS_POCKETBASE = False
-    POCKETBASE_IMPORT_ERROR = traceback.format_exc()
-else:
-    HAS_POCKETBASE = True
-    POCKETBASE_IMPORT_ERROR = None
-
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.basic import missing_required_lib
-
-
-def run_module():
-    module_args = dict(
-        url=dict(type="str", required=True),
-        username=dict(type="str", required=True),
-        password=dict(type="str", required=True, no_log=True),
-        timeout=dict(type="float", required=False, default=120),
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    metrics_phase,
+    start_metrics,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    PocketBaseClient,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+)
+
+
+def module_kwargs() -> dict:
+    """Get the keyword arguments to create the module with.
+
+    Returns:
+        dict: The argument spec and the constraints between the options.
+    """
+    module_args = pocketbase_argument_spec()
+    module_args.update(
         state=dict(
             type="str",
             required=False,
@@ -136,29 +157,35 @@ def run_module():
             choices=["ephemeral", "permanent"],
         ),
     )
+    return dict(argument_spec=module_args, supports_check_mode=True)
 
-    result = dict(changed=False, universal_token={})
 
-    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+def run(module, client=None):
+    """Bring the universal token into the desired state and exit the module.
+
+    Args:
+        module (AnsibleModule): The Ansible module instance.
+        client (Union[PocketBase, None]): An authenticated PocketBase client to reuse.
+            If None, a new client is created from the module parameters.
+    """
+    result = dict(changed=False, universal_token={})
 
     if not HAS_POCKETBASE:
-        module.fail_json(
-            msg=missing_required_lib("pocketbase"), exception=POCKETBASE_IMPORT_ERROR
-        )
+        module.fail_json(msg=missing_required_lib("pocketbase"))
+    start_metrics(module, "universal_token")
 
-    try:
-        client = PocketBaseClient(
-            url=module.params["url"],
-            username=module.params["username"],
-            password=module.params["password"],
-            timeout=module.params["timeout"],
-        ).authenticate_user()
-    except Exception as e:
-        module.fail_json(msg=str(e))
+    if client is None:
+        try:
+            client = PocketBaseClient(
+                **pocketbase_client_args(module.params)
+            ).authenticate_user()
+        except Exception as e:
+            module.fail_json(msg=str(e))
 
     # Get the current universal token state
     try:
-        universal_token_response = client._send("/api/beszel/universal-token", {})
+        with metrics_phase("lookup"):
+            universal_token_response = client._send("/api/beszel/universal-token", {})
         universal_token_current_state = universal_token_response.json()
     except Exception as e:
         module.fail_json(msg=str(e))
@@ -185,7 +212,8 @@ def run_module():
                 token_url = (
                     f"{token_url}&token={universal_token_current_state['token']}"
                 )
-            universal_token_response = client._send(token_url, {})
+            with metrics_phase("write"):
+                universal_token_response = client._send(token_url, {})
             result["changed"] = True
             result["universal_token"] = universal_token_response.json()
         except Exception as e:
@@ -194,6 +222,10 @@ def run_module():
     module.exit_json(**result)
 
 
+def run_module():
+    run(AnsibleModule(**module_kwargs()))
+
+
 def main():
     run_module()
 
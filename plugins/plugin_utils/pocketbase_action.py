@@ -0,0 +1,176 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import os
+from typing import Union
+
+from ansible.module_utils.common.arg_spec import ArgumentSpecValidator
+from ansible.module_utils.common.parameters import remove_values
+from ansible.plugins.action import ActionBase
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HAS_POCKETBASE,
+    ModuleExit,
+    PocketBaseClient,
+    pocketbase_client_args,
+)
+
+# Authenticated clients shared by all plugins running in the same process
+_CLIENTS = {}
+
+
+def get_client(client_args: dict, auth_type: str = "admin"):
+    """Get an authenticated client, reusing the one created by a previous plugin run.
+
+    Args:
+        client_args (dict): The keyword arguments for PocketBaseClient.
+        auth_type (str): Either admin or user.
+
+    Returns:
+        PocketBase: The authenticated PocketBase client.
+    """
+    key = (auth_type,) + tuple(sorted(client_args.items()))
+    if key not in _CLIENTS:
+        pocketbase_client = PocketBaseClient(**client_args)
+        if auth_type == "user":
+            _CLIENTS[key] = pocketbase_client.authenticate_user()
+        else:
+            _CLIENTS[key] = pocketbase_client.authenticate()
+    return _CLIENTS[key]
+
+
+def list_no_log_values(argument_spec: dict, params: dict) -> set:
+    """List the values of the no_log options, including those of the suboptions.
+
+    Args:
+        argument_spec (dict): The argument spec of the module.
+        params (dict): The module parameters validated against the argument spec.
+
+    Returns:
+        set: The string values to remove from the result of the module.
+    """
+    no_log_values = set()
+    for option, spec in argument_spec.items():
+        value = params.get(option)
+        if value is None:
+            continue
+        if spec.get("no_log"):
+            no_log_values.add(str(value))
+        if spec.get("options"):
+            for sub_params in value if isinstance(value, list) else [value]:
+                if isinstance(sub_params, dict):
+                    no_log_values.update(
+                        list_no_log_values(spec["options"], sub_params)
+                    )
+    return no_log_values
+
+
+class ControllerModule:
+    """Minimal stand-in for AnsibleModule to run module code on the controller."""
+
+    def __init__(
+        self,
+        params: dict,
+        check_mode: bool = False,
+        diff: bool = False,
+        auth_type: str = "admin",
+        no_log_values: Union[set, None] = None,
+    ):
+        self.params = params
+        self.check_mode = check_mode
+        self._diff = diff
+        self.auth_type = auth_type
+        self.no_log_values = no_log_values or set()
+        self._warnings = []
+
+    def get_client(self, client_args: dict):
+        """Get an authenticated client shared with the other plugins, such as for each hub."""
+        return get_client(client_args, self.auth_type)
+
+    def warn(self, warning: str):
+        self._warnings.append(warning)
+
+    def atomic_move(self, src: str, dest: str):
+        os.replace(src, dest)
+
+    def exit_json(self, **kwargs):
+        if self._warnings:
+            kwargs["warnings"] = self._warnings
+        raise ModuleExit(remove_values(kwargs, self.no_log_values))
+
+    def fail_json(self, msg: str, **kwargs):
+        kwargs["failed"] = True
+        kwargs["msg"] = msg
+        self.exit_json(**kwargs)
+
+
+class PocketBaseActionModule(ActionBase):
+    """Run a Beszel hub API module in the controller process.
+
+    The module only talks to the Beszel hub, so when the task already runs on
+    the controller, with delegate_to localhost or the local connection, there
+    is no need to transfer it and start a new interpreter. Otherwise, or if
+    the pocketbase library is not installed on the controller, or the task is
+    async, the module is executed as usual, so that the files it reads and
+    writes stay on the host the task runs on.
+    """
+
+    # The module to run, which must provide module_kwargs and run functions
+    MODULE = None
+    # The type of authentication the module uses, either admin or user
+    AUTH_TYPE = "admin"
+
+    _supports_check_mode = True
+    _supports_async = True
+
+    def _runs_locally(self) -> bool:
+        """Whether the module can run in the controller process."""
+        return (
+            HAS_POCKETBASE and getattr(self._connection, "transport", None) == "local"
+        )
+
+    def run(self, tmp=None, task_vars=None):
+        result = super(PocketBaseActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        if not self._runs_locally() or self._task.async_val:
+            result.update(
+                self._execute_module(
+                    module_name=self._task.action,
+                    task_vars=task_vars,
+                    wrap_async=self._task.async_val,
+                )
+            )
+            return result
+
+        module_kwargs = self.MODULE.module_kwargs()
+        module_kwargs.pop("supports_check_mode", None)
+        validation = ArgumentSpecValidator(**module_kwargs).validate(self._task.args)
+        if validation.error_messages:
+            result.update(failed=True, msg=validation.errors.msg)
+            return result
+        params = validation.validated_parameters
+
+        module = ControllerModule(
+            params,
+            check_mode=self._task.check_mode,
+            diff=self._task.diff,
+            auth_type=self.AUTH_TYPE,
+            no_log_values=list_no_log_values(module_kwargs["argument_spec"], params),
+        )
+        client = None
+        # Modules running against many hubs get the client of each hub themselves
+        if not params.get("hubs"):
+            try:
+                client = module.get_client(pocketbase_client_args(params))
+            except Exception as e:
+                result.update(failed=True, msg=str(e))
+                return result
+        try:
+            self.MODULE.run(module, client)
+        except ModuleExit as e:
+            result.update(e.result)
+        return result
@@ -0,0 +1,147 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import json
+import os
+import tracemalloc
+import warnings
+
+from unittest.mock import patch
+
+import pytest
+
+from ansible.module_utils import basic
+from ansible_collections.community.internal_test_tools.tests.unit.plugins.modules.utils import (
+    AnsibleExitJson,
+    exit_json,
+    fail_json,
+    set_module_args,
+)
+
+from .fake_hub import FakeHub
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Peak memory may vary between Python versions, so only a larger increase
+# than this factor over the baseline is reported as a regression
+MEMORY_TOLERANCE = 1.5
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("beszel", "Beszel benchmarks")
+    group.addoption(
+        "--hub-latency",
+        type=float,
+        default=0.0,
+        help="Milliseconds every request to the fake Beszel hub is delayed by.",
+    )
+    group.addoption(
+        "--update-baseline",
+        action="store_true",
+        default=False,
+        help="Store the request counts and peak memory of the benchmarks as the baseline.",
+    )
+
+
+def pytest_configure(config):
+    # Raised by the pocketbase library for every admin authentication
+    config.addinivalue_line("filterwarnings", "ignore:admins is deprecated")
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    """The request counts and peak memory of each benchmark, stored in baseline.json."""
+    data = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            data = json.load(f)
+    yield data
+    if request.config.getoption("--update-baseline"):
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+@pytest.fixture
+def hub(request):
+    """A running fake Beszel hub."""
+    with FakeHub(latency=request.config.getoption("--hub-latency") / 1000) as hub:
+        yield hub
+
+
+@pytest.fixture
+def hub_args(hub):
+    """The connection options of the modules for the fake Beszel hub."""
+    return dict(url=hub.url, username=hub.admin, password="password")
+
+
+def run_module(module, args: dict) -> dict:
+    """Run a module in-process.
+
+    Args:
+        module (module): The module of the collection.
+        args (dict): The module arguments.
+
+    Returns:
+        dict: The result of the module.
+    """
+    with set_module_args(args):
+        with patch.multiple(
+            basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json
+        ):
+            try:
+                module.main()
+            except AnsibleExitJson as e:
+                return e.args[0]
+    raise AssertionError("The module did not exit.")
+
+
+@pytest.fixture
+def measure(request, benchmark, hub, baseline):
+    """Benchmark a module run and compare its request count and peak memory to the baseline.
+
+    The latency is measured by pytest-benchmark, whose own --benchmark-compare
+    and --benchmark-compare-fail options flag latency regressions against a
+    saved run. The number of requests sent to the hub and the peak memory are
+    measured over one more run, stored in the extra info of the benchmark, and
+    checked against baseline.json.
+    """
+
+    def measure(module, args: dict, setup=None, rounds: int = 10) -> dict:
+        setup = setup or (lambda: None)
+        benchmark.pedantic(
+            run_module, args=(module, args), setup=setup, rounds=rounds, warmup_rounds=1
+        )
+
+        setup()
+        hub.reset_requests()
+        tracemalloc.start()
+        try:
+            result = run_module(module, args)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        requests = sum(hub.requests.values())
+        benchmark.extra_info.update(
+            requests=requests,
+            requests_by_route=dict(hub.requests),
+            peak_memory=peak_memory,
+        )
+
+        name = request.node.name
+        if request.config.getoption("--update-baseline"):
+            baseline[name] = dict(requests=requests, peak_memory=peak_memory)
+        elif name not in baseline:
+            warnings.warn(f"No baseline for benchmark {name}.")
+        else:
+            assert requests <= baseline[name]["requests"], (
+                f"{requests} requests were sent to the hub, "
+                f"instead of {baseline[name]['requests']}: {dict(hub.requests)}"
+            )
+            assert peak_memory <= baseline[name]["peak_memory"] * MEMORY_TOLERANCE, (
+                f"Peak memory of {peak_memory} bytes, "
+                f"instead of {baseline[name]['peak_memory']} bytes"
+            )
+        return result
+
+    return measure
@@ -0,0 +1,406 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import base64
+import json
+import re
+import threading
+import time
+import uuid
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Union
+from urllib.parse import parse_qsl, urlsplit
+
+
+def make_token(collection: str, lifetime: int = 86400) -> str:
+    """Make an unsigned JWT, which the PocketBase SDK accepts until it expires.
+
+    Args:
+        collection (str): The auth collection of the token.
+        lifetime (int): The number of seconds the token is valid for.
+
+    Returns:
+        str: The token.
+    """
+    parts = [
+        dict(alg="HS256", typ="JWT"),
+        dict(type="auth", collectionName=collection, exp=int(time.time()) + lifetime),
+    ]
+    return (
+        ".".join(
+            base64.urlsafe_b64encode(json.dumps(part).encode()).decode().rstrip("=")
+            for part in parts
+        )
+        + ".signature"
+    )
+
+
+FILTER_TOKEN = re.compile(
+    r"\s*(?:(?P<paren>[()])|(?P<logic>&&|\|\|)"
+    r"|(?P<field>[\w.]+)\s*(?P<op>!=|>=|<=|=|>|<)\s*"
+    r"(?P<value>'(?:[^'\\]|\\.)*'|[\w.-]+)|(?P<literal>true|false))"
+)
+
+OPERATORS = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    "<": lambda a, b: a is not None and a < b,
+}
+
+
+def parse_filter(expression: str) -> Callable[[dict], bool]:
+    """Compile the subset of PocketBase filter expressions used by the collection.
+
+    Comparisons of a field to a literal can be combined with && and ||, and
+    grouped with parentheses.
+
+    Args:
+        expression (str): The filter expression.
+
+    Returns:
+        Callable[[dict], bool]: A function telling whether a record matches.
+    """
+    tokens = []
+    position = 0
+    while position < len(expression.rstrip()):
+        match = FILTER_TOKEN.match(expression, position)
+        if match is None:
+            raise ValueError(f"Unsupported filter: {expression}")
+        tokens.append(match)
+        position = match.end()
+    tokens.append(None)
+    index = 0
+
+    def peek(group: str, value: str) -> bool:
+        token = tokens[index]
+        return token is not None and token.group(group) == value
+
+    def parse_any() -> Callable[[dict], bool]:
+        nonlocal index
+        parts = [parse_all()]
+        while peek("logic", "||"):
+            index += 1
+            parts.append(parse_all())
+        return lambda record: any(part(record) for part in parts)
+
+    def parse_all() -> Callable[[dict], bool]:
+        nonlocal index
+        parts = [parse_term()]
+        while peek("logic", "&&"):
+            index += 1
+            parts.append(parse_term())
+        return lambda record: all(part(record) for part in parts)
+
+    def parse_term() -> Callable[[dict], bool]:
+        nonlocal index
+        token = tokens[index]
+        index += 1
+        if token is None:
+            raise ValueError(f"Unsupported filter: {expression}")
+        if token.group("paren") == "(":
+            term = parse_any()
+            if not peek("paren", ")"):
+                raise ValueError(f"Unsupported filter: {expression}")
+            index += 1
+            return term
+        if token.group("literal"):
+            result = token.group("literal") == "true"
+            return lambda record: result
+        if token.group("field") is None:
+            raise ValueError(f"Unsupported filter: {expression}")
+        field, compare = token.group("field"), OPERATORS[token.group("op")]
+        value = literal(token.group("value"))
+        return lambda record: compare(record.get(field), value)
+
+    matches = parse_any()
+    if tokens[index] is not None:
+        raise ValueError(f"Unsupported filter: {expression}")
+    return matches
+
+
+def literal(value: str):
+    """Convert a literal of a filter expression to a Python value."""
+    if value.startswith("'"):
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    if value == "null":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def format_date(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+
+
+class FakeHub:
+    """Local stand-in for a Beszel hub, serving the PocketBase API used by the modules.
+
+    The hub keeps the systems, users and universal token in memory, and serves
+    the admin and user authentication, the records of the systems and users
+    collections and the universal token endpoint of Beszel. Batch requests are
+    refused, as when they are disabled on the hub.
+
+    Every request is counted, and delayed by the configured latency to model
+    the round trip to a remote hub. Listings are encoded once and cached until
+    the next write, so that the time and memory spent by the hub itself stay
+    out of the measurements of the modules.
+
+    Args:
+        latency (float): The number of seconds every request is delayed by.
+        admin (str): The email of the admin, which also exists as a user.
+    """
+
+    def __init__(self, latency: float = 0.0, admin: str = "admin@example.com"):
+        self.latency = latency
+        self.admin = admin
+        self.systems: List[dict] = []
+        self.users: List[dict] = []
+        self.universal_token = dict(token=str(uuid.uuid4()), active=False)
+        self.requests = Counter()
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.clock = datetime(2025, 8, 30, tzinfo=timezone.utc)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+        self.add_user(admin)
+
+    @property
+    def url(self) -> str:
+        return "http://{0}:{1}".format(*self.server.server_address)
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _record(self, collection: str, **fields) -> dict:
+        self.clock += timedelta(milliseconds=1)
+        return dict(
+            collectionId=f"{collection}_id",
+            collectionName=collection,
+            id=uuid.uuid4().hex[:15],
+            created=format_date(self.clock),
+            updated=format_date(self.clock),
+            **fields,
+        )
+
+    def add_user(self, email: str) -> dict:
+        """Add a user to the users collection.
+
+        Args:
+            email (str): The email of the user.
+
+        Returns:
+            dict: The record of the user.
+        """
+        user = self._record("users", email=email, verified=True)
+        with self.lock:
+            self.users.append(user)
+            self.cache.clear()
+        return user
+
+    def add_system(self, name: str, host: str, port: str = "45876", **fields) -> dict:
+        """Add a system to the systems collection, owned by the admin.
+
+        Args:
+            name (str): The name of the system.
+            host (str): The host of the system.
+            port (str): The port of the agent of the system.
+            **fields: Other fields of the system, such as its status.
+
+        Returns:
+            dict: The record of the system.
+        """
+        system = self._record(
+            "systems",
+            name=name,
+            host=host,
+            port=port,
+            status=fields.pop("status", "up"),
+            users=fields.pop("users", [self.users[0]["id"]]),
+            info=fields.pop("info", dict(cpu=12.5, mp=41.2, dp=63.0, u=86400)),
+            **fields,
+        )
+        with self.lock:
+            self.systems.append(system)
+            self.cache.clear()
+        return system
+
+    def seed_systems(self, count: int):
+        """Replace the systems with the given number of systems."""
+        with self.lock:
+            self.systems.clear()
+        for number in range(count):
+            self.add_system(f"system-{number}", f"10.0.{number // 256}.{number % 256}")
+
+    def find_system(self, name: str) -> Union[dict, None]:
+        with self.lock:
+            return next((s for s in self.systems if s["name"] == name), None)
+
+    def remove_system(self, name: str):
+        with self.lock:
+            self.systems = [s for s in self.systems if s["name"] != name]
+            self.cache.clear()
+
+    def update_system(self, name: str, **fields):
+        with self.lock:
+            for system in self.systems:
+                if system["name"] == name:
+                    system.update(fields)
+            self.cache.clear()
+
+    def reset_requests(self):
+        with self.lock:
+            self.requests.clear()
+
+    def _list(self, records: List[dict], params: dict) -> dict:
+        if params.get("filter"):
+            matches = parse_filter(params["filter"])
+            records = [record for record in records if matches(record)]
+        sort = params.get("sort", "")
+        if sort.lstrip("-") in ("created", "name", "updated"):
+            records = sorted(
+                records, key=lambda r: r[sort.lstrip("-")], reverse=sort[0] == "-"
+            )
+        page = int(params.get("page", 1))
+        per_page = int(params.get("perPage", 30))
+        start = (page - 1) * per_page
+        end = start + per_page
+        items = records[start:end]
+        if params.get("fields"):
+            fields = params["fields"].split(",")
+            items = [
+                dict((k, v) for k, v in item.items() if k in fields) for item in items
+            ]
+        total_items = -1 if params.get("skipTotal") else len(records)
+        return dict(
+            page=page,
+            perPage=per_page,
+            totalItems=total_items,
+            totalPages=-1 if total_items < 0 else -(-total_items // per_page),
+            items=items,
+        )
+
+    def handle(self, method: str, path: str, params: dict, body: dict):
+        """Handle an API request.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path of the request.
+            params (dict): The query parameters.
+            body (dict): The JSON body.
+
+        Returns:
+            Tuple[int, Union[dict, None]]: The status and the JSON response.
+        """
+        match = re.match(
+            r"^/api/collections/(\w+)/(auth-with-password|auth-refresh)$", path
+        )
+        if match and method == "POST":
+            if (
+                match.group(2) == "auth-with-password"
+                and body.get("identity") != self.admin
+            ):
+                return 400, dict(status=400, message="Failed to authenticate.", data={})
+            record = dict(self.users[0], collectionName=match.group(1))
+            return 200, dict(token=make_token(match.group(1)), record=record)
+        if path == "/api/batch":
+            return 403, dict(
+                status=403, message="Batch requests are not allowed.", data={}
+            )
+        if path == "/api/beszel/universal-token":
+            if "enable" in params:
+                self.universal_token["active"] = params["enable"] == "1"
+                self.universal_token["permanent"] = params.get("permanent") == "1"
+            return 200, dict(self.universal_token)
+        match = re.match(r"^/api/collections/(systems|users)/records(?:/(\w+))?$", path)
+        if match is None:
+            return 404, dict(
+                status=404, message="The requested resource wasn't found.", data={}
+            )
+        records = self.systems if match.group(1) == "systems" else self.users
+        record_id = match.group(2)
+        if record_id is None and method == "GET":
+            return 200, self._list(records, params)
+        if record_id is None and method == "POST":
+            return 200, self.add_system(**body)
+        with self.lock:
+            record = next((r for r in records if r["id"] == record_id), None)
+            if record is None:
+                return 404, dict(
+                    status=404, message="The requested resource wasn't found.", data={}
+                )
+            if method == "GET":
+                return 200, record
+            if method == "PATCH":
+                record.update(body, updated=format_date(datetime.now(timezone.utc)))
+                self.cache.clear()
+                return 200, record
+            if method == "DELETE":
+                records.remove(record)
+                self.cache.clear()
+                return 204, None
+        return 405, dict(status=405, message="Method not allowed.", data={})
+
+    def _handler(self):
+        hub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive, like a real hub, so that the connection
+            # pool of the modules is exercised
+            protocol_version = "HTTP/1.1"
+            # The headers and the body are written separately, which Nagle's
+            # algorithm would delay until the client acknowledges the headers
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def _respond(self):
+                time.sleep(hub.latency)
+                url = urlsplit(self.path)
+                params = dict(parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                route = re.sub(r"/records/\w+$", "/records/:id", url.path)
+                with hub.lock:
+                    hub.requests[f"{self.command} {route}"] += 1
+                    content = (
+                        hub.cache.get(self.path) if self.command == "GET" else None
+                    )
+                if content is None:
+                    status, data = hub.handle(self.command, url.path, params, body)
+                    content = (
+                        status,
+                        b"" if data is None else json.dumps(data).encode(),
+                    )
+                    if (
+                        self.command == "GET"
+                        and status == 200
+                        and route.endswith("/records")
+                    ):
+                        with hub.lock:
+                            hub.cache[self.path] = content
+                status, payload = content
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _respond
+
+        return Handler
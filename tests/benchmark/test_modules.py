@@ -0,0 +1,85 @@
+# Copyright: (c) 2025, Daniel Brennand <contact@danielbrennand.com>
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+import pytest
+
+from ansible_collections.community.beszel.plugins.modules import (
+    system,
+    system_info,
+    system_sync,
+    universal_token,
+)
+
+from .conftest import run_module
+from .fake_hub import FakeHub
+
+pytest.importorskip("pytest_benchmark")
+
+SYSTEM = dict(name="instance", host="10.0.0.1", port=45876)
+
+
+@pytest.fixture
+def systems(hub):
+    """Add other systems next to the benchmarked one, as on a real hub."""
+    hub.seed_systems(10)
+
+
+def test_system_create(hub, hub_args, systems, measure):
+    result = measure(
+        system,
+        dict(hub_args, **SYSTEM),
+        setup=lambda: hub.remove_system(SYSTEM["name"]),
+    )
+    assert result["changed"] is True
+
+
+def test_system_update(hub, hub_args, systems, measure):
+    hub.add_system(**SYSTEM)
+    result = measure(
+        system,
+        dict(hub_args, **SYSTEM),
+        setup=lambda: hub.update_system(SYSTEM["name"], host="10.0.0.2"),
+    )
+    assert result["changed"] is True
+
+
+def test_system_noop(hub, hub_args, systems, measure):
+    hub.add_system(**SYSTEM)
+    result = measure(system, dict(hub_args, **SYSTEM))
+    assert result["changed"] is False
+
+
+@pytest.mark.parametrize("count", [10, 1000, 50000])
+def test_system_info_list(hub, hub_args, measure, count):
+    hub.seed_systems(count)
+    # Fewer rounds for the larger hubs, to keep the suite within minutes
+    result = measure(system_info, hub_args, rounds=max(3, min(20, 10000 // count)))
+    assert len(result["systems"]) == count
+
+
+@pytest.mark.parametrize("count", [1000, 50000])
+def test_system_info_cached(hub, hub_args, measure, tmp_path, count):
+    hub.seed_systems(count)
+    args = dict(hub_args, systems_cache=str(tmp_path / "systems.json"))
+    # Fill the cache, so that only the changes are requested by the measured runs
+    run_module(system_info, args)
+    result = measure(system_info, args, rounds=max(3, min(20, 10000 // count)))
+    assert len(result["systems"]) == count
+
+
+def test_system_sync(hub, hub_args, measure):
+    with FakeHub() as source:
+        source.seed_systems(100)
+        args = dict(hub_args, source=dict(url=source.url))
+        # Start every run from an empty destination hub
+        result = measure(system_sync, args, setup=lambda: hub.seed_systems(0))
+    assert result["summary"]["created"] == 100
+
+
+@pytest.mark.parametrize("state", ["enabled", "disabled"])
+def test_universal_token_toggle(hub, hub_args, measure, state):
+    def setup():
+        hub.universal_token["active"] = state != "enabled"
+
+    result = measure(universal_token, dict(hub_args, state=state), setup=setup)
+    assert result["changed"] is True
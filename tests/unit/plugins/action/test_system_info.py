@@ -0,0 +1,127 @@
+from ansible_collections.community.beszel.plugins.action.system_info import (
+    ActionModule,
+)
+from ansible_collections.community.beszel.plugins.modules import system_info
+from ansible_collections.community.beszel.plugins.plugin_utils import pocketbase_action
+from unittest.mock import patch, MagicMock
+
+import pytest
+import types
+
+TASK_ARGS = {
+    "url": "http://localhost:8090",
+    "username": "units@example.com",
+    "password": "testing",
+    "name": "instance",
+}
+
+
+def make_action(args, transport="local"):
+    task = MagicMock(
+        args=args,
+        action="community.beszel.system_info",
+        async_val=0,
+        check_mode=False,
+        diff=False,
+    )
+    return ActionModule(
+        task=task,
+        connection=MagicMock(transport=transport),
+        play_context=MagicMock(),
+        loader=MagicMock(),
+        templar=MagicMock(),
+        shared_loader_obj=None,
+    )
+
+
+@pytest.fixture
+def client_mock():
+    pocketbase_action._CLIENTS.clear()
+    with patch.object(pocketbase_action, "HAS_POCKETBASE", True):
+        with patch.object(pocketbase_action, "PocketBaseClient") as client_cls:
+            fake_client = MagicMock()
+            client_cls.return_value.authenticate.return_value = fake_client
+            fake_client.collection.return_value.get_first_list_item.return_value = (
+                types.SimpleNamespace(id="q5y5h742bwueyns", name="instance")
+            )
+            yield client_cls
+
+
+def test_action_runs_module_on_controller_with_shared_client(client_mock):
+    results = []
+    for _host in range(3):
+        action = make_action(dict(TASK_ARGS))
+        with patch.object(action, "_execute_module") as execute_module:
+            results.append(action.run(task_vars={}))
+        execute_module.assert_not_called()
+
+    assert all(
+        result["systems"] == [{"id": "q5y5h742bwueyns", "name": "instance"}]
+        for result in results
+    )
+    client_mock.assert_called_once()
+    client_mock.return_value.authenticate.assert_called_once()
+
+
+def test_action_fails_on_invalid_arguments(client_mock):
+    result = make_action({"name": "instance"}).run(task_vars={})
+
+    assert result["failed"] is True
+    assert "one of the following is required: url, hubs" in result["msg"]
+    client_mock.assert_not_called()
+
+
+def test_action_falls_back_to_module_without_pocketbase(client_mock):
+    action = make_action(dict(TASK_ARGS))
+    with patch.object(pocketbase_action, "HAS_POCKETBASE", False):
+        with patch.object(action, "_execute_module") as execute_module:
+            execute_module.return_value = {"changed": False, "systems": []}
+            result = action.run(task_vars={})
+
+    assert result["systems"] == []
+    execute_module.assert_called_once()
+    client_mock.assert_not_called()
+
+
+def test_action_runs_module_on_target_of_remote_tasks(client_mock):
+    action = make_action(dict(TASK_ARGS), transport="ssh")
+    with patch.object(action, "_execute_module") as execute_module:
+        execute_module.return_value = {"changed": False, "systems": []}
+        result = action.run(task_vars={})
+
+    assert result["systems"] == []
+    execute_module.assert_called_once()
+    client_mock.assert_not_called()
+
+
+def test_list_no_log_values_includes_suboptions():
+    module_kwargs = system_info.module_kwargs()
+    params = dict(
+        dict.fromkeys(module_kwargs["argument_spec"]),
+        password="testing",
+        hubs=[{"url": "http://eu:8090", "password": "eu"}, {"url": "http://us:8090"}],
+    )
+
+    assert pocketbase_action.list_no_log_values(
+        module_kwargs["argument_spec"], params
+    ) == {"testing", "eu"}
+
+
+def test_action_shares_client_of_each_hub(client_mock):
+    args = {
+        "username": "units@example.com",
+        "password": "testing",
+        "hubs": [{"url": "http://eu:8090"}, {"url": "http://us:8090"}],
+        "name": "instance",
+    }
+    for _host in range(3):
+        result = make_action(dict(args)).run(task_vars={})
+
+    assert [system["hub"] for system in result["systems"]] == [
+        "http://eu:8090",
+        "http://us:8090",
+    ]
+    assert sorted(call.kwargs["url"] for call in client_mock.call_args_list) == [
+        "http://eu:8090",
+        "http://us:8090",
+    ]
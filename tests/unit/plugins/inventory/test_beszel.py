@@ -0,0 +1,121 @@
+from ansible.inventory.data import InventoryData
+from ansible.parsing.dataloader import DataLoader
+from ansible.template import Templar
+from ansible_collections.community.beszel.plugins.inventory import beszel
+from ansible_collections.community.beszel.plugins.inventory.beszel import (
+    InventoryModule,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    pocketbase_argument_spec,
+)
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+import pytest
+import types
+
+try:
+    from ansible.template import trust_as_template
+except ImportError:
+    # ansible-core < 2.19 does not check whether templates are trusted
+    def trust_as_template(value):
+        return value
+
+
+SYSTEM = {
+    "collection_id": "2hz5ncl8tizk5nx",
+    "collection_name": "systems",
+    "created": datetime(2025, 8, 30, 7, 48, 4),
+    "expand": {},
+    "host": "10.0.0.1",
+    "id": "q5y5h742bwueyns",
+    "info": {"os": 0, "v": "0.12.6"},
+    "name": "instance",
+    "port": "45876",
+    "status": "up",
+    "updated": datetime(2025, 8, 30, 11, 8, 36),
+    "users": ["zsk3bb1p2uisg4g"],
+}
+
+OPTIONS = {
+    option: spec.get("default") for option, spec in pocketbase_argument_spec().items()
+}
+OPTIONS.update(
+    {
+        "url": "http://localhost:8090",
+        "username": "units@example.com",
+        "password": "testing",
+        "filter": "status != 'paused'",
+        "per_page": 500,
+        "hostnames": "name",
+        "compose": {"agent_port": trust_as_template("beszel_port | int")},
+        "groups": {},
+        "keyed_groups": [
+            {"key": trust_as_template("beszel_status"), "prefix": "status"},
+            {"key": trust_as_template("beszel_os"), "prefix": "os"},
+        ],
+        "strict": False,
+        "cache": False,
+    }
+)
+
+
+@pytest.fixture
+def inventory():
+    plugin = InventoryModule()
+    plugin._options = dict(OPTIONS)
+    plugin.inventory = InventoryData()
+    plugin.templar = Templar(loader=DataLoader())
+    return plugin
+
+
+@pytest.fixture
+def client_mock():
+    beszel.HAS_POCKETBASE = True
+    with patch.object(beszel, "PocketBaseClient") as client_cls:
+        fake_client = MagicMock()
+        client_cls.return_value.authenticate.return_value = fake_client
+        fake_client.collection.return_value.get_list.return_value = (
+            types.SimpleNamespace(items=[types.SimpleNamespace(**SYSTEM)])
+        )
+        yield fake_client
+
+
+def test_verify_file(tmp_path, inventory):
+    for name, expected in (("beszel.yml", True), ("inventory.yml", False)):
+        path = tmp_path / name
+        path.write_text("plugin: community.beszel.beszel\n")
+        assert inventory.verify_file(str(path)) is expected
+
+
+def test_get_systems_lists_systems_page_by_page(inventory, client_mock):
+    systems = inventory._get_systems()
+
+    assert systems[0]["created"] == "2025-08-30T07:48:04"
+    client_mock.collection.return_value.get_list.assert_called_once_with(
+        1, 500, {"sort": "created", "filter": "status != 'paused'", "skipTotal": 1}
+    )
+
+
+def test_populate_adds_hosts_variables_and_groups(inventory, client_mock):
+    inventory._populate(inventory._get_systems())
+
+    host = inventory.inventory.get_host("instance")
+    assert host.vars["ansible_host"] == "10.0.0.1"
+    assert host.vars["beszel_status"] == "up"
+    assert host.vars["beszel_os"] == "linux"
+    assert host.vars["beszel_agent_version"] == "0.12.6"
+    assert host.vars["agent_port"] == 45876
+    assert "collection_id" not in host.vars
+    assert inventory.inventory.groups["status_up"].hosts == [host]
+    assert "os_linux" in inventory.inventory.groups
+
+
+def test_populate_uses_host_as_hostname(inventory, client_mock):
+    inventory._options["hostnames"] = "host"
+
+    inventory._populate(inventory._get_systems())
+
+    host = inventory.inventory.get_host("10.0.0.1")
+    assert "ansible_host" not in host.vars
+    assert host.vars["beszel_name"] == "instance"
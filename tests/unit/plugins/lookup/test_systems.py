@@ -0,0 +1,93 @@
+from ansible_collections.community.beszel.plugins.lookup import systems
+from ansible_collections.community.beszel.plugins.plugin_utils import pocketbase_action
+from ansible.plugins.loader import lookup_loader
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+import pytest
+import types
+
+OPTIONS = {
+    "url": "http://localhost:8090",
+    "username": "units@example.com",
+    "password": "testing",
+}
+
+
+def make_system(name):
+    return types.SimpleNamespace(
+        id=f"{name}-id",
+        name=name,
+        host=name,
+        port="45876",
+        status="up",
+        created=datetime(2025, 8, 30, 7, 48, 4),
+        updated=datetime(2025, 8, 30, 7, 48, 4),
+    )
+
+
+@pytest.fixture
+def client_mock():
+    systems.HAS_POCKETBASE = True
+    pocketbase_action._CLIENTS.clear()
+    systems._SYSTEMS.clear()
+    with patch.object(pocketbase_action, "PocketBaseClient") as client_cls:
+        fake_client = MagicMock()
+        client_cls.return_value.authenticate.return_value = fake_client
+        fake_client.collection.return_value.get_list.return_value = (
+            types.SimpleNamespace(items=[make_system("one"), make_system("two")])
+        )
+        yield client_cls
+
+
+def test_lookup_returns_systems_by_name(client_mock):
+    result = lookup_loader.get("community.beszel.systems").run(
+        ["two", "missing"], {}, **OPTIONS
+    )
+
+    assert result[0]["name"] == "two"
+    assert result[0]["created"] == "2025-08-30T07:48:04"
+    assert result[1] == {}
+
+
+def test_lookup_returns_all_systems_without_terms(client_mock):
+    result = lookup_loader.get("community.beszel.systems").run([], {}, **OPTIONS)
+
+    assert [system["name"] for system in result] == ["one", "two"]
+
+
+def test_lookup_memoizes_listing_and_client(client_mock):
+    for name in ("one", "two", "one"):
+        lookup_loader.get("community.beszel.systems").run([name], {}, **OPTIONS)
+
+    client_mock.assert_called_once()
+    fake_collection = client_mock.return_value.authenticate.return_value.collection
+    fake_collection.return_value.get_list.assert_called_once()
+
+    lookup_loader.get("community.beszel.systems").run(
+        ["one"], {}, refresh=True, **OPTIONS
+    )
+    lookup_loader.get("community.beszel.systems").run(
+        ["one"], {}, filter="status = 'up'", **OPTIONS
+    )
+
+    client_mock.assert_called_once()
+    assert fake_collection.return_value.get_list.call_count == 3
+
+
+def test_lookup_shares_systems_cache_between_workers(client_mock, tmp_path):
+    options = dict(
+        OPTIONS, systems_cache=str(tmp_path / "systems.json"), systems_cache_ttl=60
+    )
+    for name in ("one", "two"):
+        # Each host runs its lookups in a new worker process
+        systems._SYSTEMS.clear()
+        pocketbase_action._CLIENTS.clear()
+        result = lookup_loader.get("community.beszel.systems").run(
+            [name], {}, **options
+        )
+        assert result[0]["name"] == name
+        assert result[0]["created"] == "2025-08-30T07:48:04"
+
+    fake_collection = client_mock.return_value.authenticate.return_value.collection
+    fake_collection.return_value.get_list.assert_called_once()
@@ -0,0 +1,76 @@
+from ansible_collections.community.beszel.plugins.module_utils.filter_utils import (
+    all_of,
+    any_of,
+    bind,
+    chunked_any_of,
+    equals,
+    format_datetime,
+    quote,
+)
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+def test_format_datetime_matches_pocketbase_dates():
+    value = datetime(2025, 8, 30, 12, 0, 5, 123456, tzinfo=timezone(timedelta(hours=2)))
+    assert format_datetime(value) == "2025-08-30 10:00:05.123Z"
+    assert format_datetime(datetime(2025, 8, 30, 10)) == "2025-08-30 10:00:00.000Z"
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("instance", "'instance'"),
+        ("it's", "'it\\'s'"),
+        ("a\\'b", "'a\\\\'b'"),
+        ('say "hi"', "'say \"hi\"'"),
+        ("x' || name != '", "'x\\' || name != \\''"),
+        (True, "true"),
+        (None, "null"),
+        (45876, "45876"),
+        (0.5, "0.5"),
+        (datetime(2025, 8, 30, 10, tzinfo=timezone.utc), "'2025-08-30 10:00:00.000Z'"),
+    ],
+)
+def test_quote(value, expected):
+    assert quote(value) == expected
+
+
+def test_quote_rejects_trailing_backslash():
+    with pytest.raises(ValueError, match="ends with a backslash"):
+        quote("C:\\")
+
+
+def test_bind_quotes_parameters():
+    assert (
+        bind("name={:name} && port={:port}", name="it's", port=1)
+        == "name='it\\'s' && port=1"
+    )
+    with pytest.raises(KeyError):
+        bind("name={:name}")
+
+
+def test_any_of_combines_exact_matches():
+    assert equals("email", "a@example.com") == "email='a@example.com'"
+    assert any_of("name", ["a", "b", "a"]) == "name='a' || name='b'"
+    assert any_of("name", []) == "false"
+
+
+def test_chunked_any_of_splits_values():
+    assert list(chunked_any_of("name", ["a", "b", "c", "b"], 2)) == [
+        "name='a' || name='b'",
+        "name='c'",
+    ]
+    assert list(chunked_any_of("name", [])) == []
+
+
+def test_all_of_parenthesizes_expressions():
+    assert all_of(equals("name", "a"), None, "") == "name='a'"
+    assert all_of("status = 'up' || status = 'down'") == (
+        "status = 'up' || status = 'down'"
+    )
+    assert all_of(equals("name", "a b"), "status = 'up'", any_of("id", [1, 2])) == (
+        "name='a b' && (status = 'up') && (id=1 || id=2)"
+    )
+    assert all_of(equals("name", "x' || '"), "a=1") == "name='x\\' || \\'' && (a=1)"
@@ -0,0 +1,108 @@
+from ansible_collections.community.beszel.plugins.module_utils.hub_utils import (
+    add_hubs_argument_spec,
+    hub_params,
+    hub_summary,
+    run_on_hubs,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    pocketbase_argument_spec,
+)
+from unittest.mock import MagicMock
+
+import threading
+
+import pytest
+
+PARAMS = dict(
+    dict(
+        (option, spec.get("default"))
+        for option, spec in pocketbase_argument_spec().items()
+    ),
+    url=None,
+    username="admin@example.com",
+    password="password",
+    hubs=[
+        dict(name="eu", url="http://eu:8090", username=None, password=None),
+        dict(name=None, url="http://us:8090", username="us@example.com", password="us"),
+    ],
+)
+
+
+class FakeModule:
+    def __init__(self, params):
+        self.params = params
+        self.check_mode = False
+        self._diff = False
+        self.warn = MagicMock()
+
+    def exit_json(self, **kwargs):
+        raise SystemExit(kwargs)
+
+    def fail_json(self, msg, **kwargs):
+        raise SystemExit(dict(kwargs, msg=msg, failed=True))
+
+
+def test_add_hubs_argument_spec_makes_connection_optional():
+    module_args = pocketbase_argument_spec()
+
+    constraints = add_hubs_argument_spec(module_args)
+
+    assert module_args["url"]["required"] is False
+    assert module_args["password"]["no_log"] is True
+    assert module_args["hubs"]["options"]["password"]["no_log"] is True
+    assert constraints["mutually_exclusive"] == [("url", "hubs")]
+    # The shared argument spec is left untouched
+    assert pocketbase_argument_spec()["url"]["required"] is True
+
+
+def test_hub_params_default_to_module_credentials():
+    hubs = hub_params(PARAMS)
+
+    assert [name for name, params in hubs] == ["eu", "http://us:8090"]
+    assert hubs[0][1]["url"] == "http://eu:8090"
+    assert hubs[0][1]["username"] == "admin@example.com"
+    assert hubs[0][1]["hubs"] is None
+    assert (hubs[1][1]["username"], hubs[1][1]["password"]) == ("us@example.com", "us")
+
+
+def test_hub_params_require_credentials_and_unique_names():
+    with pytest.raises(ValueError, match="required for hub 'eu'"):
+        hub_params(dict(PARAMS, username=None))
+    with pytest.raises(ValueError, match="must be unique: eu"):
+        hub_params(dict(PARAMS, hubs=[PARAMS["hubs"][0], PARAMS["hubs"][0]]))
+
+
+def test_run_on_hubs_runs_hubs_concurrently_and_isolates_failures():
+    # Each hub waits for the other one, so the test only ends if they run concurrently
+    barrier = threading.Barrier(2, timeout=5)
+
+    def run_hub(module, client):
+        barrier.wait()
+        if module.params["url"] == "http://us:8090":
+            raise Exception("Connection refused")
+        module.warn("Slow hub.")
+        module.exit_json(changed=False, systems=[dict(name="instance")])
+
+    module = FakeModule(PARAMS)
+    results = run_on_hubs(module, run_hub)
+
+    assert results == [
+        ("eu", dict(changed=False, systems=[dict(name="instance")])),
+        ("http://us:8090", dict(failed=True, msg="Connection refused")),
+    ]
+    module.warn.assert_called_once_with("eu: Slow hub.")
+
+
+def test_run_on_hubs_uses_shared_clients():
+    module = FakeModule(PARAMS)
+    module.get_client = MagicMock(side_effect=lambda client_args: client_args["url"])
+    clients = []
+
+    def run_hub(module, client):
+        clients.append(client)
+        module.fail_json(msg="Failed.")
+
+    results = run_on_hubs(module, run_hub)
+
+    assert sorted(clients) == ["http://eu:8090", "http://us:8090"]
+    assert hub_summary(*results[0]) == dict(name="eu", failed=True, msg="Failed.")
@@ -0,0 +1,146 @@
+from ansible_collections.community.beszel.plugins.module_utils import metrics_utils
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    MetricsTransport,
+    RequestMetrics,
+    endpoint,
+    metrics_phase,
+    start_metrics,
+)
+from unittest.mock import MagicMock
+
+import httpx
+import json
+import threading
+
+import pytest
+
+
+class FakeModule:
+    """Module exiting by raising, like AnsibleModule does in the unit tests."""
+
+    def __init__(self, **params):
+        self.params = dict(dict(collect_metrics=False, metrics_file=None), **params)
+        self.warn = MagicMock()
+
+    def exit_json(self, **kwargs):
+        raise SystemExit(kwargs)
+
+    def fail_json(self, msg, **kwargs):
+        raise SystemExit(dict(kwargs, msg=msg, failed=True))
+
+
+@pytest.fixture(autouse=True)
+def no_active_metrics():
+    yield
+    metrics_utils._ACTIVE = None
+
+
+def test_endpoint_replaces_record_id():
+    assert (
+        endpoint("PATCH", "/api/collections/systems/records/q5y5h742bwueyns")
+        == "PATCH /api/collections/systems/records/:id"
+    )
+    assert (
+        endpoint("GET", "/api/collections/systems/records")
+        == "GET /api/collections/systems/records"
+    )
+
+
+def test_request_metrics_summary_groups_by_phase_and_endpoint():
+    metrics = RequestMetrics("system")
+    with metrics.phase("login"):
+        metrics.record("POST", "/api/login", 200, 50, 700, 0, 0.25)
+    with metrics.phase("write"):
+        metrics.record("PATCH", "/api/records/a", 503, 10, 20, 0, 0.5)
+        metrics.record("PATCH", "/api/records/a", 200, 10, 300, 0, 0.125, retry=True)
+    metrics.record("GET", "/api/other", None, 0, 0, 0, 1.0, error="ConnectError")
+
+    summary = metrics.summary()
+
+    assert summary["requests"] == 4
+    assert summary["retries"] == 1
+    assert summary["errors"] == 2
+    assert summary["bytes_sent"] == 70
+    assert summary["bytes_received"] == 1020
+    assert summary["request_time"] == 1.875
+    assert summary["phases"]["write"]["requests"] == 2
+    assert summary["phases"]["write"]["request_time"] == 0.625
+    assert summary["phases"]["write"]["elapsed"] >= 0
+    assert summary["phases"]["other"]["elapsed"] is None
+    assert summary["endpoints"]["PATCH /api/records/:id"]["retries"] == 1
+
+
+def test_request_metrics_phases_are_per_thread():
+    metrics = RequestMetrics("system")
+    # Each hub waits for the other one to enter its phase before sending its request
+    barrier = threading.Barrier(2, timeout=5)
+
+    def run_hub(phase):
+        with metrics.phase(phase):
+            barrier.wait()
+            metrics.record("GET", f"/api/{phase}", 200, 0, 0, 0, 0.5)
+
+    threads = [
+        threading.Thread(target=run_hub, args=(phase,)) for phase in ("lookup", "write")
+    ]
+    with metrics.phase("hubs"):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sorted((call["path"], call["phase"]) for call in metrics.calls) == [
+        ("/api/lookup", "lookup"),
+        ("/api/write", "write"),
+    ]
+    assert set(metrics.summary()["phases"]) == {"hubs", "lookup", "write"}
+
+
+def test_metrics_transport_records_attempts_of_the_running_module():
+    responses = iter([httpx.Response(503), httpx.Response(200, json={"id": "a"})])
+    transport = MetricsTransport(httpx.MockTransport(lambda request: next(responses)))
+    metrics = start_metrics(FakeModule(collect_metrics=True), "system")
+    request = httpx.Request("POST", "http://hub/api/records", json={"name": "a"})
+
+    with metrics_phase("write"):
+        transport.handle_request(request)
+        transport.handle_request(request)
+
+    assert [(call["status"], call["retry"]) for call in metrics.calls] == [
+        (503, False),
+        (200, True),
+    ]
+    assert metrics.calls[1]["bytes_sent"] == len(request.content)
+    assert metrics.calls[1]["bytes_received"] == len(b'{"id":"a"}')
+    assert metrics.calls[1]["phase"] == "write"
+
+
+def test_metrics_transport_passes_requests_through_without_metrics():
+    inner = MagicMock()
+    transport = MetricsTransport(inner)
+    assert start_metrics(FakeModule(), "system") is None
+
+    with metrics_phase("write"):
+        response = transport.handle_request(MagicMock())
+
+    assert response is inner.handle_request.return_value
+    response.read.assert_not_called()
+
+
+def test_start_metrics_adds_metrics_to_result_and_file(tmp_path):
+    metrics_file = tmp_path / "metrics.jsonl"
+    module = FakeModule(metrics_file=str(metrics_file))
+    metrics = start_metrics(module, "system")
+    metrics.record("GET", "/api/records", 200, 0, 10, 0, 0.5)
+
+    with pytest.raises(SystemExit) as exc_info:
+        module.fail_json(msg="Failed.", changed=False)
+
+    result = exc_info.value.args[0]
+    assert result["failed"] is True
+    assert result["metrics"]["requests"] == 1
+    line = json.loads(metrics_file.read_text())
+    assert line["module"] == "system"
+    assert line["metrics"] == result["metrics"]
+    assert line["calls"][0]["endpoint"] == "GET /api/records"
+    module.warn.assert_not_called()
@@ -0,0 +1,145 @@
+from ansible_collections.community.beszel.plugins.module_utils import pocketbase_async
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_async import (
+    AsyncPocketBaseClient,
+    gather_bounded,
+    run_concurrently,
+)
+from pocketbase.errors import ClientResponseError
+from unittest.mock import patch
+
+import asyncio
+import base64
+import httpx
+import json
+import pytest
+import time
+
+CLIENT_ARGS = {
+    "url": "http://localhost:8090",
+    "username": "units@example.com",
+    "password": "testing",
+}
+
+
+def make_token(exp):
+    """Build an unsigned JWT-like token with the given expiry timestamp."""
+
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+    return f"{encode({'alg': 'HS256'})}.{encode({'exp': exp})}.signature"
+
+
+VALID_TOKEN = make_token(int(time.time()) + 3600)
+EXPIRED_TOKEN = make_token(int(time.time()) - 10)
+
+
+@pytest.fixture
+def hub():
+    """Fake hub recording the requests it receives."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/auth-with-password"):
+            return httpx.Response(200, json={"token": "token", "record": {}})
+        if request.method == "POST":
+            body = json.loads(request.content)
+            if body["name"] == "broken":
+                return httpx.Response(400, json={"message": "Failed to create record."})
+            return httpx.Response(200, json=dict(body, id=f"{body['name']}-id"))
+        if request.method == "GET":
+            return httpx.Response(
+                200, json={"items": [{"id": "one-id", "collectionName": "systems"}]}
+            )
+        return httpx.Response(204)
+
+    with patch.object(
+        pocketbase_async.httpx,
+        "AsyncHTTPTransport",
+        side_effect=lambda **kwargs: httpx.MockTransport(handler),
+    ):
+        yield requests
+
+
+def test_client_authenticates_and_sends_token(hub):
+    async def run():
+        async with AsyncPocketBaseClient(**CLIENT_ARGS) as client:
+            await client.authenticate()
+            return await client.get_list("systems", 2, 50, {"sort": "created"})
+
+    page = asyncio.run(run())
+
+    assert json.loads(hub[0].content) == {
+        "identity": "units@example.com",
+        "password": "testing",
+    }
+    assert hub[0].url.path == "/api/collections/_superusers/auth-with-password"
+    assert hub[1].headers["Authorization"] == "token"
+    assert dict(hub[1].url.params) == {"sort": "created", "page": "2", "perPage": "50"}
+    assert page["items"][0].collection_name == "systems"
+
+
+def test_client_raises_client_response_error(hub):
+    async def run():
+        async with AsyncPocketBaseClient(token=VALID_TOKEN, **CLIENT_ARGS) as client:
+            await client.create("systems", {"name": "broken"})
+
+    with pytest.raises(ClientResponseError) as exc_info:
+        asyncio.run(run())
+    assert exc_info.value.status == 400
+
+
+def test_gather_bounded_limits_concurrency():
+    running = []
+    peak = []
+
+    async def operation(value):
+        running.append(value)
+        peak.append(len(running))
+        await asyncio.sleep(0)
+        running.remove(value)
+        return value
+
+    results = asyncio.run(gather_bounded((operation(i) for i in range(10)), 3))
+
+    assert results == list(range(10))
+    assert max(peak) == 3
+
+
+def test_run_concurrently_reuses_token_and_returns_exceptions(hub):
+    results = run_concurrently(
+        CLIENT_ARGS,
+        [
+            lambda client: client.create("systems", {"name": "one"}),
+            lambda client: client.create("systems", {"name": "broken"}),
+            lambda client: client.delete("systems", "two-id"),
+        ],
+        concurrency=2,
+        token=VALID_TOKEN,
+    )
+
+    assert results[0].id == "one-id"
+    assert isinstance(results[1], ClientResponseError)
+    assert results[2] is None
+    assert not any(request.url.path.endswith("auth-with-password") for request in hub)
+
+
+def test_client_replaces_expired_token(hub):
+    async def run():
+        async with AsyncPocketBaseClient(token=EXPIRED_TOKEN, **CLIENT_ARGS) as client:
+            await client.authenticate()
+            return client.token
+
+    assert asyncio.run(run()) == "token"
+    assert hub[0].url.path == "/api/collections/_superusers/auth-with-password"
+
+
+def test_client_http2_falls_back_without_h2():
+    with patch.object(pocketbase_async, "HAS_H2", False):
+        with patch.object(
+            pocketbase_async.httpx, "AsyncHTTPTransport"
+        ) as transport_cls:
+            AsyncPocketBaseClient(http2=True, **CLIENT_ARGS)
+
+    assert transport_cls.call_args.kwargs["http2"] is False
@@ -0,0 +1,392 @@
+from ansible_collections.community.beszel.plugins.module_utils import pocketbase_utils
+from ansible_collections.community.beszel.plugins.module_utils.metrics_utils import (
+    MetricsTransport,
+)
+from ansible_collections.community.beszel.plugins.module_utils.pocketbase_utils import (
+    HubLimiter,
+    LimitTransport,
+    PocketBaseClient,
+    RetryTransport,
+    TokenCache,
+    iter_records,
+    pocketbase_argument_spec,
+    pocketbase_client_args,
+)
+from unittest.mock import patch, MagicMock
+
+import base64
+import httpx
+import json
+import os
+import stat
+import threading
+import time
+import types
+
+import pytest
+
+
+def make_token(exp):
+    """Build an unsigned JWT-like token with the given expiry timestamp."""
+
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+    return f"{encode({'alg': 'HS256'})}.{encode({'exp': exp})}.signature"
+
+
+VALID_TOKEN = make_token(int(time.time()) + 3600)
+REFRESHED_TOKEN = make_token(int(time.time()) + 7200)
+EXPIRED_TOKEN = make_token(int(time.time()) - 10)
+
+
+@pytest.fixture
+def pocketbase_mock():
+    pocketbase_utils.HAS_POCKETBASE = True
+    with patch("pocketbase.PocketBase") as pocketbase_cls:
+        fake_pocketbase = MagicMock()
+        pocketbase_cls.return_value = fake_pocketbase
+        fake_pocketbase.admins.auth_with_password.return_value = types.SimpleNamespace(
+            token=VALID_TOKEN, is_valid=True
+        )
+        fake_pocketbase.admins.auth_refresh.return_value = types.SimpleNamespace(
+            token=REFRESHED_TOKEN, is_valid=True
+        )
+        yield fake_pocketbase
+
+
+def make_client(token_cache=None):
+    return PocketBaseClient(
+        url="http://localhost:8090",
+        username="units@example.com",
+        password="testing",
+        token_cache=token_cache,
+    )
+
+
+def test_authenticate_without_token_cache(pocketbase_mock):
+    make_client().authenticate()
+
+    pocketbase_mock.admins.auth_with_password.assert_called_once_with(
+        "units@example.com", "testing"
+    )
+    pocketbase_mock.admins.auth_refresh.assert_not_called()
+
+
+def test_authenticate_writes_token_cache(pocketbase_mock, tmp_path):
+    cache_path = str(tmp_path / "cache" / "tokens.json")
+
+    make_client(cache_path).authenticate()
+
+    key = TokenCache.key("http://localhost:8090", "units@example.com", "admin")
+    with open(cache_path) as f:
+        assert json.load(f) == {key: VALID_TOKEN}
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+
+
+def test_authenticate_reuses_cached_token(pocketbase_mock, tmp_path):
+    cache_path = str(tmp_path / "tokens.json")
+    key = TokenCache.key("http://localhost:8090", "units@example.com", "admin")
+    TokenCache(cache_path).set(key, VALID_TOKEN)
+
+    make_client(cache_path).authenticate()
+
+    pocketbase_mock.auth_store.save.assert_called_once_with(VALID_TOKEN)
+    pocketbase_mock.admins.auth_refresh.assert_called_once()
+    pocketbase_mock.admins.auth_with_password.assert_not_called()
+    assert TokenCache(cache_path).get(key) == REFRESHED_TOKEN
+
+
+def test_authenticate_ignores_expired_cached_token(pocketbase_mock, tmp_path):
+    cache_path = str(tmp_path / "tokens.json")
+    key = TokenCache.key("http://localhost:8090", "units@example.com", "admin")
+    with open(cache_path, "w") as f:
+        json.dump({key: EXPIRED_TOKEN}, f)
+
+    make_client(cache_path).authenticate()
+
+    pocketbase_mock.admins.auth_refresh.assert_not_called()
+    pocketbase_mock.admins.auth_with_password.assert_called_once()
+    assert TokenCache(cache_path).get(key) == VALID_TOKEN
+
+
+def test_authenticate_falls_back_when_cached_token_rejected(pocketbase_mock, tmp_path):
+    class _DummyClientResponseError(Exception):
+        pass
+
+    cache_path = str(tmp_path / "tokens.json")
+    key = TokenCache.key("http://localhost:8090", "units@example.com", "admin")
+    TokenCache(cache_path).set(key, REFRESHED_TOKEN)
+    pocketbase_mock.admins.auth_refresh.side_effect = _DummyClientResponseError()
+
+    with patch("pocketbase.errors.ClientResponseError", _DummyClientResponseError):
+        make_client(cache_path).authenticate()
+
+    pocketbase_mock.auth_store.clear.assert_called_once()
+    pocketbase_mock.admins.auth_with_password.assert_called_once()
+    assert TokenCache(cache_path).get(key) == VALID_TOKEN
+
+
+def test_authenticate_user_uses_separate_cache_key(pocketbase_mock, tmp_path):
+    cache_path = str(tmp_path / "tokens.json")
+    users = pocketbase_mock.collection.return_value
+    users.auth_with_password.return_value = types.SimpleNamespace(
+        token=REFRESHED_TOKEN, is_valid=True
+    )
+
+    make_client(cache_path).authenticate()
+    make_client(cache_path).authenticate_user()
+
+    with open(cache_path) as f:
+        cached = json.load(f)
+    assert cached == {
+        TokenCache.key("http://localhost:8090", "units@example.com", "admin"): (
+            VALID_TOKEN
+        ),
+        TokenCache.key("http://localhost:8090", "units@example.com", "user"): (
+            REFRESHED_TOKEN
+        ),
+    }
+
+
+def test_token_cache_updates_are_serialized(tmp_path):
+    cache_path = str(tmp_path / "tokens.json")
+    cache = TokenCache(cache_path)
+    cache.set("admin", VALID_TOKEN)
+    # Another fork updating another key must wait for the update in progress
+    other = threading.Thread(
+        target=TokenCache(cache_path).set, args=("user", VALID_TOKEN)
+    )
+    with cache._lock():
+        other.start()
+        other.join(0.2)
+        assert other.is_alive()
+    other.join(5)
+
+    assert cache.get("admin") == VALID_TOKEN
+    assert cache.get("user") == VALID_TOKEN
+
+
+def test_client_uses_pooled_transport():
+    with patch("pocketbase.PocketBase") as pocketbase_cls:
+        with patch.object(httpx, "HTTPTransport") as transport_cls:
+            client = PocketBaseClient(
+                url="http://localhost:8090",
+                username="units@example.com",
+                password="testing",
+                pool_size=4,
+            )
+
+    metrics_transport = pocketbase_cls.call_args.kwargs["transport"].transport
+    assert isinstance(metrics_transport, MetricsTransport)
+    assert metrics_transport.transport is client.transport
+    limits = transport_cls.call_args.kwargs["limits"]
+    assert limits.max_connections == 4
+    assert limits.max_keepalive_connections == 4
+    assert transport_cls.call_args.kwargs["http2"] is False
+
+
+def test_client_http2_falls_back_without_h2():
+    with patch("pocketbase.PocketBase"):
+        with patch.object(pocketbase_utils, "HAS_H2", False):
+            client = PocketBaseClient(
+                url="http://localhost:8090",
+                username="units@example.com",
+                password="testing",
+                http2=True,
+            )
+
+    assert client.http2 is False
+
+
+class FakeTransport(httpx.BaseTransport):
+    """Transport returning the given responses or raising the given errors in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.requests = []
+
+    def handle_request(self, request):
+        self.requests.append(request)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def sleep_mock():
+    with patch.object(pocketbase_utils.time, "sleep") as sleep:
+        yield sleep
+
+
+def send(transport, method="GET"):
+    with httpx.Client(transport=transport, base_url="http://localhost:8090") as client:
+        return client.request(method, "/api/collections/systems/records")
+
+
+def test_retry_transport_retries_transient_errors(sleep_mock):
+    transport = FakeTransport(
+        httpx.ConnectError("connection refused"),
+        httpx.Response(503),
+        httpx.Response(200, json={"items": []}),
+    )
+
+    response = send(RetryTransport(transport, retries=3, backoff=1, max_backoff=30))
+
+    assert response.status_code == 200
+    assert len(transport.requests) == 3
+    assert sleep_mock.call_count == 2
+    assert all(0 <= call.args[0] <= 2 for call in sleep_mock.call_args_list)
+
+
+def test_retry_transport_honors_retry_after(sleep_mock):
+    transport = FakeTransport(
+        httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200)
+    )
+
+    send(RetryTransport(transport), "POST")
+
+    sleep_mock.assert_called_once_with(7.0)
+
+
+def test_retry_transport_does_not_retry_fatal_errors(sleep_mock):
+    for status in (400, 403, 404):
+        transport = FakeTransport(httpx.Response(status))
+
+        assert send(RetryTransport(transport)).status_code == status
+        assert len(transport.requests) == 1
+    sleep_mock.assert_not_called()
+
+
+def test_retry_transport_only_retries_idempotent_requests_after_sending(sleep_mock):
+    transport = FakeTransport(httpx.Response(502))
+    assert send(RetryTransport(transport), "POST").status_code == 502
+
+    transport = FakeTransport(httpx.ReadError("connection reset"))
+    with pytest.raises(httpx.ReadError):
+        send(RetryTransport(transport), "POST")
+
+    transport = FakeTransport(httpx.ReadError("connection reset"), httpx.Response(200))
+    assert send(RetryTransport(transport), "DELETE").status_code == 200
+    sleep_mock.assert_called_once()
+
+
+def test_retry_transport_gives_up_after_retries(sleep_mock):
+    transport = FakeTransport(*[httpx.Response(503) for _attempt in range(3)])
+
+    assert send(RetryTransport(transport, retries=2)).status_code == 503
+    assert sleep_mock.call_count == 2
+
+
+def test_hub_limiter_spaces_requests_across_instances(tmp_path, sleep_mock):
+    # Two limiters sharing a directory behave like two forks of a playbook run
+    limiters = [
+        HubLimiter("http://localhost:8090", 2, None, str(tmp_path))
+        for _fork in range(2)
+    ]
+    with patch.object(pocketbase_utils.time, "time", return_value=1000.0):
+        for limiter in limiters:
+            with limiter.limit():
+                pass
+
+    sleep_mock.assert_called_once_with(0.5)
+
+
+def test_hub_limiter_caps_requests_in_flight(tmp_path, sleep_mock):
+    sleep_mock.side_effect = RuntimeError("no slot available")
+    limiter = HubLimiter("http://localhost:8090", None, 1, str(tmp_path))
+    other = HubLimiter("http://localhost:8090", None, 1, str(tmp_path))
+
+    with limiter.limit():
+        with pytest.raises(RuntimeError):
+            with other.limit():
+                pass
+    with other.limit():
+        pass
+
+
+def test_hub_limiter_uses_directory_per_user():
+    limiter = HubLimiter("http://localhost:8090", 2)
+
+    assert os.path.basename(limiter.directory).startswith(f"beszel-{os.getuid()}-")
+
+
+def test_hub_limiter_runs_unlimited_without_lock_files(tmp_path, sleep_mock):
+    # The directory was created by another user
+    limiters = [
+        HubLimiter("http://localhost:8090", 2, 1, str(tmp_path)) for _fork in range(2)
+    ]
+    with patch.object(pocketbase_utils.os, "getuid", return_value=os.getuid() + 1):
+        with patch.object(pocketbase_utils.time, "time", return_value=1000.0):
+            for limiter in limiters:
+                with limiter.limit():
+                    pass
+
+    assert all(limiter.disabled for limiter in limiters)
+    sleep_mock.assert_not_called()
+    assert os.listdir(tmp_path) == []
+
+
+def test_client_uses_limit_transport_when_limited():
+    with patch("pocketbase.PocketBase") as pocketbase_cls:
+        client = PocketBaseClient(
+            url="http://localhost:8090",
+            username="units@example.com",
+            password="testing",
+            rate_limit=10,
+        )
+
+    limit_transport = pocketbase_cls.call_args.kwargs["transport"].transport
+    assert isinstance(limit_transport, LimitTransport)
+    assert limit_transport.transport.transport is client.transport
+    assert limit_transport.limiter.rate_limit == 10
+
+
+def test_iter_records_stops_at_capped_last_page():
+    # The hub returns at most 1000 records per page, whatever was requested
+    service = MagicMock()
+    service.get_list.side_effect = [
+        types.SimpleNamespace(items=list(range(1000)), per_page=1000, total_pages=-1),
+        types.SimpleNamespace(items=list(range(5)), per_page=1000, total_pages=-1),
+    ]
+
+    assert len(list(iter_records(service, per_page=5000))) == 1005
+    assert service.get_list.call_count == 2
+
+
+def test_iter_records_stops_on_empty_or_last_page():
+    service = MagicMock()
+    service.get_list.return_value = types.SimpleNamespace(
+        items=[], per_page=100, total_pages=-1
+    )
+    assert list(iter_records(service)) == []
+
+    service.get_list.return_value = types.SimpleNamespace(
+        items=list(range(100)), per_page=100, total_pages=1
+    )
+    assert len(list(iter_records(service))) == 100
+    assert service.get_list.call_count == 2
+
+
+def test_iter_records_rejects_invalid_per_page():
+    with pytest.raises(ValueError, match="per_page must be at least 1."):
+        list(iter_records(MagicMock(), per_page=0))
+
+
+@pytest.mark.parametrize(
+    "option, value, msg",
+    [
+        ("rate_limit", 0, "rate_limit must be greater than 0."),
+        ("max_in_flight", 0, "max_in_flight must be at least 1."),
+        ("max_in_flight", -1, "max_in_flight must be at least 1."),
+    ],
+)
+def test_pocketbase_client_args_rejects_limits_blocking_requests(option, value, msg):
+    params = dict(
+        (name, spec.get("default")) for name, spec in pocketbase_argument_spec().items()
+    )
+    params[option] = value
+
+    with pytest.raises(ValueError, match=msg):
+        pocketbase_client_args(params)
@@ -0,0 +1,82 @@
+from ansible_collections.community.beszel.plugins.module_utils.realtime_utils import (
+    RealtimeSubscription,
+    iter_sse_events,
+)
+from unittest.mock import patch, MagicMock
+
+import httpx
+import json
+
+import pytest
+
+STREAM = (
+    "id:client-id\n"
+    "event:PB_CONNECT\n"
+    'data:{"clientId":"client-id"}\n'
+    "\n"
+    ": keep alive\n"
+    "\n"
+    "event:systems\n"
+    'data:{"action":"update",\n'
+    'data:"record":{"name":"instance","status":"up"}}\n'
+    "\n"
+)
+
+
+def test_iter_sse_events_parses_events():
+    events = list(iter_sse_events(STREAM.splitlines()))
+
+    assert events == [
+        {"event": "PB_CONNECT", "id": "client-id", "data": '{"clientId":"client-id"}'},
+        {
+            "event": "systems",
+            "id": "",
+            "data": '{"action":"update",\n"record":{"name":"instance","status":"up"}}',
+        },
+    ]
+
+
+@pytest.fixture
+def stream_client():
+    http_client = httpx.Client
+
+    def handler(request):
+        assert request.url.path == "/api/realtime"
+        return httpx.Response(
+            200, content=STREAM, headers={"Content-Type": "text/event-stream"}
+        )
+
+    def client(**kwargs):
+        return http_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    with patch.object(httpx, "Client", side_effect=client):
+        yield
+
+
+def test_realtime_subscription_submits_topics_and_gets_events(stream_client):
+    pocketbase = MagicMock(base_url="http://localhost:8090/")
+
+    with RealtimeSubscription(pocketbase, ["systems"]) as subscription:
+        pocketbase.send.assert_called_once_with(
+            "/api/realtime",
+            {
+                "method": "POST",
+                "body": {"clientId": "client-id", "subscriptions": ["systems"]},
+            },
+        )
+        assert subscription.get(5) == {
+            "action": "update",
+            "record": {"name": "instance", "status": "up"},
+        }
+        # The stream of the mock transport ends after the events
+        with pytest.raises(ConnectionError):
+            subscription.get(5)
+
+
+def test_realtime_subscription_get_times_out():
+    subscription = RealtimeSubscription(MagicMock(base_url="http://localhost:8090"), [])
+
+    assert subscription.get(0.01) is None
+    subscription.events.put({"event": "systems", "id": "", "data": json.dumps({})})
+    assert subscription.get(0.01) == {}
+    subscription.close()
@@ -0,0 +1,125 @@
+from ansible_collections.community.beszel.plugins.module_utils.stats_utils import (
+    MetricReducer,
+    aggregate_stats,
+    get_metric,
+    parse_time,
+    percentile,
+    summarize_stats,
+)
+from datetime import datetime, timezone
+
+import types
+
+import pytest
+
+
+NOW = datetime(2025, 8, 30, 11, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("90s", datetime(2025, 8, 30, 10, 58, 30, tzinfo=timezone.utc)),
+        ("1h", datetime(2025, 8, 30, 10, 0, 0, tzinfo=timezone.utc)),
+        ("2d", datetime(2025, 8, 28, 11, 0, 0, tzinfo=timezone.utc)),
+        ("2025-08-30T10:00:00Z", datetime(2025, 8, 30, 10, 0, 0, tzinfo=timezone.utc)),
+        (
+            "2025-08-30T12:00:00+02:00",
+            datetime(2025, 8, 30, 10, 0, 0, tzinfo=timezone.utc),
+        ),
+        ("2025-08-30 10:00:00", datetime(2025, 8, 30, 10, 0, 0, tzinfo=timezone.utc)),
+    ],
+)
+def test_parse_time(value, expected):
+    assert parse_time(value, NOW) == expected
+
+
+def test_parse_time_rejects_invalid_values():
+    with pytest.raises(ValueError, match="Invalid time 'yesterday'"):
+        parse_time("yesterday", NOW)
+
+
+def test_get_metric_ignores_missing_and_non_numeric_values():
+    stats = {"cpu": 12.5, "b": True, "n": "x", "t": {"cpu_thermal": 40}}
+    assert get_metric(stats, "cpu") == 12.5
+    assert get_metric(stats, "t.cpu_thermal") == 40
+    assert get_metric(stats, "b") is None
+    assert get_metric(stats, "n") is None
+    assert get_metric(stats, "cpu.x") is None
+    assert get_metric(stats, "missing") is None
+
+
+def test_percentile_interpolates_like_numpy():
+    values = [1.0, 2.0, 3.0, 4.0, 10.0]
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 90) == pytest.approx(7.6)
+    assert percentile(values, 100) == 10.0
+    assert percentile([], 50) is None
+
+
+def test_metric_reducer_summary_and_merge():
+    first = MetricReducer()
+    second = MetricReducer()
+    for value in (3, 1, 2):
+        first.add(value)
+    second.add(10)
+    first.merge(second)
+    first.merge(MetricReducer())
+
+    assert first.summary([50, 99.5]) == {
+        "count": 4,
+        "mean": 4.0,
+        "min": 1,
+        "max": 10,
+        "p50": 2.5,
+        "p99.5": pytest.approx(9.895),
+    }
+    assert MetricReducer().summary([95]) == {
+        "count": 0,
+        "mean": None,
+        "min": None,
+        "max": None,
+        "p95": None,
+    }
+
+
+def test_aggregate_system_stats_per_system():
+    records = [
+        types.SimpleNamespace(system="a", stats={"cpu": 10, "mp": 50}),
+        types.SimpleNamespace(system="a", stats={"cpu": 30}),
+        types.SimpleNamespace(system="b", stats={"cpu": 20, "mp": 70}),
+    ]
+    groups, count = aggregate_stats(
+        records, "system_stats", ["cpu", "mp"], {"a": "alpha", "b": "beta"}
+    )
+    stats, fleet = summarize_stats(groups, "system_stats", ["cpu", "mp"], [50])
+
+    assert count == 3
+    assert stats["alpha"]["cpu"] == {
+        "count": 2,
+        "mean": 20.0,
+        "min": 10,
+        "max": 30,
+        "p50": 20.0,
+    }
+    assert stats["beta"]["mp"]["max"] == 70
+    assert fleet["cpu"]["count"] == 3
+    assert fleet["cpu"]["p50"] == 20.0
+    assert fleet["mp"]["mean"] == 60.0
+
+
+def test_aggregate_container_stats_per_container():
+    records = [
+        types.SimpleNamespace(
+            system="a", stats=[{"n": "web", "c": 1.5}, {"n": "db", "c": 4}]
+        ),
+        types.SimpleNamespace(system="a", stats=[{"n": "web", "c": 2.5}]),
+    ]
+    groups, count = aggregate_stats(records, "container_stats", ["c"], {})
+    stats, fleet = summarize_stats(groups, "container_stats", ["c"], [])
+
+    assert count == 2
+    assert stats["a"]["web"]["c"]["mean"] == 2.0
+    assert stats["a"]["db"]["c"]["count"] == 1
+    assert fleet["c"]["max"] == 4
@@ -0,0 +1,158 @@
+from ansible_collections.community.beszel.plugins.module_utils.system_utils import (
+    SystemsCache,
+    sort_records,
+)
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+import json
+import types
+
+URL = "http://localhost:8090"
+USERNAME = "units@example.com"
+
+
+def make_system(system_id: str, name: str, minute: int) -> types.SimpleNamespace:
+    date = datetime(2025, 8, 30, 7, minute, tzinfo=timezone.utc)
+    return types.SimpleNamespace(
+        id=system_id, name=name, host=name, created=date, updated=date
+    )
+
+
+class FakeService:
+    """Systems collection service answering get_list from a list of records."""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def get_list(self, page, per_page, query_params):
+        self.calls.append(dict(query_params))
+        records = self.records
+        if "filter" in query_params:
+            since = query_params["filter"].split("'")[1]
+            records = [
+                record
+                for record in records
+                if record.updated.strftime("%Y-%m-%d %H:%M:%S.000Z") >= since
+            ]
+        items = records[(page - 1) * per_page : page * per_page]  # noqa: E203
+        return types.SimpleNamespace(items=items, total_items=len(records))
+
+
+def make_client(service):
+    client = MagicMock()
+    client.collection.return_value = service
+    return client
+
+
+def test_sort_records_by_many_fields():
+    records = [
+        dict(name="b", status="up"),
+        dict(name="a", status="down"),
+        dict(name="c", status="up"),
+        dict(name="d"),
+    ]
+    assert [record["name"] for record in sort_records(records, "-status, name")] == [
+        "b",
+        "c",
+        "a",
+        "d",
+    ]
+
+
+def test_systems_cache_gets_all_systems_once(tmp_path):
+    service = FakeService([make_system("a", "one", 1), make_system("b", "two", 2)])
+    cache = SystemsCache(str(tmp_path / "systems.json"), URL, USERNAME)
+
+    systems = cache.get(make_client(service))
+
+    assert [system["id"] for system in systems] == ["a", "b"]
+    assert systems[0]["created"] == "2025-08-30T07:01:00+00:00"
+    assert service.calls == [dict(sort="created", skipTotal=1)]
+    assert cache.get(make_client(service), ttl=60) == systems
+    assert len(service.calls) == 1
+
+
+def test_systems_cache_merges_changed_systems(tmp_path):
+    service = FakeService([make_system("a", "one", 1), make_system("b", "two", 2)])
+    cache = SystemsCache(str(tmp_path / "systems.json"), URL, USERNAME)
+    cache.get(make_client(service))
+    service.records = [
+        make_system("a", "one", 1),
+        make_system("b", "renamed", 3),
+        make_system("c", "three", 4),
+    ]
+    service.calls = []
+
+    systems = cache.get(make_client(service))
+
+    assert [(system["id"], system["name"]) for system in systems] == [
+        ("a", "one"),
+        ("b", "renamed"),
+        ("c", "three"),
+    ]
+    assert service.calls == [
+        dict(filter="updated>='2025-08-30 07:02:00.000Z'", skipTotal=1),
+        dict(fields="id"),
+    ]
+
+
+def test_systems_cache_drops_deleted_systems(tmp_path):
+    service = FakeService([make_system("a", "one", 1), make_system("b", "two", 2)])
+    path = tmp_path / "systems.json"
+    cache = SystemsCache(str(path), URL, USERNAME)
+    cache.get(make_client(service))
+    del service.records[0]
+    service.calls = []
+
+    systems = cache.get(make_client(service))
+
+    assert [system["id"] for system in systems] == ["b"]
+    assert service.calls[-1] == dict(fields="id", skipTotal=1)
+    entry = json.loads(path.read_text())[SystemsCache(str(path), URL, USERNAME).key]
+    assert entry["synced"] == "2025-08-30 07:02:00.000Z"
+    assert [system["id"] for system in entry["systems"]] == ["b"]
+
+
+def test_systems_cache_invalidate_refreshes_within_ttl(tmp_path):
+    service = FakeService([make_system("a", "one", 1)])
+    cache = SystemsCache(str(tmp_path / "systems.json"), URL, USERNAME)
+    cache.get(make_client(service))
+    service.records.append(make_system("b", "two", 2))
+
+    assert len(cache.get(make_client(service), ttl=60)) == 1
+    cache.invalidate()
+    assert len(cache.get(make_client(service), ttl=60)) == 2
+
+
+def test_systems_cache_is_kept_per_hub_and_user(tmp_path):
+    path = str(tmp_path / "systems.json")
+    SystemsCache(path, URL, USERNAME).get(
+        make_client(FakeService([make_system("a", "one", 1)]))
+    )
+    service = FakeService([])
+
+    assert SystemsCache(path, URL, "other@example.com").get(make_client(service)) == []
+    assert service.calls == [dict(sort="created", skipTotal=1)]
+
+
+def test_systems_cache_is_kept_per_filter(tmp_path):
+    path = str(tmp_path / "systems.json")
+    service = FakeService([make_system("a", "one", 1)])
+    cache = SystemsCache(path, URL, USERNAME, "host != ''")
+    cache.get(make_client(service))
+    cache.get(make_client(service))
+
+    assert service.calls == [
+        dict(sort="created", filter="host != ''", skipTotal=1),
+        dict(filter="(host != '') && updated>='2025-08-30 07:01:00.000Z'", skipTotal=1),
+        dict(fields="id", filter="host != ''"),
+    ]
+    assert cache.key != SystemsCache(path, URL, USERNAME).key
+
+    # Changing the systems invalidates the cached systems of all filters
+    cache.get(make_client(service), ttl=60)
+    SystemsCache(path, URL, USERNAME).invalidate()
+    cache.get(make_client(service), ttl=60)
+    assert len(service.calls) == 5
@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+MODULES = [
+    "system",
+    "system_info",
+    "system_stats_info",
+    "system_sync",
+    "system_wait",
+    "universal_token",
+]
+
+# Libraries which are only imported when first used, as importing them takes
+# longer than running a module which does not have to contact the hub
+LAZY_IMPORTS = ["asyncio", "httpx", "pocketbase", "pyarrow"]
+
+# Cumulative import time budget of the modules of the collection, in microseconds,
+# which leaves room for slow or busy machines while catching heavy imports
+IMPORT_TIME_BUDGET = 75000
+
+PACKAGE = "ansible_collections.community.beszel"
+
+
+def import_times(module: str) -> dict:
+    """Import a module in a new interpreter and get the cumulative import times.
+
+    Args:
+        module (str): The name of the module of the collection.
+
+    Returns:
+        dict: The cumulative import times in microseconds keyed by imported module,
+            excluding the modules imported by Ansible.
+    """
+    # Ansible is imported first, as it is not imported lazily and so does not
+    # count towards the import time of the modules
+    code = "import ansible.module_utils.basic; import {0}.plugins.modules.{1}".format(
+        PACKAGE, module
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        prefix, separator, timings = line.partition("import time:")
+        fields = [field.strip() for field in timings.split("|")]
+        if prefix or len(fields) != 3 or not fields[1].isdigit():
+            continue
+        times[fields[2]] = int(fields[1])
+    return times
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_module_does_not_import_heavy_libraries(module):
+    imported = import_times(module)
+    assert f"{PACKAGE}.plugins.modules.{module}" in imported
+    for library in LAZY_IMPORTS:
+        assert library not in imported
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_module_import_time_budget(module):
+    imported = import_times(module)
+    assert imported[f"{PACKAGE}.plugins.modules.{module}"] < IMPORT_TIME_BUDGET
@@ -4,11 +4,19 @@ from ansible_collections.community.internal_test_tools.tests.unit.plugins.module
     set_module_args,
     ModuleTestCase,
 )
-from ansible_collections.community.beszel.plugins.module_utils import pocketbase_utils
+from ansible_collections.community.beszel.plugins.module_utils import (
+    pocketbase_async,
+    pocketbase_utils,
+)
 from ansible_collections.community.beszel.plugins.modules import system
-from unittest.mock import patch, MagicMock
+from pocketbase.errors import ClientResponseError
+from datetime import datetime
+from unittest.mock import call, patch, MagicMock
 
+import json
+import os
 import pytest
+import tempfile
 import types
 
 
@@ -50,20 +58,13 @@ class TestSystem(ModuleTestCase):
         # Ensure module thinks pocketbase is available
         pocketbase_utils.HAS_POCKETBASE = True
         system.HAS_POCKETBASE = True
-        system.POCKETBASE_IMPORT_ERROR = None
-
-        class _DummyClientResponseError(Exception):
-            """Simulate a client response error."""
-
-            pass
-
-        system.ClientResponseError = _DummyClientResponseError
 
         # Patch PocketBaseClient inside the module under test
         self.patcher = patch(
             "ansible_collections.community.beszel.plugins.modules.system.PocketBaseClient"
         )
         self.pocketbase_client_mock = self.patcher.start()
+        self.tmp_dir = tempfile.TemporaryDirectory()
 
         # Fake client and collections
         self.fake_client = MagicMock()
@@ -81,9 +82,9 @@ class TestSystem(ModuleTestCase):
         )
 
         # Default behaviors
-        self.users_collection.get_first_list_item.return_value = types.SimpleNamespace(
-            id="user-current-id"
-        )
+        self.users_collection.get_full_list.return_value = [
+            types.SimpleNamespace(id="user-current-id", email="units@example.com")
+        ]
         self.systems_collection.get_first_list_item.return_value = (
             types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING)
         )
@@ -109,6 +110,7 @@ class TestSystem(ModuleTestCase):
 
     def tearDown(self):
         self.patcher.stop()
+        self.tmp_dir.cleanup()
         super(TestSystem, self).tearDown()
 
     def test_system_fails_with_no_arguments(self):
@@ -144,7 +146,7 @@ class TestSystem(ModuleTestCase):
                 "name": SINGLE_SYSTEM_EXISTING["name"],
                 "host": SINGLE_SYSTEM_EXISTING["host"],
                 "port": int(SINGLE_SYSTEM_EXISTING["port"]),
-                "users": ["user-current-id"],
+                "users": ["units@example.com"],
                 "state": "present",
             }
         ):
@@ -179,11 +181,47 @@ class TestSystem(ModuleTestCase):
             assert result["msg"] == "System was updated."
             assert result["system"]["host"] == "instance-updated"
             assert int(result["system"]["port"]) == 45877
+            # Only the fields which differ are sent to the hub
+            self.systems_collection.update.assert_called_once_with(
+                id=SINGLE_SYSTEM_EXISTING["id"],
+                body_params={"host": "instance-updated", "port": 45877},
+            )
+
+    def test_system_present_ignores_users_order(self):
+        self.systems_collection.get_first_list_item.return_value = (
+            types.SimpleNamespace(
+                **{
+                    **SINGLE_SYSTEM_EXISTING,
+                    "users": ["user-other-id", "user-current-id"],
+                }
+            )
+        )
+        self.users_collection.get_full_list.return_value = [
+            types.SimpleNamespace(id="user-current-id", email="units@example.com"),
+            types.SimpleNamespace(id="user-other-id", email="other@example.com"),
+        ]
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "name": SINGLE_SYSTEM_EXISTING["name"],
+                "host": SINGLE_SYSTEM_EXISTING["host"],
+                "users": ["units@example.com", "other@example.com"],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is False
+            self.systems_collection.update.assert_not_called()
 
     def test_system_present_creates_when_absent(self):
         # Simulate system not found
-        self.systems_collection.get_first_list_item.side_effect = (
-            system.ClientResponseError()
+        self.systems_collection.get_first_list_item.side_effect = ClientResponseError(
+            "Not found.", status=404
         )
 
         with set_module_args(
@@ -207,10 +245,32 @@ class TestSystem(ModuleTestCase):
             assert result["system"]["host"] == "new-host"
             assert result["system"]["status"] in ["pending", "up"]
 
+    def test_system_present_escapes_name_in_filter(self):
+        self.systems_collection.get_first_list_item.side_effect = ClientResponseError(
+            "Not found.", status=404
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "name": "it's' || name != '",
+                "host": "new-host",
+                "state": "present",
+            }
+        ):
+            with pytest.raises(AnsibleExitJson):
+                system.main()
+
+            self.systems_collection.get_first_list_item.assert_called_once_with(
+                filter="name='it\\'s\\' || name != \\''"
+            )
+
     def test_system_present_creates_when_absent_check_mode(self):
         # Simulate system not found so it creates a new one
-        self.systems_collection.get_first_list_item.side_effect = (
-            system.ClientResponseError()
+        self.systems_collection.get_first_list_item.side_effect = ClientResponseError(
+            "Not found.", status=404
         )
 
         with set_module_args(
@@ -276,8 +336,8 @@ class TestSystem(ModuleTestCase):
 
     def test_system_absent_noop_when_not_exists(self):
         # Simulate system not found so it does nothing
-        self.systems_collection.get_first_list_item.side_effect = (
-            system.ClientResponseError()
+        self.systems_collection.get_first_list_item.side_effect = ClientResponseError(
+            "Not found.", status=404
         )
 
         with set_module_args(
@@ -296,6 +356,30 @@ class TestSystem(ModuleTestCase):
             assert result["changed"] is False
             assert result["msg"] == "System does not exist. Nothing to remove."
 
+    def test_system_present_fails_when_hub_is_unavailable(self):
+        # The system must not be created when the lookup fails for another reason
+        self.systems_collection.get_first_list_item.side_effect = ClientResponseError(
+            "Service unavailable.", status=503
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "name": "instance",
+                "host": "new-host",
+                "state": "present",
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system.main()
+
+            assert exc_info.value.args[0]["msg"].startswith(
+                "Failed to get existing system with name 'instance':"
+            )
+            self.systems_collection.create.assert_not_called()
+
     def test_system_authentication_failure(self):
         # Make authenticate raise an exception
         self.pocketbase_client_mock.return_value.authenticate.side_effect = Exception(
@@ -315,3 +399,498 @@ class TestSystem(ModuleTestCase):
             with pytest.raises(AnsibleFailJson) as exc_info:
                 system.main()
             assert "auth failed" in exc_info.value.args[0]["msg"]
+
+    def test_system_bulk_reconciles_in_single_listing(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING)]
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "systems": [
+                    {
+                        "name": SINGLE_SYSTEM_EXISTING["name"],
+                        "host": SINGLE_SYSTEM_EXISTING["host"],
+                    },
+                    {"name": "new-instance", "host": "new-host"},
+                    {"name": "missing", "state": "absent"},
+                ],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is True
+            assert result["msg"] == "1 system(s) were changed."
+            assert [item["name"] for item in result["systems"]] == [
+                SINGLE_SYSTEM_EXISTING["name"],
+                "new-instance",
+                "missing",
+            ]
+            assert [item["changed"] for item in result["systems"]] == [
+                False,
+                True,
+                False,
+            ]
+            assert result["systems"][1]["msg"] == "System was created."
+            self.systems_collection.get_list.assert_called_once_with(
+                1, 500, {"sort": "created", "skipTotal": 1}
+            )
+            self.systems_collection.get_first_list_item.assert_not_called()
+            self.systems_collection.update.assert_not_called()
+            self.systems_collection.delete.assert_not_called()
+            self.systems_collection.create.assert_called_once_with(
+                body_params={
+                    "name": "new-instance",
+                    "host": "new-host",
+                    "port": 45876,
+                    "users": ["user-current-id"],
+                }
+            )
+            # The users of all systems are resolved with a single lookup
+            self.users_collection.get_full_list.assert_called_once_with(
+                batch=50,
+                query_params={
+                    "filter": "email='units@example.com'",
+                    "fields": "id,email",
+                },
+            )
+
+    def test_system_bulk_deletes_check_mode(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING)]
+        )
+
+        with set_module_args(
+            {
+                "_ansible_check_mode": True,
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "state": "absent",
+                "systems": [{"name": SINGLE_SYSTEM_EXISTING["name"]}],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is True
+            assert result["msg"] == "1 system(s) would be changed."
+            assert result["systems"][0]["msg"] == "System would be deleted."
+            self.systems_collection.delete.assert_not_called()
+
+    def test_system_bulk_present_requires_host(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "systems": [{"name": "instance"}],
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system.main()
+            assert (
+                "Host is required when state is present for system 'instance'"
+                in exc_info.value.args[0]["msg"]
+            )
+
+    def test_system_bulk_rejects_duplicate_names(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "systems": [
+                    {"name": "instance", "host": "a"},
+                    {"name": "instance", "host": "b"},
+                ],
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system.main()
+            assert (
+                "System names must be unique: instance"
+                in (exc_info.value.args[0]["msg"])
+            )
+
+    def test_system_bulk_exclusive_deletes_unmanaged(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING),
+                types.SimpleNamespace(
+                    **{**SINGLE_SYSTEM_EXISTING, "id": "stale-id-1", "name": "stale-1"}
+                ),
+                types.SimpleNamespace(
+                    **{**SINGLE_SYSTEM_EXISTING, "id": "stale-id-2", "name": "stale-2"}
+                ),
+            ]
+        )
+        batch = self.fake_client.create_batch.return_value
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "exclusive": True,
+                "systems": [
+                    {
+                        "name": SINGLE_SYSTEM_EXISTING["name"],
+                        "host": SINGLE_SYSTEM_EXISTING["host"],
+                    },
+                ],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is True
+            assert result["msg"] == "2 system(s) were changed."
+            assert [(item["name"], item["msg"]) for item in result["systems"][1:]] == [
+                ("stale-1", "System was deleted."),
+                ("stale-2", "System was deleted."),
+            ]
+            batch.collection.return_value.delete.assert_has_calls(
+                [call("stale-id-1"), call("stale-id-2")]
+            )
+            batch.send.assert_called_once()
+            self.systems_collection.delete.assert_not_called()
+
+    def test_system_bulk_exclusive_check_mode(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING),
+            ]
+        )
+
+        with set_module_args(
+            {
+                "_ansible_check_mode": True,
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "exclusive": True,
+                "systems": [{"name": "new-instance", "host": "new-host"}],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is True
+            assert result["systems"][1]["name"] == SINGLE_SYSTEM_EXISTING["name"]
+            assert result["systems"][1]["msg"] == "System would be deleted."
+            self.fake_client.create_batch.assert_not_called()
+            self.systems_collection.delete.assert_not_called()
+
+    def test_system_bulk_exclusive_without_batch_api(self):
+        class _DummyForbiddenError(Exception):
+            status = 403
+
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING),
+            ]
+        )
+        self.fake_client.create_batch.return_value.send.side_effect = (
+            _DummyForbiddenError()
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "exclusive": True,
+                "systems": [],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is True
+            self.systems_collection.delete.assert_called_once_with(
+                id=SINGLE_SYSTEM_EXISTING["id"]
+            )
+
+    def test_system_exclusive_requires_systems(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "name": "instance",
+                "host": "instance",
+                "exclusive": True,
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system.main()
+            assert "systems" in exc_info.value.args[0]["msg"]
+
+    def test_system_bulk_resolves_users_in_single_lookup(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(items=[])
+        self.users_collection.get_full_list.return_value = [
+            types.SimpleNamespace(id="user-a-id", email="a@example.com"),
+            types.SimpleNamespace(id="user-b-id", email="b@example.com"),
+        ]
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "users": ["a@example.com"],
+                "systems": [
+                    {"name": "instance1", "host": "instance1"},
+                    {
+                        "name": "instance2",
+                        "host": "instance2",
+                        "users": ["B@example.com", "a@example.com"],
+                    },
+                ],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson):
+                system.main()
+
+            self.users_collection.get_full_list.assert_called_once_with(
+                batch=50,
+                query_params={
+                    "filter": "email='B@example.com' || email='a@example.com'",
+                    "fields": "id,email",
+                },
+            )
+            self.users_collection.get_first_list_item.assert_not_called()
+            assert [
+                c.kwargs["body_params"]["users"]
+                for c in self.systems_collection.create.call_args_list
+            ] == [["user-a-id"], ["user-b-id", "user-a-id"]]
+
+    def test_system_present_fails_when_users_missing(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "name": SINGLE_SYSTEM_EXISTING["name"],
+                "host": SINGLE_SYSTEM_EXISTING["host"],
+                "users": ["units@example.com", "missing@example.com"],
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system.main()
+            assert exc_info.value.args[0]["msg"] == (
+                "Failed to get ID of users 'missing@example.com': users do not exist."
+            )
+
+    def test_system_bulk_changes_systems_concurrently(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING)]
+        )
+        self.fake_client.auth_store.token = "token"
+
+        with patch.object(pocketbase_async, "run_concurrently") as run_concurrently:
+            run_concurrently.return_value = [
+                SINGLE_SYSTEM_EXISTING,
+                Exception("Failed to create system 'broken': bad request"),
+            ]
+            with set_module_args(
+                {
+                    "url": "http://localhost:8090",
+                    "username": "units@example.com",
+                    "password": "testing",
+                    "concurrency": 8,
+                    "systems": [
+                        {"name": SINGLE_SYSTEM_EXISTING["name"], "state": "absent"},
+                        {"name": "broken", "host": "broken"},
+                        {"name": "missing", "state": "absent"},
+                    ],
+                }
+            ):
+                with pytest.raises(AnsibleFailJson) as exc_info:
+                    system.main()
+
+        result = exc_info.value.args[0]
+        assert result["msg"] == "Failed to create system 'broken': bad request"
+        assert [item["name"] for item in result["systems"]] == [
+            SINGLE_SYSTEM_EXISTING["name"],
+            "missing",
+        ]
+        assert result["systems"][0]["msg"] == "System was deleted."
+        operations, concurrency = run_concurrently.call_args.args[1:]
+        assert len(operations) == 2
+        assert concurrency == 8
+        assert run_concurrently.call_args.kwargs["token"] == "token"
+        self.systems_collection.delete.assert_not_called()
+        self.systems_collection.create.assert_not_called()
+
+    def test_system_present_update_diff_only_shows_changed_fields(self):
+        with set_module_args(
+            {
+                "_ansible_diff": True,
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "name": SINGLE_SYSTEM_EXISTING["name"],
+                "host": "instance-updated",
+                "port": int(SINGLE_SYSTEM_EXISTING["port"]),
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["diff"] == {
+                "before": {"host": SINGLE_SYSTEM_EXISTING["host"]},
+                "after": {"host": "instance-updated"},
+            }
+
+    def test_system_bulk_check_mode_aggregates_compact_diff(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING)]
+        )
+
+        with set_module_args(
+            {
+                "_ansible_check_mode": True,
+                "_ansible_diff": True,
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "systems": [
+                    {"name": SINGLE_SYSTEM_EXISTING["name"], "state": "absent"},
+                    {"name": "new-instance", "host": "new-host"},
+                ],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["diff"] == {
+                "before": {
+                    SINGLE_SYSTEM_EXISTING["name"]: {
+                        "host": SINGLE_SYSTEM_EXISTING["host"],
+                        "port": 45876,
+                        "users": ["user-current-id"],
+                    }
+                },
+                "after": {
+                    "new-instance": {
+                        "host": "new-host",
+                        "port": 45876,
+                        "users": ["user-current-id"],
+                    }
+                },
+            }
+            # The simulated system only holds the fields it would be created with
+            assert result["systems"][1]["system"] == {
+                "name": "new-instance",
+                "host": "new-host",
+                "port": 45876,
+                "users": ["user-current-id"],
+                "status": "pending",
+            }
+            self.systems_collection.create.assert_not_called()
+
+    def test_system_bulk_uses_and_invalidates_systems_cache(self):
+        systems_cache = os.path.join(self.tmp_dir.name, "systems.json")
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(
+                    **dict(
+                        SINGLE_SYSTEM_EXISTING,
+                        created=datetime(2025, 8, 30, 7, 48, 4),
+                        updated=datetime(2025, 8, 30, 11, 8, 36),
+                    )
+                )
+            ],
+            total_items=1,
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "systems_cache": systems_cache,
+                "systems": [
+                    {
+                        "name": SINGLE_SYSTEM_EXISTING["name"],
+                        "host": SINGLE_SYSTEM_EXISTING["host"],
+                    },
+                    {"name": "new-instance", "host": "new-host"},
+                ],
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+        result = exc_info.value.args[0]
+        assert [item["changed"] for item in result["systems"]] == [False, True]
+        self.systems_collection.get_list.assert_called_once()
+        self.systems_collection.create.assert_called_once()
+        with open(systems_cache) as f:
+            entries = list(json.load(f).values())
+        assert [system["name"] for system in entries[0]["systems"]] == ["instance"]
+        # The next system_info run refreshes the cache, whatever its TTL
+        assert entries[0]["checked"] == 0
+
+    def test_system_bulk_reconciles_hubs(self):
+        self.systems_collection.get_list.return_value = types.SimpleNamespace(
+            items=[types.SimpleNamespace(**SINGLE_SYSTEM_EXISTING)]
+        )
+
+        with set_module_args(
+            {
+                "username": "units@example.com",
+                "password": "testing",
+                "hubs": [
+                    {"name": "eu", "url": "http://eu:8090"},
+                    {"name": "us", "url": "http://us:8090"},
+                ],
+                "systems": [{"name": "new-instance", "host": "new-host"}],
+                "_ansible_diff": True,
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is True
+            assert result["msg"] == "2 system(s) were changed."
+            assert [(item["hub"], item["name"]) for item in result["systems"]] == [
+                ("eu", "new-instance"),
+                ("us", "new-instance"),
+            ]
+            assert [hub["changed"] for hub in result["hubs"]] == [True, True]
+            assert sorted(result["diff"]["after"]) == ["eu", "us"]
+            assert self.systems_collection.create.call_count == 2
+            assert sorted(
+                kwargs["url"]
+                for _args, kwargs in self.pocketbase_client_mock.call_args_list
+            ) == ["http://eu:8090", "http://us:8090"]
+
+    def test_system_hubs_require_systems(self):
+        with set_module_args(
+            {
+                "username": "units@example.com",
+                "password": "testing",
+                "hubs": [{"url": "http://eu:8090"}],
+                "name": "instance",
+                "host": "instance",
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system.main()
+
+            assert "hubs" in exc_info.value.args[0]["msg"]
@@ -6,9 +6,14 @@ from ansible_collections.community.internal_test_tools.tests.unit.plugins.module
 )
 from ansible_collections.community.beszel.plugins.module_utils import pocketbase_utils
 from ansible_collections.community.beszel.plugins.modules import system_info
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 
+import csv
+import json
+import os
 import pytest
+import tempfile
 import types
 
 SINGLE_SYSTEM_RESPONSE = {
@@ -79,6 +84,8 @@ class TestSystemInfo(ModuleTestCase):
     def setUp(self):
         super(TestSystemInfo, self).setUp()
         pocketbase_utils.HAS_POCKETBASE = True
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = self.tmp_dir.name
         self.patcher = patch(
             "ansible_collections.community.beszel.plugins.modules.system_info.PocketBaseClient"
         )
@@ -94,12 +101,16 @@ class TestSystemInfo(ModuleTestCase):
         self.fake_collection.get_first_list_item.return_value = types.SimpleNamespace(
             **SINGLE_SYSTEM_RESPONSE
         )
-        self.fake_collection.get_full_list.return_value = [
-            types.SimpleNamespace(**record) for record in MULTIPLE_SYSTEM_RESPONSE
-        ]
+        self.fake_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(**record) for record in MULTIPLE_SYSTEM_RESPONSE
+            ],
+            total_items=-1,
+        )
 
     def tearDown(self):
         self.patcher.stop()
+        self.tmp_dir.cleanup()
         super(TestSystemInfo, self).tearDown()
 
     def test_system_info_fails_with_no_arguments(self):
@@ -160,3 +171,430 @@ class TestSystemInfo(ModuleTestCase):
             with pytest.raises(AnsibleFailJson) as exc_info:
                 system_info.main()
             assert "auth failed" in exc_info.value.args[0]["msg"]
+
+    def test_system_info_passes_filter_fields_and_sort(self):
+        self.fake_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(
+                    id="", created="", updated="", expand={}, name="instance"
+                )
+            ],
+            total_items=-1,
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "filter": "status = 'down'",
+                "fields": ["name"],
+                "sort": "-updated",
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert result["systems"] == [{"name": "instance"}]
+            self.fake_collection.get_list.assert_called_once_with(
+                1,
+                100,
+                {
+                    "sort": "-updated",
+                    "fields": "name",
+                    "filter": "status = 'down'",
+                    "skipTotal": 1,
+                },
+            )
+
+    def test_system_info_combines_name_and_filter(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "name": "instance",
+                "filter": "status = 'up'",
+            }
+        ):
+            with pytest.raises(AnsibleExitJson):
+                system_info.main()
+
+            self.fake_collection.get_first_list_item.assert_called_once_with(
+                filter="name='instance' && (status = 'up')",
+                query_params={"sort": "created"},
+            )
+
+    def test_system_info_returns_single_page(self):
+        self.fake_collection.get_list.return_value = types.SimpleNamespace(
+            items=[types.SimpleNamespace(**MULTIPLE_SYSTEM_RESPONSE[1])],
+            total_items=2,
+            total_pages=2,
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "page": 2,
+                "per_page": 1,
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert [system["name"] for system in result["systems"]] == ["instance1"]
+            assert result["total_items"] == 2
+            assert result["total_pages"] == 2
+            self.fake_collection.get_list.assert_called_once_with(
+                2, 1, {"sort": "created"}
+            )
+            self.fake_collection.get_full_list.assert_not_called()
+
+    def test_system_info_limits_systems_of_page(self):
+        self.fake_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(**record) for record in MULTIPLE_SYSTEM_RESPONSE
+            ],
+            total_items=4,
+            total_pages=2,
+        )
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "page": 2,
+                "per_page": 2,
+                "limit": 1,
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            # The page keeps its window, the limit only truncates it
+            assert [system["name"] for system in result["systems"]] == ["instance"]
+            self.fake_collection.get_list.assert_called_once_with(
+                2, 2, {"sort": "created"}
+            )
+
+    def test_system_info_stops_requesting_pages_at_limit(self):
+        self.fake_collection.get_list.side_effect = [
+            types.SimpleNamespace(
+                items=[types.SimpleNamespace(**record)], total_items=-1
+            )
+            for record in MULTIPLE_SYSTEM_RESPONSE
+        ]
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "limit": 1,
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert len(result["systems"]) == 1
+            self.fake_collection.get_list.assert_called_once_with(
+                1, 1, {"sort": "created", "skipTotal": 1}
+            )
+
+    def test_system_info_walks_pages_until_short_page(self):
+        self.fake_collection.get_list.side_effect = [
+            types.SimpleNamespace(
+                items=[types.SimpleNamespace(**MULTIPLE_SYSTEM_RESPONSE[0])],
+                total_items=-1,
+            ),
+            types.SimpleNamespace(items=[], total_items=-1),
+        ]
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "per_page": 1,
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert [system["name"] for system in result["systems"]] == ["instance"]
+            assert self.fake_collection.get_list.call_count == 2
+            self.fake_collection.get_full_list.assert_not_called()
+
+    def test_system_info_writes_systems_to_dest(self):
+        dest = os.path.join(self.tmp_path, "systems.jsonl")
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "dest": dest,
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert result["systems"] == []
+            assert result["count"] == 2
+            assert result["dest"] == dest
+            with open(dest) as f:
+                assert [json.loads(line) for line in f] == MULTIPLE_SYSTEM_RESPONSE
+
+    def test_system_info_keeps_unchanged_dest(self):
+        dest = os.path.join(self.tmp_path, "systems.jsonl")
+        module_args = {
+            "url": "http://localhost:8090",
+            "username": "units@example.com",
+            "password": "testing",
+            "dest": dest,
+        }
+
+        results = []
+        for dummy in range(2):
+            with set_module_args(module_args):
+                with pytest.raises(AnsibleExitJson) as exc_info:
+                    system_info.main()
+            results.append(exc_info.value.args[0])
+
+        assert [result["changed"] for result in results] == [True, False]
+        assert results[1]["count"] == 2
+        assert os.listdir(self.tmp_path) == ["systems.jsonl"]
+
+    def test_system_info_does_not_write_dest_in_check_mode(self):
+        dest = os.path.join(self.tmp_path, "systems.jsonl")
+        with open(dest, "w") as f:
+            f.write("stale\n")
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "dest": dest,
+                "_ansible_check_mode": True,
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert result["changed"] is True
+            assert result["count"] == 2
+            with open(dest) as f:
+                assert f.read() == "stale\n"
+            assert os.listdir(self.tmp_path) == ["systems.jsonl"]
+
+    def test_system_info_writes_systems_to_csv_dest(self):
+        dest = os.path.join(self.tmp_path, "systems.csv")
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "dest": dest,
+                "format": "csv",
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert result["count"] == 2
+            with open(dest, newline="") as f:
+                rows = list(csv.DictReader(f))
+            assert [row["name"] for row in rows] == ["instance", "instance1"]
+            assert rows[0]["info.cpu"] == "0.06"
+            assert json.loads(rows[0]["info.la"]) == [0, 0, 0]
+            assert json.loads(rows[1]["users"]) == ["zsk3bb1p2uisg4g"]
+            assert "info" not in rows[0]
+            assert os.listdir(self.tmp_path) == ["systems.csv"]
+
+    def test_system_info_writes_systems_to_parquet_dest(self):
+        pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+        dest = os.path.join(self.tmp_path, "systems.parquet")
+
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "dest": dest,
+                "format": "parquet",
+            }
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+
+            result = exc_info.value.args[0]
+            assert result["count"] == 2
+            table = pyarrow_parquet.read_table(dest)
+            assert table.column("name").to_pylist() == ["instance", "instance1"]
+            assert table.column("info.cpu").to_pylist() == [0.06, 0.06]
+
+    def test_system_info_fails_without_pyarrow(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "dest": os.path.join(self.tmp_path, "systems.arrow"),
+                "format": "arrow",
+            }
+        ):
+            with patch.object(system_info, "HAS_PYARROW", False):
+                with pytest.raises(AnsibleFailJson) as exc_info:
+                    system_info.main()
+
+            assert "pyarrow" in exc_info.value.args[0]["msg"]
+
+    def test_system_info_fails_for_invalid_max_in_flight(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "max_in_flight": 0,
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_info.main()
+
+            assert exc_info.value.args[0]["msg"] == "max_in_flight must be at least 1."
+            self.pocketbase_client_mock.assert_not_called()
+
+    def test_system_info_fails_for_invalid_limit(self):
+        with set_module_args(
+            {
+                "url": "http://localhost:8090",
+                "username": "units@example.com",
+                "password": "testing",
+                "limit": 0,
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_info.main()
+
+            assert exc_info.value.args[0]["msg"] == "limit must be at least 1."
+            self.fake_collection.get_list.assert_not_called()
+
+    def test_system_info_reads_systems_cache(self):
+        systems_cache = os.path.join(self.tmp_path, "systems.json")
+        self.fake_collection.get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(
+                    **dict(
+                        record,
+                        created=datetime(2025, 8, 30, 7, 48, 4 + index),
+                        updated=datetime(2025, 8, 30, 11, 8, 36),
+                    )
+                )
+                for index, record in enumerate(MULTIPLE_SYSTEM_RESPONSE)
+            ],
+            total_items=2,
+        )
+        args = {
+            "url": "http://localhost:8090",
+            "username": "units@example.com",
+            "password": "testing",
+            "systems_cache": systems_cache,
+            "systems_cache_ttl": 60,
+            "sort": "-created",
+            "fields": ["name"],
+        }
+
+        for run in range(2):
+            with set_module_args(args):
+                with pytest.raises(AnsibleExitJson) as exc_info:
+                    system_info.main()
+
+            result = exc_info.value.args[0]
+            assert result["systems"] == [{"name": "instance1"}, {"name": "instance"}]
+        # The second run is served from the cache
+        self.fake_collection.get_list.assert_called_once_with(
+            1, 100, {"sort": "created", "skipTotal": 1}
+        )
+
+        with set_module_args(dict(args, name="instance1", systems_cache_ttl=0)):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_info.main()
+        assert exc_info.value.args[0]["systems"] == [{"name": "instance1"}]
+        self.fake_collection.get_first_list_item.assert_not_called()
+
+        with set_module_args(dict(args, name="missing")):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_info.main()
+        assert exc_info.value.args[0]["msg"] == "System with name 'missing' not found."
+
+    def test_system_info_merges_systems_of_hubs(self):
+        def make_client(**client_args):
+            client = MagicMock()
+            if client_args["url"] == "http://us:8090":
+                client.authenticate.side_effect = Exception("auth failed")
+            else:
+                client.authenticate.return_value = self.fake_client
+            return client
+
+        self.pocketbase_client_mock.side_effect = make_client
+
+        with set_module_args(
+            {
+                "username": "units@example.com",
+                "password": "testing",
+                "hubs": [
+                    {"name": "eu", "url": "http://eu:8090"},
+                    {"name": "us", "url": "http://us:8090"},
+                ],
+            }
+        ):
+            with patch.object(system_info.AnsibleModule, "warn") as warn:
+                with pytest.raises(AnsibleExitJson) as exc_info:
+                    system_info.main()
+
+            result = exc_info.value.args[0]
+            assert [
+                (system["hub"], system["name"]) for system in result["systems"]
+            ] == [
+                ("eu", "instance"),
+                ("eu", "instance1"),
+            ]
+            assert result["hubs"] == [
+                {"name": "eu", "failed": False, "msg": "", "count": 2},
+                {"name": "us", "failed": True, "msg": "auth failed"},
+            ]
+            warn.assert_called_once_with(
+                "Failed to get the systems of hub 'us': auth failed"
+            )
+
+    def test_system_info_fails_when_all_hubs_fail(self):
+        self.pocketbase_client_mock.return_value.authenticate.side_effect = Exception(
+            "auth failed"
+        )
+
+        with set_module_args(
+            {
+                "username": "units@example.com",
+                "password": "testing",
+                "hubs": [{"url": "http://eu:8090"}],
+            }
+        ):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_info.main()
+
+            assert exc_info.value.args[0]["msg"] == (
+                "Failed to get the systems of all hubs. http://eu:8090: auth failed"
+            )
@@ -0,0 +1,168 @@
+from ansible_collections.community.internal_test_tools.tests.unit.plugins.modules.utils import (
+    AnsibleExitJson,
+    AnsibleFailJson,
+    set_module_args,
+    ModuleTestCase,
+)
+from ansible_collections.community.beszel.plugins.module_utils import pocketbase_utils
+from ansible_collections.community.beszel.plugins.modules import system_stats_info
+from unittest.mock import patch, MagicMock
+
+import pytest
+import types
+
+SYSTEMS = [
+    types.SimpleNamespace(id="q5y5h742bwueyns", name="instance"),
+    types.SimpleNamespace(id="q5y5h742bwugyns", name="instance1"),
+]
+
+SYSTEM_STATS = [
+    types.SimpleNamespace(system="q5y5h742bwueyns", stats={"cpu": 10, "mp": 40}),
+    types.SimpleNamespace(system="q5y5h742bwueyns", stats={"cpu": 90, "mp": 60}),
+    types.SimpleNamespace(system="q5y5h742bwugyns", stats={"cpu": 20, "mp": 50}),
+]
+
+MODULE_ARGS = {
+    "url": "http://localhost:8090",
+    "username": "units@example.com",
+    "password": "testing",
+}
+
+
+class TestSystemStatsInfo(ModuleTestCase):
+    def setUp(self):
+        super(TestSystemStatsInfo, self).setUp()
+        pocketbase_utils.HAS_POCKETBASE = True
+        self.patcher = patch.object(system_stats_info, "PocketBaseClient")
+        self.pocketbase_client_mock = self.patcher.start()
+
+        self.fake_client = MagicMock()
+        self.collections = {
+            "systems": MagicMock(),
+            "system_stats": MagicMock(),
+            "container_stats": MagicMock(),
+        }
+        self.fake_client.collection.side_effect = self.collections.get
+        self.pocketbase_client_mock.return_value.authenticate.return_value = (
+            self.fake_client
+        )
+        self.collections["systems"].get_list.return_value = types.SimpleNamespace(
+            items=SYSTEMS
+        )
+        self.collections["system_stats"].get_list.return_value = types.SimpleNamespace(
+            items=SYSTEM_STATS
+        )
+
+    def tearDown(self):
+        self.patcher.stop()
+        super(TestSystemStatsInfo, self).tearDown()
+
+    def test_system_stats_info_fails_with_no_arguments(self):
+        with set_module_args({}):
+            with pytest.raises(AnsibleFailJson):
+                system_stats_info.main()
+
+    def test_system_stats_info_summarizes_stats_per_system(self):
+        with set_module_args(dict(MODULE_ARGS, percentiles=[50, 95])):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_stats_info.main()
+
+        result = exc_info.value.args[0]
+        assert result["changed"] is False
+        assert result["count"] == 3
+        assert result["stats"]["instance"]["cpu"] == {
+            "count": 2,
+            "mean": 50.0,
+            "min": 10,
+            "max": 90,
+            "p50": 50.0,
+            "p95": 86.0,
+        }
+        assert set(result["stats"]["instance1"]) == {"cpu", "mp"}
+        assert result["fleet"]["cpu"]["max"] == 90
+        assert result["fleet"]["mp"]["mean"] == 50.0
+        assert "until" not in result
+
+        page, per_page, query_params = self.collections[
+            "system_stats"
+        ].get_list.call_args.args
+        assert (page, per_page) == (1, 500)
+        assert query_params["fields"] == "system,stats"
+        assert query_params["skipTotal"] == 1
+        assert query_params["filter"].startswith("type='1m' && created>='")
+
+    def test_system_stats_info_filters_by_names_and_time_window(self):
+        self.collections["systems"].get_list.return_value = types.SimpleNamespace(
+            items=SYSTEMS[1:]
+        )
+        with set_module_args(
+            dict(
+                MODULE_ARGS,
+                names=["instance1"],
+                type="10m",
+                since="2025-08-30T10:00:00Z",
+                until="2025-08-30T11:00:00Z",
+                filter="stats.cpu > 5",
+                metrics=["cpu"],
+            )
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_stats_info.main()
+
+        result = exc_info.value.args[0]
+        assert result["since"] == "2025-08-30T10:00:00+00:00"
+        assert result["until"] == "2025-08-30T11:00:00+00:00"
+        assert set(result["fleet"]) == {"cpu"}
+        # Only the systems with the names are requested
+        systems_query_params = self.collections["systems"].get_list.call_args.args[2]
+        assert systems_query_params["filter"] == "name='instance1'"
+        query_params = self.collections["system_stats"].get_list.call_args.args[2]
+        assert query_params["filter"] == (
+            "(type='10m' && created>='2025-08-30 10:00:00.000Z'"
+            " && created<='2025-08-30 11:00:00.000Z' && (stats.cpu > 5))"
+            " && system='q5y5h742bwugyns'"
+        )
+
+    def test_system_stats_info_summarizes_stats_per_container(self):
+        self.collections[
+            "container_stats"
+        ].get_list.return_value = types.SimpleNamespace(
+            items=[
+                types.SimpleNamespace(
+                    system="q5y5h742bwueyns",
+                    stats=[{"n": "web", "c": 1.0, "m": 100}, {"n": "db", "c": 3.0}],
+                )
+            ]
+        )
+        with set_module_args(dict(MODULE_ARGS, collection="container_stats")):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_stats_info.main()
+
+        result = exc_info.value.args[0]
+        assert result["stats"]["instance"]["web"]["m"]["max"] == 100
+        assert set(result["stats"]["instance"]["db"]) == {"c"}
+        assert result["fleet"]["c"]["mean"] == 2.0
+
+    def test_system_stats_info_fails_for_unknown_system(self):
+        with set_module_args(dict(MODULE_ARGS, names=["missing"])):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_stats_info.main()
+
+        assert "'missing'" in exc_info.value.args[0]["msg"]
+        self.collections["system_stats"].get_list.assert_not_called()
+
+    def test_system_stats_info_fails_for_invalid_per_page(self):
+        with set_module_args(dict(MODULE_ARGS, per_page=0)):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_stats_info.main()
+
+        assert exc_info.value.args[0]["msg"] == "per_page must be at least 1."
+        self.pocketbase_client_mock.assert_not_called()
+
+    def test_system_stats_info_fails_for_invalid_since(self):
+        with set_module_args(dict(MODULE_ARGS, since="yesterday")):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_stats_info.main()
+
+        assert "Invalid time" in exc_info.value.args[0]["msg"]
+        self.pocketbase_client_mock.assert_not_called()
@@ -0,0 +1,228 @@
+from ansible_collections.community.internal_test_tools.tests.unit.plugins.modules.utils import (
+    AnsibleExitJson,
+    AnsibleFailJson,
+    set_module_args,
+    ModuleTestCase,
+)
+from ansible_collections.community.beszel.plugins.module_utils import (
+    pocketbase_async,
+    pocketbase_utils,
+)
+from ansible_collections.community.beszel.plugins.modules import system_sync
+from pocketbase.errors import ClientResponseError
+from unittest.mock import patch, MagicMock
+
+import pytest
+import types
+
+MODULE_ARGS = {
+    "url": "http://destination:8090",
+    "username": "units@example.com",
+    "password": "testing",
+    "source": {"url": "http://source:8090", "password": "source"},
+}
+
+
+def make_record(**fields):
+    return types.SimpleNamespace(**fields)
+
+
+class TestSystemSync(ModuleTestCase):
+    def setUp(self):
+        super(TestSystemSync, self).setUp()
+        pocketbase_utils.HAS_POCKETBASE = True
+        system_sync.HAS_POCKETBASE = True
+
+        self.patcher = patch(
+            "ansible_collections.community.beszel.plugins.modules.system_sync.PocketBaseClient"
+        )
+        self.pocketbase_client_mock = self.patcher.start()
+
+        self.source = MagicMock()
+        self.source_systems = MagicMock()
+        self.source_users = MagicMock()
+        self.source.collection.side_effect = lambda name: (
+            self.source_users if name == "users" else self.source_systems
+        )
+        self.destination = MagicMock()
+        self.destination_systems = MagicMock()
+        self.destination_users = MagicMock()
+        self.destination.collection.side_effect = lambda name: (
+            self.destination_users if name == "users" else self.destination_systems
+        )
+
+        def make_client(**client_args):
+            client = MagicMock()
+            if client_args["url"] == "http://source:8090":
+                client.authenticate.return_value = self.source
+            else:
+                client.authenticate.return_value = self.destination
+            return client
+
+        self.pocketbase_client_mock.side_effect = make_client
+
+        self.source_systems.get_list.return_value = types.SimpleNamespace(
+            items=[
+                make_record(
+                    id="s1", name="same", host="same", port="45876", users=["u1"]
+                ),
+                make_record(
+                    id="s2", name="moved", host="new", port="45877", users=["u1"]
+                ),
+                make_record(id="s3", name="new", host="new", port="45876", users=[]),
+            ]
+        )
+        self.source_users.get_full_list.return_value = [
+            make_record(id="u1", email="Admin@example.com")
+        ]
+        self.destination_users.get_full_list.return_value = [
+            make_record(id="d1", email="admin@example.com")
+        ]
+        self.destination_systems.get_list.return_value = types.SimpleNamespace(
+            items=[
+                make_record(
+                    id="e1", name="same", host="same", port="45876", users=["d1"]
+                ),
+                make_record(
+                    id="e2", name="moved", host="old", port="45876", users=["d1"]
+                ),
+                make_record(
+                    id="e3", name="other", host="other", port="45876", users=[]
+                ),
+            ]
+        )
+        self.batch = self.destination.create_batch.return_value
+        self.batch.send.return_value = [
+            {"status": 200, "body": {"id": "e2", "name": "moved"}},
+            {"status": 200, "body": {"id": "n1", "name": "new"}},
+        ]
+
+    def tearDown(self):
+        self.patcher.stop()
+        super(TestSystemSync, self).tearDown()
+
+    def test_system_sync_fails_with_no_arguments(self):
+        with set_module_args({}):
+            with pytest.raises(AnsibleFailJson):
+                system_sync.main()
+
+    def test_system_sync_applies_changes_in_a_batch(self):
+        with set_module_args(dict(MODULE_ARGS, filter="host != ''")):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_sync.main()
+
+        result = exc_info.value.args[0]
+        assert result["changed"] is True
+        assert result["summary"] == dict(source=3, created=1, updated=1, unchanged=1)
+        assert result["systems"] == [
+            dict(name="moved", action="update"),
+            dict(name="new", action="create"),
+        ]
+        assert result["msg"] == "1 system(s) were created and 1 system(s) were updated."
+        self.source_systems.get_list.assert_called_once_with(
+            1,
+            500,
+            {
+                "sort": "created",
+                "fields": "id,name,host,port,users",
+                "filter": "host != ''",
+                "skipTotal": 1,
+            },
+        )
+        # The users are mapped by email, whatever its case
+        self.destination_users.get_full_list.assert_called_once_with(
+            batch=50,
+            query_params={
+                "filter": "email='admin@example.com'",
+                "fields": "id,email",
+            },
+        )
+        self.batch.collection.return_value.update.assert_called_once_with(
+            "e2", body_params={"host": "new", "port": 45877}
+        )
+        self.batch.collection.return_value.create.assert_called_once_with(
+            body_params={"name": "new", "host": "new", "port": 45876, "users": []}
+        )
+        self.batch.collection.return_value.delete.assert_not_called()
+        self.destination_systems.create.assert_not_called()
+
+    def test_system_sync_check_mode_reports_summary(self):
+        with set_module_args(
+            dict(MODULE_ARGS, _ansible_check_mode=True, _ansible_diff=True)
+        ):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_sync.main()
+
+        result = exc_info.value.args[0]
+        assert result["changed"] is True
+        assert result["summary"] == dict(source=3, created=1, updated=1, unchanged=1)
+        assert result["msg"] == (
+            "1 system(s) would be created and 1 system(s) would be updated."
+        )
+        assert result["diff"]["before"] == {"moved": {"host": "old", "port": 45876}}
+        assert sorted(result["diff"]["after"]) == ["moved", "new"]
+        self.destination.create_batch.assert_not_called()
+
+    def test_system_sync_falls_back_without_batch_api(self):
+        self.batch.send.side_effect = ClientResponseError(
+            "Batch requests are not allowed.", status=403
+        )
+        self.destination_systems.create.side_effect = Exception("invalid host")
+
+        with set_module_args(MODULE_ARGS):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_sync.main()
+
+        result = exc_info.value.args[0]
+        assert result["msg"] == "Failed to create system 'new': invalid host"
+        assert result["systems"] == [
+            dict(name="moved", action="update"),
+            dict(
+                name="new",
+                action="create",
+                msg="Failed to create system 'new': invalid host",
+            ),
+        ]
+        assert result["summary"]["updated"] == 1
+        self.destination_systems.update.assert_called_once_with(
+            id="e2", body_params={"host": "new", "port": 45877}
+        )
+
+    def test_system_sync_fails_on_missing_users(self):
+        self.destination_users.get_full_list.return_value = []
+
+        with set_module_args(MODULE_ARGS):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_sync.main()
+
+        assert exc_info.value.args[0]["msg"] == (
+            "Users of the source hub do not exist on the destination hub: "
+            "'admin@example.com'."
+        )
+        self.destination.create_batch.assert_not_called()
+
+    def test_system_sync_ignores_missing_users(self):
+        self.destination_users.get_full_list.return_value = []
+
+        with set_module_args(dict(MODULE_ARGS, missing_users="ignore")):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_sync.main()
+
+        # The users of the existing systems are removed, as they are not mapped
+        assert exc_info.value.args[0]["summary"]["updated"] == 2
+
+    def test_system_sync_changes_systems_concurrently(self):
+        with set_module_args(dict(MODULE_ARGS, concurrency=5)):
+            with patch.object(pocketbase_async, "run_concurrently") as run_concurrently:
+                run_concurrently.return_value = [
+                    {"id": "e2"},
+                    Exception("Failed to create system 'new': invalid host"),
+                ]
+                with pytest.raises(AnsibleFailJson) as exc_info:
+                    system_sync.main()
+
+        result = exc_info.value.args[0]
+        assert result["summary"]["updated"] == 1
+        assert result["summary"]["created"] == 0
+        assert run_concurrently.call_args.args[2] == 5
+        self.destination.create_batch.assert_not_called()
@@ -0,0 +1,196 @@
+from ansible_collections.community.internal_test_tools.tests.unit.plugins.modules.utils import (
+    AnsibleExitJson,
+    AnsibleFailJson,
+    set_module_args,
+    ModuleTestCase,
+)
+from ansible_collections.community.beszel.plugins.module_utils import pocketbase_utils
+from ansible_collections.community.beszel.plugins.modules import system_wait
+from unittest.mock import patch, MagicMock
+
+import pytest
+import types
+
+MODULE_ARGS = {
+    "url": "http://localhost:8090",
+    "username": "units@example.com",
+    "password": "testing",
+    "names": ["instance", "instance1"],
+}
+
+
+def system(name, status, system_id=None):
+    return types.SimpleNamespace(id=system_id or f"id-{name}", name=name, status=status)
+
+
+class TestSystemWait(ModuleTestCase):
+    def setUp(self):
+        super(TestSystemWait, self).setUp()
+        pocketbase_utils.HAS_POCKETBASE = True
+        self.patcher = patch.object(system_wait, "PocketBaseClient")
+        self.pocketbase_client_mock = self.patcher.start()
+        self.subscription_patcher = patch.object(system_wait, "RealtimeSubscription")
+        self.subscription_mock = self.subscription_patcher.start()
+        self.subscription = self.subscription_mock.return_value
+        self.subscription.connect.return_value = self.subscription
+        self.sleep_patcher = patch.object(system_wait.time, "sleep")
+        self.sleep_mock = self.sleep_patcher.start()
+
+        self.fake_client = MagicMock()
+        self.fake_collection = MagicMock()
+        self.fake_client.collection.return_value = self.fake_collection
+        self.pocketbase_client_mock.return_value.authenticate.return_value = (
+            self.fake_client
+        )
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.subscription_patcher.stop()
+        self.sleep_patcher.stop()
+        super(TestSystemWait, self).tearDown()
+
+    def test_system_wait_returns_when_systems_already_have_status(self):
+        self.fake_collection.get_full_list.return_value = [
+            system("instance", "up"),
+            system("instance1", "up"),
+        ]
+        with set_module_args(MODULE_ARGS):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_wait.main()
+
+        result = exc_info.value.args[0]
+        assert result["changed"] is False
+        assert result["method"] == "realtime"
+        assert [s["status"] for s in result["systems"]] == ["up", "up"]
+        self.subscription.get.assert_not_called()
+        query_params = self.fake_collection.get_full_list.call_args.kwargs[
+            "query_params"
+        ]
+        assert query_params == {
+            "filter": "name='instance' || name='instance1'",
+            "fields": "id,name,status",
+        }
+
+    def test_system_wait_returns_on_realtime_events(self):
+        self.fake_collection.get_full_list.return_value = [
+            system("instance", "pending")
+        ]
+        self.subscription.get.side_effect = [
+            {
+                "action": "update",
+                "record": {"id": "x", "name": "other", "status": "up"},
+            },
+            {
+                "action": "update",
+                "record": {"id": "id-instance", "name": "instance", "status": "up"},
+            },
+            None,
+            {
+                "action": "create",
+                "record": {"id": "id-instance1", "name": "instance1", "status": "up"},
+            },
+        ]
+        with set_module_args(MODULE_ARGS):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_wait.main()
+
+        result = exc_info.value.args[0]
+        assert result["method"] == "realtime"
+        assert result["systems"] == [
+            {"id": "id-instance", "name": "instance", "status": "up"},
+            {"id": "id-instance1", "name": "instance1", "status": "up"},
+        ]
+        assert self.subscription.get.call_count == 4
+        self.subscription.close.assert_called_once()
+        # Only the initial listing was needed
+        self.fake_collection.get_full_list.assert_called_once()
+
+    def test_system_wait_resubscribes_when_connection_closes(self):
+        self.fake_collection.get_full_list.side_effect = [
+            [system("instance", "pending")],
+            [system("instance", "up"), system("instance1", "up")],
+        ]
+        self.subscription.get.side_effect = ConnectionError("closed")
+        with set_module_args(MODULE_ARGS):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_wait.main()
+
+        assert exc_info.value.args[0]["method"] == "realtime"
+        assert self.subscription.connect.call_count == 2
+        assert self.subscription.close.call_count == 2
+        # Waits before subscribing again
+        self.sleep_mock.assert_called_once()
+        assert 0 < self.sleep_mock.call_args.args[0] <= 5
+        query_params = self.fake_collection.get_full_list.call_args.kwargs[
+            "query_params"
+        ]
+        assert query_params["filter"] == "name='instance' || name='instance1'"
+
+    def test_system_wait_falls_back_to_polling(self):
+        self.subscription.connect.side_effect = ConnectionError("refused")
+        self.fake_collection.get_full_list.side_effect = [
+            [system("instance", "up")],
+            [],
+            [system("instance1", "up")],
+        ]
+        with set_module_args(dict(MODULE_ARGS, poll_interval=2)):
+            with pytest.raises(AnsibleExitJson) as exc_info:
+                system_wait.main()
+
+        result = exc_info.value.args[0]
+        assert result["method"] == "poll"
+        assert len(result["systems"]) == 2
+        assert self.sleep_mock.call_count == 2
+        assert self.sleep_mock.call_args.args[0] <= 2
+        # Systems that have the status are no longer requested
+        query_params = self.fake_collection.get_full_list.call_args.kwargs[
+            "query_params"
+        ]
+        assert query_params["filter"] == "name='instance1'"
+
+    def test_system_wait_fails_for_invalid_poll_interval(self):
+        for poll_interval in (0, -1):
+            with set_module_args(dict(MODULE_ARGS, poll_interval=poll_interval)):
+                with pytest.raises(AnsibleFailJson) as exc_info:
+                    system_wait.main()
+
+            assert (
+                exc_info.value.args[0]["msg"] == "poll_interval must be greater than 0."
+            )
+        self.pocketbase_client_mock.assert_not_called()
+
+    def test_system_wait_fails_when_realtime_is_required(self):
+        self.subscription.connect.side_effect = ConnectionError("refused")
+        with set_module_args(dict(MODULE_ARGS, method="realtime")):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_wait.main()
+
+        assert "refused" in exc_info.value.args[0]["msg"]
+        self.fake_collection.get_full_list.assert_not_called()
+
+    def test_system_wait_fails_on_timeout(self):
+        self.fake_collection.get_full_list.return_value = [
+            system("instance", "up"),
+            system("instance1", "down"),
+        ]
+        with set_module_args(dict(MODULE_ARGS, method="poll", wait_timeout=0)):
+            with pytest.raises(AnsibleFailJson) as exc_info:
+                system_wait.main()
+
+        result = exc_info.value.args[0]
+        assert result["msg"] == "Timed out waiting for systems 'instance1' to be up."
+        assert [s["status"] for s in result["systems"]] == ["up", "down"]
+        self.subscription_mock.assert_not_called()
+
+    def test_system_wait_does_not_sleep_past_the_deadline(self):
+        self.fake_collection.get_full_list.return_value = [system("instance", "down")]
+        # The deadline passes between the loop condition and the sleep
+        clock = iter([0, 9.9, 10.5])
+        with set_module_args(dict(MODULE_ARGS, method="poll", wait_timeout=10)):
+            with patch.object(
+                system_wait.time, "monotonic", side_effect=lambda: next(clock, 11)
+            ):
+                with pytest.raises(AnsibleFailJson):
+                    system_wait.main()
+
+        self.sleep_mock.assert_called_once_with(0)
@@ -29,7 +29,6 @@ class TestUniversalToken(ModuleTestCase):
         # Ensure module thinks pocketbase is available
         pocketbase_utils.HAS_POCKETBASE = True
         universal_token.HAS_POCKETBASE = True
-        universal_token.POCKETBASE_IMPORT_ERROR = None
 
         # Patch PocketBaseClient inside the module under test
         self.patcher = patch(
@@ -249,6 +248,15 @@ class TestUniversalToken(ModuleTestCase):
                 username="units@example.com",
                 password="testing",
                 timeout=60.0,
+                connect_timeout=10,
+                retries=3,
+                retry_backoff=0.5,
+                retry_max_backoff=30,
+                rate_limit=None,
+                max_in_flight=None,
+                token_cache=None,
+                pool_size=10,
+                http2=False,
             )
 
     def test_universal_token_enables_with_permanent_persistence(self):